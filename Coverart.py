@@ -1,23 +1,78 @@
-
-pip install requests pandas tqdm openpyxl
+# pip install requests pandas tqdm openpyxl
 
 
+import os
+import csv
+import json
+import argparse
 import requests
 import pandas as pd
-import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 from tqdm import tqdm
 
+from musicbrainz_client import NegativeCache, RateLimitedClient
+from musicbrainz_store import STORE_PATH, MusicBrainzStore
+
 HEADERS = {
     "User-Agent": "CoverArtScraper/1.0 (your@email.com)"
 }
 
 MB_ARTIST_SEARCH = "https://musicbrainz.org/ws/2/artist/"
 MB_RELEASE_GROUPS = "https://musicbrainz.org/ws/2/release-group"
-COVER_ART = "https://coverartarchive.org/release-group/{}"
+COVER_ART_FRONT = "https://coverartarchive.org/release-group/{id}/{endpoint}"
+
+# Front cover size: "250", "500" or "1200" px thumbnails, "" = full-size original
+COVER_SIZE = "1200"
+
+# Release groups without cover art are not asked again for this long
+NO_COVER_CACHE = r"c:\OpenCVTraining\cover_art_missing.json"
+NO_COVER_TTL_DAYS = 30
+
+OUTPUT_FILE = r"c:\OpenCVTraining\cover_art_archive_top_artists.csv"
+
+# Resume-safe: one line per finished artist (append-only), plus the
+# artist list of the run so a resume works through the same artists
+CHECKPOINT_JSONL = r"c:\OpenCVTraining\cover_art_checkpoint.jsonl"
+ARTISTS_JSON = r"c:\OpenCVTraining\cover_art_artists.json"
 
-artists_data = []
+TARGET_ARTISTS = 1000
+ALBUMS_PER_ARTIST = 5
+
+CSV_COLUMNS = ["Artist"] + [
+    col
+    for i in range(ALBUMS_PER_ARTIST)
+    for col in ("Name of Album" if i == 0 else f"Name of Album{i+1}", f"Image URL {i+1}")
+]
+
+# Cover Art Archive lookups run on their own threads while the
+# MusicBrainz requests keep to 1 per second (see musicbrainz_client.py)
+CAA_WORKERS = 8
+
+# Local store built from the MusicBrainz JSON dumps (musicbrainz_store.py);
+# used whenever the file exists, the web service only tops it up
+MB_STORE = STORE_PATH
+
+client = RateLimitedClient(HEADERS)
+no_cover = NegativeCache(NO_COVER_CACHE, NO_COVER_TTL_DAYS * 86400)
+store = None
 
 def get_artists(limit=1000):
+    if store is None:
+        return get_artists_online(limit)
+
+    artists = store.top_artists(limit)
+    if len(artists) < limit:
+        known = {a["id"] for a in artists}
+        extra = [a for a in get_artists_online(limit) if a["id"] not in known]
+        with store.conn:
+            store.add_artists(extra, source="web")
+        artists.extend(extra[:limit - len(artists)])
+        print(f"Local store: {len(known)} artists, {len(extra)} topped up from the web service")
+
+    return artists
+
+def get_artists_online(limit=1000):
     artists = []
     offset = 0
 
@@ -28,55 +83,216 @@ def get_artists(limit=1000):
             "limit": 100,
             "offset": offset
         }
-        r = requests.get(MB_ARTIST_SEARCH, params=params, headers=HEADERS)
+        r = client.get(MB_ARTIST_SEARCH, params=params)
         r.raise_for_status()
 
         data = r.json()["artists"]
+        if not data:
+            break
         artists.extend(data)
         offset += 100
-        time.sleep(1)
 
     return artists[:limit]
 
 def get_release_groups(artist_id):
+    if store is not None and store.is_loaded(artist_id):
+        return store.release_groups(artist_id)
+
+    releases = get_release_groups_online(artist_id)
+    if store is not None:
+        with store.conn:
+            store.add_release_groups(releases, artist_id)
+            store.mark_loaded([artist_id], "web")
+    return releases
+
+def get_release_groups_online(artist_id):
     params = {
         "artist": artist_id,
         "type": "album",
         "fmt": "json",
-        "limit": 5
+        "limit": ALBUMS_PER_ARTIST
     }
-    r = requests.get(MB_RELEASE_GROUPS, params=params, headers=HEADERS)
+    r = client.get(MB_RELEASE_GROUPS, params=params)
     r.raise_for_status()
     return r.json().get("release-groups", [])
 
-def get_cover_url(rg_id):
-    try:
-        r = requests.get(COVER_ART.format(rg_id), headers=HEADERS)
-        if r.status_code == 200:
-            images = r.json().get("images", [])
-            for img in images:
-                if img.get("front"):
-                    return img["image"]
-    except:
-        pass
-    return None
+def get_cover_url(rg_id, size=None):
+    """
+    One HEAD request to the release group's /front[-SIZE] endpoint: the
+    redirect's Location is the image URL; 404 means no cover art.
+    Transport errors, 429 and 5xx raise: that is no answer, not a miss.
+    """
+    size = COVER_SIZE if size is None else size
+    endpoint = f"front-{size}" if size else "front"
 
-artists = get_artists(1000)
+    # Per size: a release group may have a full-size front but no thumbnail
+    key = f"{rg_id}/{endpoint}"
+    if key in no_cover:
+        return None
 
-for artist in tqdm(artists):
+    url = COVER_ART_FRONT.format(id=rg_id, endpoint=endpoint)
+    r = client.head(url, allow_redirects=False)
+    if r.is_redirect and r.headers.get("Location"):
+        return urljoin(url, r.headers["Location"])
+    if r.status_code == 404:
+        no_cover.add(key)
+    elif r.status_code == 429 or r.status_code >= 500:
+        r.raise_for_status()
+    return None
+
+def build_row(artist, releases, cover_urls):
     row = {
         "Artist": artist["name"]
     }
 
-    releases = get_release_groups(artist["id"])
-
-    for i, rg in enumerate(releases):
+    for i, (rg, cover_url) in enumerate(zip(releases, cover_urls)):
         album_col = "Name of Album" if i == 0 else f"Name of Album{i+1}"
         row[album_col] = rg["title"]
-        row[f"Image URL {i+1}"] = get_cover_url(rg["id"])
-        time.sleep(0.3)
+        row[f"Image URL {i+1}"] = cover_url
+
+    return row
+
+# ---------------------------------------------
+# Checkpoint
+# ---------------------------------------------
+def load_checkpoint(path=CHECKPOINT_JSONL):
+    """MusicBrainz artist id -> finished CSV row."""
+    done = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    # Last line cut short by a crash
+                    continue
+                done[obj["artist_id"]] = obj["row"]
+    return done
+
+def load_run_artists(limit, fresh=False):
+    """The run's artist list: saved on the first run, reused when resuming."""
+    if not fresh and os.path.exists(ARTISTS_JSON):
+        with open(ARTISTS_JSON, "r", encoding="utf-8") as f:
+            artists = json.load(f)
+        if len(artists) >= limit:
+            return artists[:limit]
+
+    artists = [{"id": a["id"], "name": a["name"]} for a in get_artists(limit)]
+    with open(ARTISTS_JSON, "w", encoding="utf-8") as f:
+        json.dump(artists, f, ensure_ascii=False)
+    return artists
+
+def open_csv(path, resume):
+    # The rows written so far stay when resuming; the header only once
+    exists = resume and os.path.exists(path) and os.path.getsize(path) > 0
+    f = open(path, "a" if exists else "w", newline="", encoding="utf-8")
+    writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+    if not exists:
+        writer.writeheader()
+    return f, writer
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Top MusicBrainz groups + Cover Art Archive covers")
+    parser.add_argument("--store", default=MB_STORE, help="local MusicBrainz store (SQLite)")
+    parser.add_argument("--ingest", nargs="+", metavar="DUMP",
+                        help="first load these artist / release-group JSON dumps into the store")
+    parser.add_argument("--online", action="store_true", help="ignore the local store")
+    parser.add_argument("--fresh", action="store_true",
+                        help="ignore the checkpoint and start over")
+    parser.add_argument("--cover-size", choices=["250", "500", "1200", "original"],
+                        help=f"front cover size (default {COVER_SIZE or 'original'})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global store, COVER_SIZE
+    args = parse_args(argv)
+    if args.cover_size:
+        COVER_SIZE = "" if args.cover_size == "original" else args.cover_size
+
+    if args.ingest:
+        store = MusicBrainzStore(args.store)
+        for path in args.ingest:
+            print(f"Ingesting {path} …")
+            store.ingest(path)
+    elif not args.online and os.path.exists(args.store):
+        store = MusicBrainzStore(args.store)
+
+    if args.fresh and os.path.exists(CHECKPOINT_JSONL):
+        os.remove(CHECKPOINT_JSONL)
+
+    artists = load_run_artists(TARGET_ARTISTS, args.fresh)
+    done = load_checkpoint(CHECKPOINT_JSONL)
+    todo = [a for a in artists if a["id"] not in done]
+    if done:
+        print(f"Resuming: {len(artists) - len(todo)} of {len(artists)} artists already done")
+
+    ck = open(CHECKPOINT_JSONL, "a", encoding="utf-8")
+    csv_file, csv_writer = open_csv(OUTPUT_FILE, resume=bool(done))
+
+    failed = 0
+
+    def finish(artist, releases, cover_urls):
+        nonlocal failed
+        try:
+            urls = [f.result() for f in cover_urls]
+        except requests.RequestException as e:
+            # Not checkpointed: the next run asks for this artist's covers again
+            print(f"[ERROR] {artist['name']}: cover lookup failed ({e})")
+            failed += 1
+            return
+
+        row = build_row(artist, releases, urls)
+        ck.write(json.dumps({"artist_id": artist["id"], "row": row}, ensure_ascii=False) + "\n")
+        ck.flush()
+        csv_writer.writerow(row)
+        csv_file.flush()
+        done[artist["id"]] = row
+
+    # MusicBrainz stays one request per second; every release group's
+    # cover lookup starts right away on the pool instead of waiting its turn.
+    # An artist is checkpointed as soon as all of its covers are resolved.
+    pending = []
+    try:
+        with ThreadPoolExecutor(max_workers=CAA_WORKERS) as covers:
+            for artist in tqdm(todo):
+                try:
+                    releases = get_release_groups(artist["id"])
+                except requests.RequestException as e:
+                    # Not checkpointed: the next run tries this artist again
+                    print(f"[ERROR] {artist['name']}: {e}")
+                    failed += 1
+                    continue
+
+                pending.append((artist, releases, [covers.submit(get_cover_url, rg["id"]) for rg in releases]))
+
+                still_pending = []
+                for item in pending:
+                    if all(f.done() for f in item[2]):
+                        finish(*item)
+                    else:
+                        still_pending.append(item)
+                pending = still_pending
+
+            for item in pending:
+                finish(*item)
+    finally:
+        ck.close()
+        csv_file.close()
+        no_cover.save()
+
+    # Complete run: rewrite the CSV in artist order from the checkpoint
+    if not failed:
+        df = pd.DataFrame([done[a["id"]] for a in artists if a["id"] in done], columns=CSV_COLUMNS)
+        df.to_csv(OUTPUT_FILE, index=False)
+    else:
+        print(f"{failed} artists failed — run again to resume with them")
+
+    print(client.report() or "No web requests needed")
+    if no_cover.hits:
+        print(f"Cover Art Archive: {no_cover.hits} release groups skipped (no art, cached)")
 
-    artists_data.append(row)
+    if store is not None:
+        store.close()
 
-df = pd.DataFrame(artists_data)
-df.to_csv("c:\OpenCVTraining\cover_art_archive_top_artists.csv", index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
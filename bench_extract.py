@@ -0,0 +1,113 @@
+import argparse
+import glob
+import os
+import time
+
+from html_extract import BACKENDS, available
+
+# ---------------------------------------------
+# Benchmark for the html_extract backends on saved CineMaterial pages
+#
+#   python bench_extract.py                 (time every installed backend)
+#   python bench_extract.py --save 3        (on live pages instead, needs cookies.json)
+#
+# Fixtures are plain files named listing-<n>.html and show-<n>.html. The
+# small set in tests/fixtures/html is used by default; --save fetches
+# real pages into SAVED_DIR. Every backend is first checked against the
+# full BeautifulSoup result, then timed over REPEATS passes.
+# ---------------------------------------------
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "html")
+SAVED_DIR = r"C:\CineMaterialTV\html_fixtures"
+REPEATS = 5
+
+
+def save_fixtures(folder, pages):
+    """Fetch `pages` listing pages and their show pages into `folder`."""
+    import cinematerial1
+
+    os.makedirs(folder, exist_ok=True)
+    cinematerial1.load_encrypted_cookies("cookies.json")
+
+    shows = 0
+    for page in range(1, pages + 1):
+        r = cinematerial1.session.get(f"{cinematerial1.TV_URL}?page={page}", timeout=30)
+        with open(os.path.join(folder, f"listing-{page}.html"), "w", encoding="utf-8") as f:
+            f.write(r.text)
+
+        for _, url in cinematerial1.parse_listing(r.text):
+            shows += 1
+            html = cinematerial1.session.get(url, timeout=30).text
+            with open(os.path.join(folder, f"show-{shows}.html"), "w", encoding="utf-8") as f:
+                f.write(html)
+            time.sleep(cinematerial1.POLITE_DELAY)
+
+    print(f"Saved {pages} listing pages and {shows} show pages to {folder}")
+
+
+def load_fixtures(folder):
+    pages = {}
+    for kind in ("listing", "show"):
+        pages[kind] = []
+        for path in sorted(glob.glob(os.path.join(folder, f"{kind}-*.html"))):
+            with open(path, encoding="utf-8") as f:
+                pages[kind].append(f.read())
+    return pages
+
+
+def bench(pages, repeats=REPEATS):
+    reference = {kind: [BACKENDS["soup"][i](html) for html in pages[kind]]
+                 for i, kind in enumerate(("listing", "show"))}
+    total_mb = sum(len(html) for kind in pages for html in pages[kind]) / 1e6
+
+    print(f"{len(pages['listing'])} listing + {len(pages['show'])} show pages, "
+          f"{total_mb:.1f} MB, {repeats} passes\n")
+    print(f"  {'backend':<12}{'ms/page':>10}{'MB/s':>10}{'speedup':>10}  output")
+
+    base = None
+    for name, funcs in BACKENDS.items():
+        if not available(name):
+            print(f"  {name:<12}{'-':>10}{'-':>10}{'-':>10}  not installed")
+            continue
+
+        same = all(
+            [funcs[i](html) for html in pages[kind]] == reference[kind]
+            for i, kind in enumerate(("listing", "show"))
+        )
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for i, kind in enumerate(("listing", "show")):
+                for html in pages[kind]:
+                    funcs[i](html)
+        seconds = (time.perf_counter() - start) / repeats
+
+        count = len(pages["listing"]) + len(pages["show"])
+        base = base or seconds
+        print(f"  {name:<12}{seconds / count * 1000:>10.2f}{total_mb / seconds:>10.1f}"
+              f"{base / seconds:>9.1f}x  {'same as soup' if same else 'DIFFERS'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CineMaterial HTML extraction backends")
+    parser.add_argument("--fixtures", help=f"folder of saved pages (default {FIXTURE_DIR})")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--save", type=int, metavar="PAGES",
+                        help=f"first fetch this many listing pages (+ their shows) into "
+                             f"--fixtures (default {SAVED_DIR})")
+    args = parser.parse_args(argv)
+
+    if args.save:
+        args.fixtures = args.fixtures or SAVED_DIR
+        save_fixtures(args.fixtures, args.save)
+    args.fixtures = args.fixtures or FIXTURE_DIR
+
+    pages = load_fixtures(args.fixtures)
+    if not pages["listing"] and not pages["show"]:
+        parser.error(f"no fixtures in {args.fixtures} — run with --save first")
+
+    bench(pages, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tmdb_http
+
+# ---------------------------------------------
+# Simulation for tmdb_http's hedged downloads
+#
+#   python bench_hedge.py                       (300 posters, 6% stall for 8s)
+#   python bench_hedge.py --stall-rate 0.1 --stall 15
+#
+# No network: the session is replaced by fake responses that take
+# 20–80 ms, except a `stall_rate` share that hangs for `stall` seconds
+# before sending their bytes (a slow image.tmdb.org edge). The same
+# download sequence is run without and with hedging on WORKERS threads.
+# ---------------------------------------------
+
+DOWNLOADS = 300
+WORKERS = 10
+IMAGE_BYTES = 1000
+
+
+class FakeResponse:
+    def __init__(self, delay):
+        self.delay = delay
+        self.status_code = 200
+        self.headers = {"Content-Length": str(IMAGE_BYTES)}
+        self.url = "https://image.tmdb.org/t/p/original/sim.jpg"
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        time.sleep(self.delay)
+        yield b"x" * IMAGE_BYTES
+
+    def close(self):
+        pass
+
+
+def fake_session_get(stall_rate, stall, seed):
+    rnd = random.Random(seed)
+    lock = threading.Lock()
+
+    def get(url, params=None, timeout=None, **kwargs):
+        with lock:
+            delay = stall if rnd.random() < stall_rate else rnd.uniform(0.02, 0.08)
+        return FakeResponse(delay)
+
+    return get
+
+
+def run(hedge, downloads, stall_rate, stall, seed):
+    tmdb_http.session.get = fake_session_get(stall_rate, stall, seed)
+    tmdb_http.HEDGE_DOWNLOADS = hedge
+    tmdb_http.COALESCE_REQUESTS = False
+    tmdb_http.download_latency = tmdb_http.LatencyTracker()
+
+    def one(i):
+        start = time.monotonic()
+        tmdb_http.download(f"https://image.tmdb.org/t/p/original/{i}.jpg")
+        return time.monotonic() - start
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(WORKERS) as pool:
+        latencies = sorted(pool.map(one, range(downloads)))
+    wall = time.monotonic() - start
+
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    print(f"{'hedged' if hedge else 'plain ':<7} wall {wall:5.1f}s   p50 {p50:.2f}s   "
+          f"p99 {p99:.2f}s   max {latencies[-1]:.2f}s   ({tmdb_http.download_report()})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate hedged vs. plain poster downloads")
+    parser.add_argument("--downloads", type=int, default=DOWNLOADS)
+    parser.add_argument("--stall-rate", type=float, default=0.06)
+    parser.add_argument("--stall", type=float, default=8.0, help="seconds a stalled download hangs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for hedge in (False, True):
+        run(hedge, args.downloads, args.stall_rate, args.stall, args.seed)
+
+
+if __name__ == "__main__":
+    main()
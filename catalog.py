@@ -0,0 +1,403 @@
+import argparse
+import csv
+import os
+import sqlite3
+from datetime import datetime
+
+# ---------------------------------------------
+# Local catalog of titles, posters and cast
+#
+# Every scraper run records what it found here (alongside its CSV), so
+# questions across runs are one indexed SQL query instead of re-loading
+# and joining CSVs. The views at the bottom reproduce the CSV layouts the
+# scripts write, and export_csv() dumps any of them in milliseconds:
+#
+#   python catalog.py v_tv_posters TVPosters.csv            (current posters)
+#   python catalog.py v_tv_posters TVPosters.csv --run 12   (as run 12 found them)
+#
+# Posters are kept per run: a new run marks the title's earlier posters
+# (same source and language) as no longer current instead of deleting them.
+# ---------------------------------------------
+
+CATALOG_PATH = r"C:\openCVtraining\tmdb_catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY,
+    script      TEXT NOT NULL,
+    started_at  TEXT NOT NULL,
+    finished_at TEXT,
+    row_count   INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS titles (
+    id           INTEGER PRIMARY KEY,
+    kind         TEXT NOT NULL,              -- movie | tv
+    tmdb_id      INTEGER NOT NULL,
+    title        TEXT,
+    release_date TEXT,                       -- first_air_date for tv
+    popularity   REAL,
+    last_run_id  INTEGER REFERENCES runs (id),
+    cast_known   INTEGER NOT NULL DEFAULT 0,  -- cast was recorded (may be empty)
+    UNIQUE (kind, tmdb_id)
+);
+CREATE INDEX IF NOT EXISTS titles_tmdb_id ON titles (tmdb_id);
+CREATE INDEX IF NOT EXISTS titles_release_date ON titles (kind, release_date);
+CREATE INDEX IF NOT EXISTS titles_popularity ON titles (kind, popularity DESC);
+
+CREATE TABLE IF NOT EXISTS people (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS title_cast (
+    title_id  INTEGER NOT NULL REFERENCES titles (id),
+    billing   INTEGER NOT NULL,
+    person_id INTEGER NOT NULL REFERENCES people (id),
+    PRIMARY KEY (title_id, billing)
+);
+CREATE INDEX IF NOT EXISTS title_cast_person ON title_cast (person_id);
+
+CREATE TABLE IF NOT EXISTS posters (
+    id         INTEGER PRIMARY KEY,
+    title_id   INTEGER NOT NULL REFERENCES titles (id),
+    run_id     INTEGER REFERENCES runs (id),
+    source     TEXT NOT NULL,               -- official | credit_block | fallback
+    language   TEXT,
+    rank       INTEGER NOT NULL,
+    url        TEXT NOT NULL,
+    width      INTEGER,
+    height     INTEGER,
+    vote_count INTEGER,
+    current    INTEGER NOT NULL DEFAULT 1   -- 0 once a later run replaced it
+);
+CREATE INDEX IF NOT EXISTS posters_title ON posters (title_id, source, language, rank);
+CREATE INDEX IF NOT EXISTS posters_run ON posters (run_id);
+
+-- Which sources / languages of a title were looked at, and when — also
+-- when nothing was found, so a miss is known too (poster_service.py)
+CREATE TABLE IF NOT EXISTS poster_checks (
+    title_id   INTEGER NOT NULL REFERENCES titles (id),
+    source     TEXT NOT NULL,
+    language   TEXT,
+    run_id     INTEGER REFERENCES runs (id),
+    found      INTEGER NOT NULL,
+    checked_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS poster_checks_title ON poster_checks (title_id, language, source);
+
+-- refresh_scheduler.py: when each title is due for its next check, per
+-- source (the scripts pick different posters, so each keeps its own schedule)
+CREATE TABLE IF NOT EXISTS title_refresh (
+    title_id     INTEGER NOT NULL REFERENCES titles (id),
+    source       TEXT NOT NULL,              -- official | credit_block
+    fingerprint  TEXT,                       -- hash of the picked poster URLs
+    checks       INTEGER NOT NULL DEFAULT 0,
+    changes      INTEGER NOT NULL DEFAULT 0,
+    last_checked TEXT,
+    next_due     TEXT,
+    PRIMARY KEY (title_id, source)
+);
+CREATE INDEX IF NOT EXISTS title_refresh_due ON title_refresh (next_due);
+
+"""
+
+# Views are derived data: dropped and re-created on every open, so a
+# changed definition reaches existing catalog files too
+VIEWS = """
+DROP VIEW IF EXISTS v_cast;
+DROP VIEW IF EXISTS v_tmdb_popular_posters;
+DROP VIEW IF EXISTS v_final_posters;
+DROP VIEW IF EXISTS v_credit_posters;
+DROP VIEW IF EXISTS v_tv_posters;
+
+-- Cast in billing order (a window, since group_concat ignores the order of
+-- a subquery)
+CREATE VIEW v_cast AS
+SELECT title_id, top_billed_cast FROM (
+    SELECT tc.title_id,
+           group_concat(p.name, ' | ') OVER (
+               PARTITION BY tc.title_id ORDER BY tc.billing
+               ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+           ) AS top_billed_cast,
+           row_number() OVER (PARTITION BY tc.title_id ORDER BY tc.billing) AS n
+    FROM title_cast tc
+    JOIN people p ON p.id = tc.person_id
+)
+WHERE n = 1;
+
+-- tmdb.py: tmdb_popular_official_<language>_posters_2014_2025.csv
+CREATE VIEW v_tmdb_popular_posters AS
+SELECT t.title || '_' || ps.rank AS title, t.release_date, t.popularity,
+       ps.url AS poster_url, ps.width, ps.height, ps.language, ps.vote_count,
+       COALESCE(c.top_billed_cast, '') AS top_billed_cast, ps.run_id, ps.current
+FROM posters ps
+JOIN titles t ON t.id = ps.title_id
+LEFT JOIN v_cast c ON c.title_id = t.id
+WHERE t.kind = 'movie' AND ps.source = 'official';
+
+-- movieposters_hopefinal.py: FinalPosters_*.csv
+-- (titles whose cast was never fetched get an empty cast, not "(No Cast Listed)")
+CREATE VIEW v_final_posters AS
+SELECT t.title, t.release_date, t.popularity, ps.url AS poster_image_url,
+       CASE WHEN t.cast_known THEN COALESCE(c.top_billed_cast, '(No Cast Listed)') ELSE '' END
+           AS top_billed_cast,
+       ps.width, ps.height, ps.vote_count, ps.language, ps.run_id, ps.current
+FROM posters ps
+JOIN titles t ON t.id = ps.title_id
+LEFT JOIN v_cast c ON c.title_id = t.id
+WHERE t.kind = 'movie' AND ps.source = 'credit_block';
+
+-- moviecreds.py: real_movie_posters_with_credit_block*.csv (no cast column)
+CREATE VIEW v_credit_posters AS
+SELECT t.title, t.release_date, t.popularity, ps.url AS poster_image_url,
+       ps.width, ps.height, ps.vote_count, ps.language, ps.run_id, ps.current
+FROM posters ps
+JOIN titles t ON t.id = ps.title_id
+WHERE t.kind = 'movie' AND ps.source = 'credit_block';
+
+-- tvshowstmdb.py: TVPosters_*.csv (credit posters, or the top 3 as fallback)
+CREATE VIEW v_tv_posters AS
+SELECT t.title, t.release_date AS first_air_date, t.popularity,
+       ps.rank AS poster_number, ps.url AS poster_image_url,
+       CASE WHEN t.cast_known THEN COALESCE(c.top_billed_cast, '(No Cast Listed)') ELSE '' END
+           AS top_billed_cast,
+       ps.width, ps.height, ps.vote_count, ps.language, ps.source, ps.run_id, ps.current
+FROM posters ps
+JOIN titles t ON t.id = ps.title_id
+LEFT JOIN v_cast c ON c.title_id = t.id
+WHERE t.kind = 'tv' AND ps.source IN ('credit_block', 'fallback');
+"""
+
+# Column layout of each CSV, in the order the scripts write them
+VIEW_COLUMNS = {
+    "v_tmdb_popular_posters": ["title", "release_date", "popularity", "poster_url", "width",
+                               "height", "language", "vote_count", "top_billed_cast"],
+    "v_final_posters": ["title", "release_date", "popularity", "poster_image_url",
+                        "top_billed_cast", "width", "height", "vote_count"],
+    "v_credit_posters": ["title", "release_date", "popularity", "poster_image_url",
+                         "width", "height", "vote_count"],
+    "v_tv_posters": ["title", "first_air_date", "popularity", "poster_number", "poster_image_url",
+                     "top_billed_cast", "width", "height", "vote_count"],
+}
+
+
+class Catalog:
+    def __init__(self, path=CATALOG_PATH, check_same_thread=True):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        # check_same_thread=False: caller serialises access (poster_service.py)
+        self.conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.conn.executescript(VIEWS)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    # ---- runs -----------------------------------------
+    def start_run(self, script):
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (script, started_at) VALUES (?, ?)",
+                (script, datetime.now().isoformat(timespec="seconds"))
+            )
+        return cur.lastrowid
+
+    def finish_run(self, run_id):
+        with self.conn:
+            self.conn.execute(
+                """
+                UPDATE runs SET finished_at = ?,
+                    row_count = (SELECT COUNT(*) FROM posters WHERE run_id = ?)
+                WHERE id = ?
+                """,
+                (datetime.now().isoformat(timespec="seconds"), run_id, run_id)
+            )
+
+    # ---- titles ---------------------------------------
+    def record_title(self, run_id, kind, tmdb_id, title, release_date, popularity,
+                     cast=None, source=None, posters_by_lang=None):
+        """
+        Upsert one title and (optionally) its cast and posters.
+
+        posters_by_lang maps language -> ranked list of
+        {"url", "width", "height", "vote_count"}; the new list becomes those
+        languages' current posters for `source` (an empty list: none). The
+        earlier runs' posters stay, marked as not current.
+        """
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO titles (kind, tmdb_id, title, release_date, popularity, last_run_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (kind, tmdb_id) DO UPDATE SET
+                    title = excluded.title, release_date = excluded.release_date,
+                    popularity = excluded.popularity, last_run_id = excluded.last_run_id
+                """,
+                (kind, tmdb_id, title, release_date, popularity, run_id)
+            )
+            title_id = self.conn.execute(
+                "SELECT id FROM titles WHERE kind = ? AND tmdb_id = ?", (kind, tmdb_id)
+            ).fetchone()[0]
+
+            if cast is not None:
+                self._set_cast(title_id, cast)
+
+            checked_at = datetime.now().isoformat(timespec="seconds")
+            for lang, posters in (posters_by_lang or {}).items():
+                self.conn.execute(
+                    "DELETE FROM poster_checks WHERE title_id = ? AND source = ? AND language IS ?",
+                    (title_id, source, lang)
+                )
+                self.conn.execute(
+                    "INSERT INTO poster_checks VALUES (?, ?, ?, ?, ?, ?)",
+                    (title_id, source, lang, run_id, len(posters), checked_at)
+                )
+
+                self.conn.execute(
+                    "UPDATE posters SET current = 0 WHERE title_id = ? AND source = ? AND language IS ?",
+                    (title_id, source, lang)
+                )
+                # Recorded twice in one run: the later list wins
+                self.conn.execute(
+                    """
+                    DELETE FROM posters
+                    WHERE title_id = ? AND source = ? AND language IS ? AND run_id IS ?
+                    """,
+                    (title_id, source, lang, run_id)
+                )
+                self.conn.executemany(
+                    """
+                    INSERT INTO posters (title_id, run_id, source, language, rank, url,
+                                         width, height, vote_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (title_id, run_id, source, lang, rank, p["url"],
+                         p.get("width"), p.get("height"), p.get("vote_count"))
+                        for rank, p in enumerate(posters, start=1)
+                    ]
+                )
+
+        return title_id
+
+    def _set_cast(self, title_id, names):
+        # Placeholders such as "(No Cast Listed)" are not people
+        names = [n for n in names if n and not n.startswith("(")]
+
+        self.conn.execute("UPDATE titles SET cast_known = 1 WHERE id = ?", (title_id,))
+        self.conn.execute("DELETE FROM title_cast WHERE title_id = ?", (title_id,))
+        self.conn.executemany("INSERT OR IGNORE INTO people (name) VALUES (?)", [(n,) for n in names])
+        self.conn.executemany(
+            """
+            INSERT INTO title_cast (title_id, billing, person_id)
+            SELECT ?, ?, id FROM people WHERE name = ?
+            """,
+            [(title_id, billing, n) for billing, n in enumerate(names, start=1)]
+        )
+
+    # ---- lookup ---------------------------------------
+    def posters_for(self, kind, tmdb_id, language):
+        """
+        Stored title info and current posters of one title in one language:
+        ({"title", "release_date", "popularity"}, {source: [poster, ...]},
+         {source: checked_at}), or None if no run looked at that language.
+        A source that was checked but had no poster maps to [].
+        """
+        title = self.conn.execute(
+            "SELECT id, title, release_date, popularity FROM titles WHERE kind = ? AND tmdb_id = ?",
+            (kind, tmdb_id)
+        ).fetchone()
+        if title is None:
+            return None
+        title_id = title[0]
+
+        checked = dict(self.conn.execute(
+            "SELECT source, checked_at FROM poster_checks WHERE title_id = ? AND language IS ?",
+            (title_id, language)
+        ).fetchall())
+
+        by_source = {source: [] for source in checked}
+        for source, url, width, height, vote_count in self.conn.execute(
+            """
+            SELECT source, url, width, height, vote_count FROM posters
+            WHERE title_id = ? AND language IS ? AND current = 1
+            ORDER BY source, rank
+            """,
+            (title_id, language)
+        ):
+            by_source.setdefault(source, []).append(
+                {"url": url, "width": width, "height": height, "vote_count": vote_count}
+            )
+
+        if not by_source:
+            return None
+
+        info = {"title": title[1], "release_date": title[2], "popularity": title[3]}
+        return info, by_source, checked
+
+    # ---- export ---------------------------------------
+    def query_view(self, view, columns, run_id=None, language=None):
+        """
+        Rows of `view`: the current posters, or (run_id) the ones that run
+        recorded, optionally in one language.
+        """
+        sql = f"SELECT {', '.join(columns)} FROM {view} WHERE 1 = 1"
+        params = []
+        if run_id is not None:
+            sql += " AND run_id = ?"
+            params.append(run_id)
+        else:
+            sql += " AND current = 1"
+        if language is not None:
+            sql += " AND language = ?"
+            params.append(language)
+
+        return self.conn.execute(sql, params)
+
+    def export_csv(self, view, path, run_id=None, language=None):
+        """Write `view` in its CSV layout (optionally one run / one language)."""
+        columns = VIEW_COLUMNS[view]
+        rows = self.query_view(view, columns, run_id, language)
+
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            count = 0
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+
+        return count
+
+
+def split_cast(cast_str):
+    return [n.strip() for n in (cast_str or "").split("|") if n.strip()]
+
+
+# ---------------------------------------------
+# CLI: export a view to CSV
+# ---------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a catalog view in its CSV layout")
+    parser.add_argument("view", choices=sorted(VIEW_COLUMNS))
+    parser.add_argument("output")
+    parser.add_argument("--db", default=CATALOG_PATH)
+    parser.add_argument("--run", type=int, help="only rows written by this run id (default: the current posters)")
+    parser.add_argument("--language", help="only posters in this language (iso_639_1)")
+    args = parser.parse_args(argv)
+
+    catalog = Catalog(args.db)
+    count = catalog.export_csv(args.view, args.output, args.run, args.language)
+    catalog.close()
+
+    print(f"Exported {count} rows from {args.view} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
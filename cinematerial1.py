@@ -1,20 +1,20 @@
 import os
 import re
-import time
+import threading
 import json
-import base64
+import argparse
 import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 import pytesseract
 from io import BytesIO
 from PIL import Image
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
-# Crypto imports
-from Crypto.Cipher import AES
-from Crypto.Protocol.KDF import PBKDF2
-from Crypto.Hash import SHA1, SHA256, SHA512
+from cinematerial_state import CrawlState
+from cookie_crypto import CookieDecryptError, decrypt_cookie_editor, export_format
+from html_extract import get_backend
+from polite_crawler import PoliteFetcher
 
 # ==========================================
 # CONFIG
@@ -26,6 +26,22 @@ TV_URL = "https://www.cinematerial.com/tv"
 OUTPUT_DIR = r"C:\CineMaterialTV"
 CSV_OUTPUT = "cinematerial_tvshows.csv"
 
+# Incremental crawl (default; --full re-walks everything): show page
+# validators/fingerprints and downloaded posters are kept here
+STATE_DB = os.path.join(OUTPUT_DIR, "crawl_state.db")
+INCREMENTAL = True
+
+# Crawler: connections per host and the delay each connection keeps
+# between its own requests (listing/show pages and the image host alike)
+MAX_PER_HOST = 4
+POLITE_DELAY = 1.0
+
+# Posters are written to disk in chunks of this size while downloading
+DOWNLOAD_CHUNK = 64 * 1024
+
+# HTML extraction: auto | selectolax | lxml | strainer | soup (see html_extract.py)
+EXTRACT_BACKEND = "auto"
+
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -35,44 +51,13 @@ session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
 })
 
-
-# ==========================================
-# UNIVERSAL COOKIE EDITOR DECRYPTION
-# ==========================================
-
-def try_decrypt(ciphertext_b64, password, hash_mod):
-    blob = base64.b64decode(ciphertext_b64)
-
-    salt = blob[:16]
-    iv = blob[16:28]
-    enc = blob[28:]
-
-    key = PBKDF2(password, salt, dkLen=32, count=100000, hmac_hash_module=hash_mod)
-
-    cipher = AES.new(key, AES.MODE_GCM, iv)
-
-    try:
-        dec = cipher.decrypt(enc)
-        return dec.decode("utf-8", errors="ignore")
-    except Exception:
-        return None
-
-
-def decrypt_cookie_editor(ciphertext_b64, password):
-    hashes = [SHA256, SHA1, SHA512]
-
-    for h in hashes:
-        print(f"[*] Trying PBKDF2 with {h.__name__} ...")
-        out = try_decrypt(ciphertext_b64, password, h)
-        if out:
-            print(f"[+] Successfully decrypted using {h.__name__}")
-            return out
-
-    raise Exception("Unable to decrypt cookies.json: No valid hash algorithm worked.")
+listing_links, poster_srcs = get_backend(EXTRACT_BACKEND)
 
 
 # ==========================================
 # LOAD ENCRYPTED COOKIES
+# Candidate PBKDF2 keys are derived on parallel threads and checked
+# against the GCM tag (see cookie_crypto.py)
 # ==========================================
 
 def load_encrypted_cookies(path="cookies.json"):
@@ -87,7 +72,10 @@ def load_encrypted_cookies(path="cookies.json"):
 
     password = input("Enter Cookie Editor password: ").strip()
 
-    decrypted = decrypt_cookie_editor(ciphertext, password)
+    try:
+        decrypted = decrypt_cookie_editor(ciphertext, password, export_format(raw))
+    except CookieDecryptError as e:
+        raise Exception(f"Unable to decrypt cookies.json: {e}")
     cookies = json.loads(decrypted)
 
     added = 0
@@ -109,77 +97,86 @@ def load_encrypted_cookies(path="cookies.json"):
 # SCRAPE TV LISTING PAGES
 # ==========================================
 
-def get_tv_show_pages():
-    results = []
+def parse_listing(html):
+    return [(title, urljoin(BASE_URL, href)) for title, href in listing_links(html)]
+
+
+def iter_listing_pages(fetch):
+    """Yields the (title, show_url) list of each listing page until an empty one."""
     page = 1
 
     while True:
-        url = f"{TV_URL}?page={page}"
         print(f"[*] Getting page {page} ...")
-
-        r = session.get(url)
-        soup = BeautifulSoup(r.text, "html.parser")
-
-        links = soup.select(".media-box-title a")
-        if not links:
+        shows = parse_listing(fetch(f"{TV_URL}?page={page}").text)
+        if not shows:
             print("[*] No more pages.")
-            break
-
-        for link in links:
-            title = link.text.strip()
-            full = urljoin(BASE_URL, link["href"])
-            results.append((title, full))
+            return
 
+        yield shows
         page += 1
-        time.sleep(1)
-
-    print(f"[+] Found {len(results)} shows.")
-    return results
 
 
 # ==========================================
 # GET POSTER URLs
 # ==========================================
 
-def get_poster_urls(show_url):
-    r = session.get(show_url)
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    posters = []
-    for img in soup.select(".poster img"):
-        src = img.get("src")
-        if src:
-            posters.append(src.replace("t_poster", "l_poster"))
-
-    return posters
+def parse_poster_urls(html):
+    return [src.replace("t_poster", "l_poster") for src in poster_srcs(html)]
 
 
 # ==========================================
 # DOWNLOAD POSTER
+# The original bytes are streamed to disk as they arrive (no PIL
+# re-encode) and decoded once from memory; OCR gets the bottom crop of
+# that same decode instead of reading the file back.
 # ==========================================
 
-def download_image(url, title):
+def poster_path(url, title):
     filename = f"{title}_{os.path.basename(url)}".replace(" ", "_")
-    path = os.path.join(OUTPUT_DIR, filename)
+    return os.path.join(OUTPUT_DIR, filename)
+
+
+def credit_crop(img):
+    """Bottom 20% of the poster, where the billing block sits."""
+    w, h = img.size
+    return img.crop((0, int(h * 0.8), w, h))
+
+
+def _stream_to_file(resp, path):
+    resp.raise_for_status()
+
+    chunks = []
+    with open(path + ".part", "wb") as f:
+        for chunk in resp.iter_content(DOWNLOAD_CHUNK):
+            f.write(chunk)
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def download_poster(url, title, fetcher):
+    """(local_path, credit crop) — ("", None) if the download is not an image."""
+    path = poster_path(url, title)
 
     try:
-        img = Image.open(BytesIO(session.get(url).content))
-        img.save(path)
-        return path
-    except:
-        return ""
+        data = fetcher.get(url, stream=True, consume=lambda r: _stream_to_file(r, path))
+
+        with Image.open(BytesIO(data)) as img:
+            crop = credit_crop(img)
+    except Exception:
+        if os.path.exists(path + ".part"):
+            os.remove(path + ".part")
+        return "", None
+
+    os.replace(path + ".part", path)
+    return path, crop
 
 
 # ==========================================
 # OCR CAST + YEAR
 # ==========================================
 
-def extract_cast_and_year(path):
+def ocr_cast_and_year(crop):
     try:
-        img = Image.open(path)
-        w, h = img.size
-        crop = img.crop((0, int(h * 0.8), w, h))
-
         text = pytesseract.image_to_string(crop)
 
         cast = re.findall(r"[A-Z][a-z]+ [A-Z][a-z]+", text)
@@ -191,35 +188,150 @@ def extract_cast_and_year(path):
 
 
 # ==========================================
-# MAIN
+# CONCURRENT CRAWL
+# listing -> show pages -> poster download + OCR, pipelined: show pages
+# start while later listing pages are still being read, posters while
+# other show pages are still loading. PoliteFetcher keeps every host at
+# MAX_PER_HOST connections with POLITE_DELAY between requests on each.
 # ==========================================
 
-def main():
-    load_encrypted_cookies("cookies.json")
-
-    shows = get_tv_show_pages()
+def process_poster(fetcher, title, url):
+    local_path, crop = download_poster(url, title, fetcher)
+    cast, year = ocr_cast_and_year(crop) if crop is not None else ("", "")
+
+    return {
+        "title": title,
+        "image_url": url,
+        "local_file": local_path,
+        "cast_detected": cast,
+        "year_detected": year
+    }
+
+
+def crawl(max_per_host=MAX_PER_HOST, delay=POLITE_DELAY, state=None):
+    """
+    With a CrawlState, show pages are fetched conditionally, only posters
+    not stored yet are downloaded, and — once an earlier run has walked
+    the whole listing — pagination stops at the first listing page that
+    holds nothing but known shows.
+    """
+    fetcher = PoliteFetcher(session, max_per_host, delay)
+
+    # Threads only wait on the fetcher's slots; the poster pool also runs OCR
+    page_pool = ThreadPoolExecutor(max_workers=max_per_host)
+    poster_pool = ThreadPoolExecutor(max_workers=max_per_host + (os.cpu_count() or 1))
+
+    def process_poster_and_record(title, show_url, url, stored=None):
+        row = process_poster(fetcher, title, url)
+        if state is not None:
+            state.record_poster(show_url, row)
+        if stored is not None and row["local_file"]:
+            stored()
+        return row
+
+    def completion_counter(url, headers, all_posters, count):
+        """Calls show_complete() from the worker that stores the show's last poster."""
+        left = [count]
+        lock = threading.Lock()
+
+        def stored():
+            with lock:
+                left[0] -= 1
+                last = left[0] == 0
+            if last:
+                state.show_complete(url, headers, all_posters)
+
+        return stored
+
+    def process_show(title, url):
+        headers = state.conditional_headers(url) if state is not None else {}
+        try:
+            r = fetcher.get(url, headers=headers)
+        except requests.RequestException as e:
+            print(f"[!] {title}: show page failed ({e})")
+            return []
+
+        if r.status_code == 304:
+            state.not_modified(url)
+            return []
+        if r.status_code != 200:
+            # Leaves the stored state alone: the next run asks again
+            print(f"[!] {title}: show page answered {r.status_code}")
+            return []
+
+        all_posters = parse_poster_urls(r.text)
+        posters = all_posters
+        if state is not None:
+            posters = state.update_show(url, title, all_posters)
+
+        print(f"[*] {title}: {len(posters)} posters")
+        stored = None
+        if state is not None:
+            # A failed, raising or cancelled download never counts down, so
+            # the page keeps no validators and is read in full next time
+            if posters:
+                stored = completion_counter(url, r.headers, all_posters, len(posters))
+            else:
+                state.show_complete(url, r.headers, all_posters)
+        return [poster_pool.submit(process_poster_and_record, title, url, p, stored) for p in posters]
+
+    # An interrupted first walk leaves the later pages unknown: keep going
+    # to the end of the listing until one walk has got there
+    early_stop = state is not None and state.listing_walked()
+
+    show_futures = []
+    try:
+        for shows in iter_listing_pages(fetcher.get):
+            # Decided before the page's shows are recorded by the workers
+            all_known = early_stop and all(state.known_show(u) for _, u in shows)
+
+            show_futures.extend(page_pool.submit(process_show, t, u) for t, u in shows)
+            if all_known:
+                print("[*] Only known shows on this page — stopping pagination.")
+                break
+        else:
+            if state is not None:
+                state.mark_listing_walked()
+        print(f"[+] Found {len(show_futures)} shows.")
+
+        # Same order as the listing (and each show's poster order)
+        rows = [f.result() for sf in show_futures for f in sf.result()]
+    finally:
+        page_pool.shutdown(wait=False, cancel_futures=True)
+        poster_pool.shutdown(wait=False, cancel_futures=True)
+
+    print(f"[+] Crawl: {fetcher.report()}")
+    if state is not None:
+        print(f"[+] Incremental: {state.report()}, {len(rows)} posters downloaded")
+    return rows
 
-    rows = []
 
-    for title, url in shows:
-        print(f"\n[*] Processing: {title}")
+# ==========================================
+# MAIN
+# ==========================================
 
-        posters = get_poster_urls(url)
-        for p in posters:
-            print("    Poster:", p)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CineMaterial TV poster scraper")
+    parser.add_argument("--full", action="store_true",
+                        help="re-walk every listing/show page and re-download every poster")
+    parser.add_argument("--state", default=STATE_DB, help="incremental crawl state database")
+    return parser.parse_args(argv)
 
-            local_path = download_image(p, title)
-            cast, year = extract_cast_and_year(local_path)
 
-            rows.append({
-                "title": title,
-                "image_url": p,
-                "local_file": local_path,
-                "cast_detected": cast,
-                "year_detected": year
-            })
+def main(argv=None):
+    args = parse_args(argv)
+    load_encrypted_cookies("cookies.json")
 
-            time.sleep(0.5)
+    if INCREMENTAL and not args.full:
+        state = CrawlState(args.state)
+        try:
+            crawl(state=state)
+            # New posters plus everything downloaded on earlier runs
+            rows = state.rows()
+        finally:
+            state.close()
+    else:
+        rows = crawl()
 
     pd.DataFrame(rows).to_csv(CSV_OUTPUT, index=False)
     print("\n[+] DONE! CSV saved:", CSV_OUTPUT)
@@ -0,0 +1,178 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+# ---------------------------------------------
+# Incremental CineMaterial crawl state (SQLite)
+#
+# Per show page: ETag / Last-Modified (sent back as If-None-Match /
+# If-Modified-Since, so unchanged pages come back as an empty 304) and a
+# fingerprint of its poster list. Per poster: the local file and the OCR
+# result, so a re-run only downloads posters it has not stored yet and
+# can still write the complete CSV.
+#
+# A page's validators are only stored once every one of its posters is on
+# disk (show_complete): a crash or a failed download must not turn the
+# next visit into a 304 that hides the posters still missing. Likewise the
+# crawl only stops paginating early once one walk has reached the end of
+# the listing (listing_walked).
+# ---------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shows (
+    url           TEXT PRIMARY KEY,
+    title         TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    fingerprint   TEXT,
+    last_checked  REAL
+);
+
+CREATE TABLE IF NOT EXISTS posters (
+    url           TEXT PRIMARY KEY,
+    show_url      TEXT NOT NULL,
+    title         TEXT,
+    local_file    TEXT,
+    cast_detected TEXT,
+    year_detected TEXT,
+    downloaded_at REAL
+);
+CREATE INDEX IF NOT EXISTS posters_show ON posters (show_url);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def poster_fingerprint(poster_urls):
+    return hashlib.sha1("\n".join(sorted(poster_urls)).encode("utf-8")).hexdigest()
+
+
+class CrawlState:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Shared by the crawler's worker threads, one statement at a time
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+        self.unchanged = 0
+        self.changed = 0
+        self.new = 0
+
+    def close(self):
+        self._conn.close()
+
+    def known_show(self, url):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM shows WHERE url = ?", (url,)).fetchone() is not None
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since for a show page whose posters are all stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM shows WHERE url = ?", (url,)
+            ).fetchone()
+
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def listing_walked(self):
+        """True once a crawl has read the listing up to its last page."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM meta WHERE key = 'listing_walked'"
+            ).fetchone() is not None
+
+    def mark_listing_walked(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('listing_walked', ?)",
+                (str(time.time()),)
+            )
+
+    def not_modified(self, url):
+        """The server answered 304 for this show page."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE shows SET last_checked = ? WHERE url = ?", (time.time(), url))
+            self.unchanged += 1
+
+    def update_show(self, url, title, poster_urls):
+        """
+        A show page came back 200: returns the posters not downloaded yet.
+        Its old validators are dropped until show_complete() stores the new ones.
+        """
+        fp = poster_fingerprint(poster_urls)
+
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT fingerprint FROM shows WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                self.new += 1
+            elif row[0] == fp:
+                self.unchanged += 1
+            else:
+                self.changed += 1
+
+            self._conn.execute(
+                """
+                INSERT INTO shows (url, title, last_checked) VALUES (?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    title = excluded.title, etag = NULL, last_modified = NULL,
+                    last_checked = excluded.last_checked
+                """,
+                (url, title, time.time())
+            )
+
+            stored = {
+                u for (u,) in self._conn.execute(
+                    "SELECT url FROM posters WHERE show_url = ? AND local_file != ''", (url,)
+                )
+            }
+
+        return [p for p in poster_urls if p not in stored]
+
+    def show_complete(self, url, headers, poster_urls):
+        """Every poster of the page is stored: keep its validators + fingerprint."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE shows SET etag = ?, last_modified = ?, fingerprint = ? WHERE url = ?",
+                (headers.get("ETag"), headers.get("Last-Modified"), poster_fingerprint(poster_urls), url)
+            )
+
+    def record_poster(self, show_url, row):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO posters
+                    (url, show_url, title, local_file, cast_detected, year_detected, downloaded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (row["image_url"], show_url, row["title"], row["local_file"],
+                 row["cast_detected"], row["year_detected"], time.time())
+            )
+
+    def rows(self):
+        """Every stored poster in the CSV's column layout."""
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                SELECT title, url, local_file, cast_detected, year_detected
+                FROM posters ORDER BY title, url
+                """
+            )
+            return [
+                {"title": t, "image_url": u, "local_file": f, "cast_detected": c, "year_detected": y}
+                for t, u, f, c, y in cur
+            ]
+
+    def report(self):
+        return (f"{self.new} new shows, {self.changed} with changed poster lists, "
+                f"{self.unchanged} unchanged")
+
@@ -0,0 +1,119 @@
+import base64
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from Crypto.Cipher import AES
+
+# ---------------------------------------------
+# Cookie Editor export decryption
+#
+# Exports are base64(salt[16] | iv[12] | ciphertext | GCM tag[16]) with an
+# AES-256 key from PBKDF2. Which PBKDF2 hash a given export uses is not
+# stored in the file, so every candidate in KDF_VARIANTS is derived on its
+# own thread (hashlib.pbkdf2_hmac releases the GIL) and the right one is
+# picked by the GCM tag (decrypt_and_verify) — a wrong key can no longer
+# "succeed" with garbage. The first key that verifies is returned without
+# waiting for the other derivations to finish.
+# The winning variant is remembered per export format, so later unlocks
+# in the same session derive one key (and an already derived key is reused).
+# ---------------------------------------------
+
+SALT_BYTES = 16
+IV_BYTES = 12
+TAG_BYTES = 16
+KEY_BYTES = 32
+
+# (hash, iterations), most common first
+KDF_VARIANTS = [
+    ("sha256", 100000),
+    ("sha1", 100000),
+    ("sha512", 100000),
+]
+
+
+class CookieDecryptError(Exception):
+    pass
+
+
+# export format -> KDF variant that worked for it
+_known_variants = {}
+
+# (password digest, salt, variant) -> derived key, for this session only
+_keys = {}
+
+
+def export_format(raw):
+    """What identifies an export format: its top-level fields (+ version, if any)."""
+    return tuple(sorted(raw)), raw.get("version")
+
+
+def split_blob(ciphertext_b64):
+    blob = base64.b64decode(ciphertext_b64)
+    if len(blob) < SALT_BYTES + IV_BYTES + TAG_BYTES:
+        raise CookieDecryptError("encrypted data is too short")
+
+    salt = blob[:SALT_BYTES]
+    iv = blob[SALT_BYTES:SALT_BYTES + IV_BYTES]
+    enc = blob[SALT_BYTES + IV_BYTES:]
+    return salt, iv, enc[:-TAG_BYTES], enc[-TAG_BYTES:]
+
+
+def derive_key(password, salt, variant):
+    hash_name, iterations = variant
+    return hashlib.pbkdf2_hmac(hash_name, password.encode("utf-8"), salt, iterations, KEY_BYTES)
+
+
+def _key_id(password, salt, variant):
+    return hashlib.sha256(password.encode("utf-8")).digest(), salt, variant
+
+
+def _cached_key(password, salt, variant):
+    key_id = _key_id(password, salt, variant)
+    if key_id not in _keys:
+        _keys[key_id] = derive_key(password, salt, variant)
+    return _keys[key_id]
+
+
+def _open(key, iv, ciphertext, tag):
+    """Plaintext, or None if the GCM tag does not match (wrong key)."""
+    try:
+        return AES.new(key, AES.MODE_GCM, iv).decrypt_and_verify(ciphertext, tag)
+    except ValueError:
+        return None
+
+
+def decrypt_cookie_editor(ciphertext_b64, password, fmt=None):
+    """Decrypted text of a Cookie Editor export; raises CookieDecryptError."""
+    salt, iv, ciphertext, tag = split_blob(ciphertext_b64)
+
+    # Known format: one derivation (or none, for the same file again)
+    known = _known_variants.get(fmt)
+    if known is not None:
+        out = _open(_cached_key(password, salt, known), iv, ciphertext, tag)
+        if out is not None:
+            return out.decode("utf-8")
+
+    candidates = [v for v in KDF_VARIANTS if v != known]
+    pool = ThreadPoolExecutor(max_workers=len(candidates))
+    try:
+        pending = {pool.submit(derive_key, password, salt, v): v for v in candidates}
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                variant = pending.pop(future)
+                key = future.result()
+
+                out = _open(key, iv, ciphertext, tag)
+                if out is None:
+                    continue
+
+                _known_variants[fmt] = variant
+                _keys[_key_id(password, salt, variant)] = key
+                print(f"[+] Decrypted using PBKDF2-{variant[0].upper()} ({variant[1]} iterations)")
+                return out.decode("utf-8")
+    finally:
+        # Not a `with` block: that would wait for the losing derivations
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    raise CookieDecryptError("wrong password, or a key derivation this script does not know")
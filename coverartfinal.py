@@ -1,14 +1,22 @@
 import os
 import re
+import math
 import time
 import json
 import base64
 import random
+import asyncio
+import argparse
+import threading
 import requests
 import pandas as pd
 from urllib.parse import quote
 from tqdm import tqdm
 
+from crawl_plan import Plan, record_session, save_stats_on_exit, stats
+from musicbrainz_client import TokenBucket
+from retry_queue import retry_after_header
+
 # ======================================================
 # YOUR SPOTIFY CREDENTIALS
 # ======================================================
@@ -48,25 +56,100 @@ CHECKPOINT_ALBUMS_JSONL = os.path.join(OUTPUT_DIR, "checkpoint_album_rows.jsonl"
 
 HEADERS_COMMON = {"User-Agent": "SpotifyFamousArtistsScraper/1.0 (research@example.com)"}
 
+# Candidate pool size before picking the top TARGET_ARTISTS
+CANDIDATE_ARTISTS = 4000
+
+# Artist resolution: concurrent searches sharing one rate limit (requests/s,
+# burst); a 429 pauses every worker for the Retry-After Spotify sends
+RESOLVE_WORKERS = 8
+SPOTIFY_RATE = (10.0, 10)
+SPOTIFY_MAX_RETRIES = 3
+
+# Refresh the bearer token this long before it expires (tokens last 1h)
+TOKEN_REFRESH_MARGIN = 120
+
+# Pooled connections; every response also feeds the --plan statistics
+session = record_session(requests.Session())
+
 # ======================================================
 # Spotify Auth
 # ======================================================
-def get_spotify_token() -> str:
+class SpotifyAuthError(RuntimeError):
+    """No token (bad credentials?), or a fresh token still answered 401: stops the run."""
+
+class SpotifyRateLimited(RuntimeError):
+    """Still 429 after SPOTIFY_MAX_RETRIES shared pauses: stops the run (resume later)."""
+
+def request_spotify_token() -> tuple[str, int]:
+    """(access token, seconds until it expires)"""
     auth = base64.b64encode(
         f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}".encode("utf-8")
     ).decode("utf-8")
 
-    r = requests.post(
+    r = session.post(
         "https://accounts.spotify.com/api/token",
         headers={"Authorization": f"Basic {auth}", **HEADERS_COMMON},
         data={"grant_type": "client_credentials"},
         timeout=30
     )
-    r.raise_for_status()
-    return r.json()["access_token"]
+    if r.status_code != 200:
+        raise SpotifyAuthError(f"token request failed: HTTP {r.status_code} {r.text[:200]}")
+    data = r.json()
+    return data["access_token"], int(data.get("expires_in", 3600))
+
+def get_spotify_token() -> str:
+    return request_spotify_token()[0]
+
+class SpotifyToken:
+    """
+    Bearer token fetched on first use (not at import, so --plan never touches
+    the network) and refreshed shortly before it expires or after a 401.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
 
-TOKEN = get_spotify_token()
-SPOTIFY_HEADERS = {"Authorization": f"Bearer {TOKEN}", **HEADERS_COMMON}
+    def headers(self, stale: str | None = None) -> dict:
+        """Auth headers; `stale` = a token that just got a 401 (refreshed once, not per thread)."""
+        with self._lock:
+            expired = time.time() > self._expires_at - TOKEN_REFRESH_MARGIN
+            if self._token is None or expired or self._token == stale:
+                self._token, expires_in = request_spotify_token()
+                self._expires_at = time.time() + expires_in
+            return {"Authorization": f"Bearer {self._token}", **HEADERS_COMMON}
+
+spotify_token = SpotifyToken()
+spotify_rate = TokenBucket(*SPOTIFY_RATE)
+
+def spotify_headers() -> dict:
+    return spotify_token.headers()
+
+def spotify_get(url: str, params: dict, timeout: int = 20) -> requests.Response:
+    """
+    GET against the Spotify Web API through the shared rate limit:
+    429 -> everyone waits Retry-After, 401 -> token refreshed, then retried.
+    Raises SpotifyRateLimited / SpotifyAuthError once the retries are used up;
+    other answers (5xx included) are returned for the caller to check.
+    """
+    for attempt in range(SPOTIFY_MAX_RETRIES + 1):
+        headers = spotify_headers()
+        spotify_rate.acquire()
+        r = session.get(url, headers=headers, params=params, timeout=timeout)
+
+        if attempt == SPOTIFY_MAX_RETRIES:
+            if r.status_code == 429:
+                raise SpotifyRateLimited(f"{url}: still HTTP 429 after {attempt} retries")
+            if r.status_code == 401:
+                raise SpotifyAuthError(f"{url}: HTTP 401 with a refreshed token")
+            return r
+        if r.status_code == 429:
+            spotify_rate.pause(retry_after_header(r) or 2.0 ** attempt)
+        elif r.status_code == 401:
+            spotify_token.headers(stale=headers["Authorization"].split(" ", 1)[1])
+        else:
+            return r
 
 # ======================================================
 # Helpers
@@ -124,7 +207,7 @@ def fetch_archive_artist_seeds(target_items: int) -> set[str]:
             "page": page,
             "output": "json",
         }
-        r = requests.get(url, params=params, headers=HEADERS_COMMON, timeout=30)
+        r = session.get(url, params=params, headers=HEADERS_COMMON, timeout=30)
         r.raise_for_status()
         docs = r.json().get("response", {}).get("docs", [])
         if not docs:
@@ -182,7 +265,7 @@ def fetch_wikipedia_artist_seeds() -> set[str]:
 
     for page in WIKI_SEED_PAGES:
         try:
-            r = requests.get(page, headers=HEADERS_COMMON, timeout=30)
+            r = session.get(page, headers=HEADERS_COMMON, timeout=30)
             r.raise_for_status()
             html = r.text
             for t in extract_link_text(html):
@@ -206,53 +289,49 @@ def fetch_wikipedia_artist_seeds() -> set[str]:
 # ======================================================
 def spotify_search_artist(name: str) -> dict | None:
     """
-    Returns best Spotify artist object for a name, or None.
+    Returns best Spotify artist object for a name, or None if nothing matches.
     Strategy:
       - search top 5 results
       - pick the result with best name similarity, break ties by popularity
+    A failed search is not a miss: 5xx / network errors raise
+    requests.RequestException, auth and rate-limit exhaustion the Spotify* errors.
     """
     q = name.strip()
     if not q:
         return None
 
-    try:
-        r = requests.get(
-            "https://api.spotify.com/v1/search",
-            headers=SPOTIFY_HEADERS,
-            params={"q": q, "type": "artist", "limit": 5},
-            timeout=20
-        )
-        if r.status_code != 200:
-            return None
-
-        items = r.json().get("artists", {}).get("items", [])
-        if not items:
-            return None
-
-        target = norm_name(name)
-
-        def score(a):
-            an = norm_name(a.get("name", ""))
-            # similarity proxy: exact match gets huge boost, else token overlap
-            if an == target:
-                sim = 100
-            else:
-                tset = set(target.split())
-                aset = set(an.split())
-                sim = int(100 * (len(tset & aset) / max(1, len(tset | aset))))
-            pop = a.get("popularity") or 0
-            return (sim, pop)
-
-        best = max(items, key=score)
-        # require at least some similarity, unless artist is extremely popular
-        sim, pop = score(best)
-        if sim < 30 and pop < 60:
-            return None
-
-        return best
-    except Exception:
+    r = spotify_get(
+        "https://api.spotify.com/v1/search",
+        params={"q": q, "type": "artist", "limit": 5}
+    )
+    r.raise_for_status()
+
+    items = r.json().get("artists", {}).get("items", [])
+    if not items:
         return None
 
+    target = norm_name(name)
+
+    def score(a):
+        an = norm_name(a.get("name", ""))
+        # similarity proxy: exact match gets huge boost, else token overlap
+        if an == target:
+            sim = 100
+        else:
+            tset = set(target.split())
+            aset = set(an.split())
+            sim = int(100 * (len(tset & aset) / max(1, len(tset | aset))))
+        pop = a.get("popularity") or 0
+        return (sim, pop)
+
+    best = max(items, key=score)
+    # require at least some similarity, unless artist is extremely popular
+    sim, pop = score(best)
+    if sim < 30 and pop < 60:
+        return None
+
+    return best
+
 # ======================================================
 # Spotify: Get top albums (most "famous") for an artist
 # ======================================================
@@ -260,45 +339,163 @@ def spotify_top_albums_for_artist(artist_name: str, limit: int = 5) -> list[dict
     """
     Uses Spotify album search for the artist name.
     Search ranking tends to surface the most famous albums first.
+    Raises like spotify_search_artist when the search itself fails.
     """
-    try:
-        r = requests.get(
-            "https://api.spotify.com/v1/search",
-            headers=SPOTIFY_HEADERS,
-            params={
-                "q": f'artist:"{artist_name}"',
-                "type": "album",
-                "limit": 15
-            },
-            timeout=20
-        )
-        if r.status_code != 200:
-            return []
-
-        albums = r.json().get("albums", {}).get("items", [])
-        if not albums:
-            return []
-
-        # Deduplicate by album name
-        seen = set()
-        uniq = []
-        for a in albums:
-            nm = (a.get("name") or "").strip().lower()
-            if not nm or nm in seen:
-                continue
-            seen.add(nm)
-            uniq.append(a)
-            if len(uniq) >= limit:
-                break
+    r = spotify_get(
+        "https://api.spotify.com/v1/search",
+        params={
+            "q": f'artist:"{artist_name}"',
+            "type": "album",
+            "limit": 15
+        }
+    )
+    r.raise_for_status()
+
+    albums = r.json().get("albums", {}).get("items", [])
+
+    # Deduplicate by album name
+    seen = set()
+    uniq = []
+    for a in albums:
+        nm = (a.get("name") or "").strip().lower()
+        if not nm or nm in seen:
+            continue
+        seen.add(nm)
+        uniq.append(a)
+        if len(uniq) >= limit:
+            break
 
-        return uniq
-    except Exception:
-        return []
+    return uniq
 
 # ======================================================
 # MAIN PIPELINE
 # ======================================================
-def main():
+# ======================================================
+# Concurrent artist resolution
+# ======================================================
+async def resolve_artists(seeds: list[str], artists_by_id: dict, ck, target: int = CANDIDATE_ARTISTS):
+    """
+    RESOLVE_WORKERS searches in flight (blocking requests on worker threads),
+    paced together by spotify_rate. Results are handled on the event loop,
+    so artists_by_id and the checkpoint need no locking.
+
+    Searches that fail (5xx, network) are counted apart from names with no
+    match; neither is checkpointed, so both are searched again next run.
+    Auth errors and rate-limit exhaustion propagate and stop the run.
+    Returns {"found", "no_match", "failed"}.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=RESOLVE_WORKERS * 2)
+    progress = tqdm(total=len(seeds), desc="🎤 Artist lookup")
+    counts = {"found": 0, "no_match": 0, "failed": 0}
+
+    async def feed():
+        for name in seeds:
+            await queue.put(name)
+        for _ in range(RESOLVE_WORKERS):
+            await queue.put(None)
+
+    async def worker():
+        while len(artists_by_id) < target:
+            name = await queue.get()
+            if name is None:
+                return
+
+            try:
+                a = await asyncio.to_thread(spotify_search_artist, name)
+            except requests.RequestException as e:
+                counts["failed"] += 1
+                tqdm.write(f"[ERROR] Spotify search for {name!r} failed: {e}")
+                continue
+            finally:
+                progress.update(1)
+
+            counts["found" if a else "no_match"] += 1
+            is_new = bool(a) and a["id"] not in artists_by_id
+            stats.observe_value("coverartfinal.seed_resolve_rate", float(is_new))
+            if not is_new or len(artists_by_id) >= target:
+                continue
+
+            sid = a["id"]
+            artists_by_id[sid] = {
+                "spotify_id": sid,
+                "name": a.get("name"),
+                "popularity": a.get("popularity"),
+                "genres": a.get("genres", []),
+                "followers": (a.get("followers") or {}).get("total"),
+                "seed_used": name
+            }
+            ck.write(json.dumps(artists_by_id[sid], ensure_ascii=False) + "\n")
+            ck.flush()
+
+    feeder = asyncio.create_task(feed())
+    try:
+        # Workers stop at the target (more than enough candidates to select
+        # the top 1000) or when the seeds run out
+        await asyncio.gather(*(worker() for _ in range(RESOLVE_WORKERS)))
+    finally:
+        feeder.cancel()
+        progress.close()
+
+    return counts
+
+def read_checkpoint_ids(path: str, key: str) -> set:
+    ids = set()
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ids.add(json.loads(line).get(key))
+                except ValueError:
+                    continue
+    ids.discard(None)
+    return ids
+
+def plan_crawl():
+    """--plan: estimate requests and time from recorded stats + the checkpoints, no network."""
+    plan = Plan("coverartfinal.py", workers=1)
+
+    archive_pages = math.ceil(ARCHIVE_SEED_ITEMS / ARCHIVE_ROWS_PER_PAGE)
+    plan.request_stage("archive.org seed pages", "archive.org/advancedsearch.php",
+                       archive_pages, pacing=0.25)
+    plan.request_stage("Wikipedia seed pages", "en.wikipedia.org/wiki/{page}",
+                       len(WIKI_SEED_PAGES), pacing=0.5)
+
+    resolved = read_checkpoint_ids(CHECKPOINT_ARTISTS_JSONL, "spotify_id")
+    missing = max(0, CANDIDATE_ARTISTS - len(resolved))
+    searches = missing / max(0.01, plan.value("coverartfinal.seed_resolve_rate"))
+    plan.request_stage("Spotify artist searches", "api.spotify.com/v1/search", searches,
+                       parallel=RESOLVE_WORKERS, rate=SPOTIFY_RATE[0])
+
+    done = read_checkpoint_ids(CHECKPOINT_ALBUMS_JSONL, "Artist Spotify ID")
+    artists = max(0, TARGET_ARTISTS - len(done))
+    plan.request_stage("Spotify album searches", "api.spotify.com/v1/search", artists,
+                       pacing=0.225)
+    plan.request_stage("/artists/{id}/albums fallback", "api.spotify.com/v1/artists/{id}/albums",
+                       artists * plan.value("coverartfinal.album_fallback_rate"))
+
+    plan.note(f"checkpoints: {len(resolved):,}/{CANDIDATE_ARTISTS:,} candidate artists, "
+              f"{len(done):,}/{TARGET_ARTISTS:,} artists with albums")
+    plan.note(f"artist searches: {RESOLVE_WORKERS} workers, at most {SPOTIFY_RATE[0]:.0f} req/s; "
+              "token requests are not counted")
+    plan.print()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Top Spotify artists + album covers")
+    parser.add_argument("--plan", action="store_true",
+                        help="estimate requests and time, then exit (no network)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.plan:
+        plan_crawl()
+        return
+
+    save_stats_on_exit()
+
+    # Fail early on bad credentials
+    spotify_headers()
+
     # 1) Build seed pool
     archive_seeds = fetch_archive_artist_seeds(ARCHIVE_SEED_ITEMS)
     wiki_seeds = fetch_wikipedia_artist_seeds()
@@ -323,34 +520,15 @@ def main():
         except Exception:
             pass
 
+    # Seeds searched on an earlier run are not searched again
+    used = {obj.get("seed_used") for obj in artists_by_id.values()}
+    seeds = [name for name in all_seeds if name not in used]
+
     print("🔎 Resolving seed names to Spotify artists (this builds the candidate pool)...")
     with open(CHECKPOINT_ARTISTS_JSONL, "a", encoding="utf-8") as ck:
-        for name in tqdm(all_seeds, desc="🎤 Artist lookup"):
-            if len(artists_by_id) >= 4000:
-                # more than enough candidates to select top 1000
-                break
-
-            a = spotify_search_artist(name)
-            if not a:
-                continue
-
-            sid = a["id"]
-            if sid in artists_by_id:
-                continue
-
-            artists_by_id[sid] = {
-                "spotify_id": sid,
-                "name": a.get("name"),
-                "popularity": a.get("popularity"),
-                "genres": a.get("genres", []),
-                "followers": (a.get("followers") or {}).get("total"),
-                "seed_used": name
-            }
-            ck.write(json.dumps(artists_by_id[sid], ensure_ascii=False) + "\n")
-            ck.flush()
-
-            # small pacing to avoid search throttles
-            jitter_sleep(0.12)
+        counts = asyncio.run(resolve_artists(seeds, artists_by_id, ck))
+    print(f"🎤 Searches: {counts['found']} matched, {counts['no_match']} no match, "
+          f"{counts['failed']} failed (searched again on the next run)")
 
     if not artists_by_id:
         raise RuntimeError("No Spotify artists resolved. Check internet / credentials.")
@@ -371,6 +549,7 @@ def main():
     # Resume support for album rows
     album_rows = []
     done_artist_ids = set()
+    album_failures = 0
 
     if os.path.exists(CHECKPOINT_ALBUMS_JSONL):
         try:
@@ -389,16 +568,22 @@ def main():
             if artist_id in done_artist_ids:
                 continue
 
-            albums = spotify_top_albums_for_artist(a["name"], limit=ALBUMS_PER_ARTIST)
+            try:
+                albums = spotify_top_albums_for_artist(a["name"], limit=ALBUMS_PER_ARTIST)
+            except requests.RequestException as e:
+                # Not checkpointed: the next run tries this artist again
+                tqdm.write(f"[ERROR] Album search for {a['name']!r} failed: {e}")
+                album_failures += 1
+                continue
 
             # If album search is sparse for some artists, fall back to /artists/{id}/albums
-            if len(albums) < ALBUMS_PER_ARTIST:
+            fallback = len(albums) < ALBUMS_PER_ARTIST
+            stats.observe_value("coverartfinal.album_fallback_rate", float(fallback))
+            if fallback:
                 try:
-                    r = requests.get(
+                    r = spotify_get(
                         f"https://api.spotify.com/v1/artists/{artist_id}/albums",
-                        headers=SPOTIFY_HEADERS,
-                        params={"include_groups": "album", "market": "US", "limit": 50},
-                        timeout=20
+                        params={"include_groups": "album", "market": "US", "limit": 50}
                     )
                     if r.status_code == 200:
                         items = r.json().get("items", [])
@@ -412,8 +597,8 @@ def main():
                             seen.add(nm)
                             if len(albums) >= ALBUMS_PER_ARTIST:
                                 break
-                except Exception:
-                    pass
+                except requests.RequestException as e:
+                    tqdm.write(f"[WARN] Album list for {a['name']!r} failed: {e}")
 
             # Trim to 5
             albums = albums[:ALBUMS_PER_ARTIST]
@@ -440,6 +625,9 @@ def main():
             done_artist_ids.add(artist_id)
             jitter_sleep(0.15)
 
+    if album_failures:
+        print(f"[WARN] {album_failures} artists' album searches failed — run again to resume with them")
+
     # 5) Export Excel (5000-ish rows)
     df = pd.DataFrame(album_rows)
 
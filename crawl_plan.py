@@ -0,0 +1,349 @@
+import atexit
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse
+
+from id_exports import iter_export, latest_export, top_by_popularity
+
+# ---------------------------------------------
+# Response statistics + --plan estimates
+#
+# tmdb_http (and coverartfinal's session) record size and latency of
+# every response per endpoint, e.g. api.themoviedb.org/3/movie/{id}/images,
+# and the scripts record a few per-title facts (posters OCR'd per movie,
+# ...). The scripts with --plan merge their samples into STATS_PATH when
+# they exit (save_stats_on_exit); other importers only read it.
+#
+# `--plan` in tmdb.py, moviecreds.py, tvshowstmdb.py and coverartfinal.py
+# turns those numbers (or DEFAULTS while nothing is recorded yet) and the
+# local cache state into a stage-by-stage estimate of requests, bytes,
+# OCR calls and wall time — without a single network call.
+# ---------------------------------------------
+
+STATS_PATH = r"C:\openCVtraining\http_stats.json"
+
+# Old samples fade out so the estimates follow the current network
+MAX_SAMPLES = 5000
+
+# Another process holding the stats file lock longer than this has died
+LOCK_STALE_SECONDS = 30
+
+# Used until an endpoint has been observed: (bytes, seconds) per request
+DEFAULTS = {
+    "api.themoviedb.org/3/movie/popular": (25_000, 0.35),
+    "api.themoviedb.org/3/tv/popular": (25_000, 0.35),
+    "api.themoviedb.org/3/movie/{id}": (60_000, 0.45),
+    "api.themoviedb.org/3/tv/{id}": (60_000, 0.45),
+    "api.themoviedb.org/3/movie/{id}/images": (20_000, 0.3),
+    "api.themoviedb.org/3/tv/{id}/images": (20_000, 0.3),
+    "api.themoviedb.org/3/movie/{id}/credits": (40_000, 0.3),
+    "api.themoviedb.org/3/tv/{id}/credits": (40_000, 0.3),
+    "image.tmdb.org/t/p/original/{id}": (1_500_000, 0.9),
+    "ocr": (0, 1.5),
+    "archive.org/advancedsearch.php": (30_000, 1.2),
+    "en.wikipedia.org/wiki/{page}": (900_000, 1.0),
+    "api.spotify.com/v1/search": (12_000, 0.25),
+    "api.spotify.com/v1/artists/{id}/albums": (40_000, 0.3),
+}
+
+# Per-title facts (counts and ratios, not durations) until observed
+DEFAULT_VALUES = {
+    "movie.popular_kept_per_page": 12.0,
+    "tv.popular_kept_per_page": 19.0,
+    "moviecreds.posters_tried": 3.0,
+    "tvshowstmdb.posters_tried": 6.0,
+    "coverartfinal.seed_resolve_rate": 0.45,
+    "coverartfinal.album_fallback_rate": 0.3,
+}
+
+
+def endpoint_key(url):
+    """host + path with id-like segments (anything containing a digit) as {id}."""
+    parsed = urlparse(url)
+    host = parsed.netloc
+    if host == "en.wikipedia.org":
+        return "en.wikipedia.org/wiki/{page}"
+    if host == "image.tmdb.org":
+        return "image.tmdb.org/t/p/original/{id}"
+
+    parts = ["{id}" if re.search(r"\d", p) else p for p in parsed.path.split("/")]
+    # Keep numbered API versions (/3/, /v1/) as they are
+    if len(parts) > 1 and re.fullmatch(r"v?\d", parsed.path.split("/")[1]):
+        parts[1] = parsed.path.split("/")[1]
+    return host + "/".join(parts)
+
+
+class ResponseStats:
+    """
+    Running sums per key: {"count", "bytes", "seconds"} for responses and
+    work, {"count", "value"} for per-title facts. save() merges this
+    process's new samples into whatever is on disk by then, so parallel
+    workers add up instead of the last one to exit overwriting the rest.
+    """
+
+    def __init__(self, path=STATS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._read()
+        self._new = {}  # samples not saved yet
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _add(self, key, fields):
+        with self._lock:
+            for entries in (self._data, self._new):
+                _merge(entries, key, {"count": 1, **fields})
+
+    def observe(self, key, nbytes=0, seconds=0.0):
+        """One response / piece of work of `nbytes` taking `seconds`."""
+        self._add(key, {"bytes": nbytes, "seconds": seconds})
+
+    def observe_response(self, url, nbytes, seconds):
+        self.observe(endpoint_key(url), nbytes, seconds)
+
+    def observe_value(self, key, value):
+        """One per-title fact (posters OCR'd for a movie, 0/1 for a rate, ...)."""
+        self._add(key, {"value": float(value)})
+
+    def mean(self, key):
+        """(bytes, seconds, samples) per observation; DEFAULTS with 0 samples if unseen."""
+        with self._lock:
+            s = self._data.get(key)
+        if not s or not s["count"]:
+            nbytes, seconds = DEFAULTS.get(key, (0, 0.0))
+            return nbytes, seconds, 0
+        return s.get("bytes", 0) / s["count"], s.get("seconds", 0.0) / s["count"], s["count"]
+
+    def mean_value(self, key):
+        """(value, samples) of a per-title fact; DEFAULT_VALUES with 0 samples if unseen."""
+        with self._lock:
+            s = self._data.get(key)
+        if not s or not s["count"]:
+            return DEFAULT_VALUES.get(key, 0.0), 0
+        return s.get("value", 0.0) / s["count"], s["count"]
+
+    def save(self):
+        with self._lock:
+            if not self._new:
+                return
+            new, self._new = self._new, {}
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with _file_lock(self.path + ".lock"):
+            data = self._read()
+            for key, fields in new.items():
+                _merge(data, key, fields)
+
+            fd, tmp = tempfile.mkstemp(prefix=".http_stats.", suffix=".tmp", dir=folder or ".")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.remove(tmp)
+                raise
+
+        with self._lock:
+            # Pick up what the other processes saved meanwhile
+            for key, fields in self._new.items():
+                _merge(data, key, fields)
+            self._data = data
+
+
+def _merge(entries, key, fields):
+    """Add summed `fields` (with their "count") into entries[key], fading out old samples."""
+    s = entries.setdefault(key, {})
+    for field, n in fields.items():
+        s[field] = s.get(field, 0) + n
+
+    if s["count"] > MAX_SAMPLES:
+        scale = MAX_SAMPLES / 2 / s["count"]
+        for field in s:
+            s[field] *= scale
+        s["count"] = round(s["count"])
+
+
+@contextmanager
+def _file_lock(path, stale=LOCK_STALE_SECONDS):
+    """Cross-process lock: exclusive creation of a lock file (taken over once stale)."""
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > stale:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+stats = ResponseStats()
+
+
+def save_stats_on_exit():
+    """Merge this run's samples into STATS_PATH at exit (the scripts with --plan call this)."""
+    atexit.register(stats.save)
+
+
+def record_session(session):
+    """Response hook for a plain requests.Session (non-streamed responses only)."""
+    def hook(resp, *args, **kwargs):
+        stats.observe_response(resp.url, len(resp.content), resp.elapsed.total_seconds())
+    session.hooks["response"].append(hook)
+    return session
+
+
+# ---------------------------------------------
+# Local cache state (no network)
+# ---------------------------------------------
+def due_fraction(kind, source, db):
+    """Share of recorded titles that --due-only would still process for `source` (1.0 if unknown)."""
+    if not os.path.exists(db):
+        return 1.0
+
+    conn = sqlite3.connect(db)
+    try:
+        total, not_due = conn.execute(
+            """
+            SELECT COUNT(*), SUM(r.next_due > ?)
+            FROM titles t LEFT JOIN title_refresh r ON r.title_id = t.id AND r.source = ?
+            WHERE t.kind = ?
+            """,
+            (datetime.now().isoformat(timespec="seconds"), source, kind)
+        ).fetchone()
+    except sqlite3.Error:
+        return 1.0
+    finally:
+        conn.close()
+
+    return 1.0 if not total else 1 - (not_due or 0) / total
+
+
+def plan_titles(plan, args, kind, source, max_pages, db):
+    """Enumeration stage of the TMDB scripts; returns the estimated title count."""
+    if args.seed:
+        try:
+            path = latest_export(kind) if args.seed == "latest" else args.seed
+            titles = len(top_by_popularity(iter_export(path), args.seed_limit, args.min_popularity))
+            plan.note(f"enumeration: {titles:,} ids from {os.path.basename(path)} (0 requests)")
+        except OSError as e:
+            titles = args.seed_limit
+            plan.note(f"enumeration: export not readable ({e}), assuming --seed-limit {titles:,}")
+        plan.note("seeded titles make one details call each (images + credits appended)")
+    else:
+        plan.request_stage("popular pages (sequential)", f"api.themoviedb.org/3/{kind}/popular",
+                           max_pages, parallel=1)
+        titles = max_pages * plan.value(f"{kind}.popular_kept_per_page")
+
+    if args.due_only:
+        frac = due_fraction(kind, source, db)
+        titles *= frac
+        plan.note(f"--due-only: {frac:.0%} of catalog titles are due (new titles count as due)")
+
+    return round(titles)
+
+
+# ---------------------------------------------
+# Plan output
+# ---------------------------------------------
+class Plan:
+    def __init__(self, script, workers):
+        self.script = script
+        self.workers = workers
+        self.stages = []
+        self.defaults_used = set()
+        self.notes = []
+
+    def request_stage(self, name, key, count, parallel=None, pacing=0.0, rate=None):
+        """`count` requests to endpoint `key`, `parallel` at a time (+ sleep per request, max `rate`/s)."""
+        nbytes, seconds, samples = stats.mean(key)
+        if not samples:
+            self.defaults_used.add(key)
+
+        parallel = max(1, parallel or self.workers)
+        wall = count * (seconds + pacing) / parallel
+        if rate:
+            wall = max(wall, count / rate)
+        self.stages.append((name, count, count * nbytes, wall))
+
+    def work_stage(self, name, key, count, parallel=None):
+        """CPU work (OCR) — `count` jobs of the recorded duration."""
+        _, seconds, samples = stats.mean(key)
+        if not samples:
+            self.defaults_used.add(key)
+
+        parallel = max(1, parallel or self.workers)
+        self.stages.append((name, count, None, count * seconds / parallel))
+
+    def value(self, key):
+        """A recorded per-title fact (e.g. posters OCR'd per movie)."""
+        value, samples = stats.mean_value(key)
+        if not samples:
+            self.defaults_used.add(key)
+        return value
+
+    def note(self, text):
+        self.notes.append(text)
+
+    def print(self):
+        print(f"\nPlan for {self.script} — {self.workers} workers, no network calls made\n")
+        print(f"  {'stage':<34}{'requests':>12}{'download':>14}{'est. time':>14}")
+
+        total_requests = total_bytes = total_wall = 0
+        for name, count, nbytes, wall in self.stages:
+            shown_bytes = "-" if nbytes is None else _fmt_bytes(nbytes)
+            shown_count = f"{count:,.0f}"
+            print(f"  {name:<34}{shown_count:>12}{shown_bytes:>14}{_fmt_time(wall):>14}")
+
+            if nbytes is not None:
+                total_requests += count
+                total_bytes += nbytes
+            total_wall += wall
+
+        print(f"  {'total (stages run one after another)':<34}{total_requests:>12,.0f}"
+              f"{_fmt_bytes(total_bytes):>14}{_fmt_time(total_wall):>14}")
+
+        for text in self.notes:
+            print(f"  · {text}")
+        if self.defaults_used:
+            print(f"  · no recorded stats yet, defaults used for: {', '.join(sorted(self.defaults_used))}")
+        print()
+
+
+def _fmt_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def _fmt_time(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
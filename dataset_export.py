@@ -0,0 +1,294 @@
+import argparse
+import io
+import json
+import os
+import random
+import tarfile
+import time
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageOps
+
+import tmdb_http
+from catalog import CATALOG_PATH, VIEW_COLUMNS, Catalog
+from streaming import stream_map
+
+# ---------------------------------------------
+# Training-dataset export
+#
+# Turns poster CSVs (or a catalog view) into a dataset a dataloader can
+# read sequentially at disk speed instead of one image file at a time.
+# Posters are downloaded in parallel (hedged, see tmdb_http.download),
+# resized to IMAGE_SIZE and written as either
+#
+#   --format tar    WebDataset shards: posters-000000.tar, ... each holding
+#                   <key>.jpg, <key>.cls (class index) and <key>.json
+#   --format numpy  images.uint8 (N x H x W x 3, read with np.memmap),
+#                   labels.npy, index.csv and meta.json
+#
+#   python dataset_export.py FinalPosters.csv=credit_block \
+#       tmdb_popular_official_english_posters_2014_2025.csv=official --format tar
+# ---------------------------------------------
+
+DATASET_FOLDER = r"C:\openCVtraining\dataset"
+
+IMAGE_SIZE = (256, 384)  # width, height — TMDB posters are 2:3
+JPEG_QUALITY = 90
+SHARD_SIZE = 1000
+MAX_WORKERS = 16
+
+URL_COLUMNS = ["poster_url", "poster_image_url"]
+
+
+# ---------------------------------------------
+# Inputs
+# ---------------------------------------------
+def rows_from_csv(path, label):
+    df = pd.read_csv(path)
+    url_col = next((c for c in URL_COLUMNS if c in df.columns), None)
+    if url_col is None:
+        raise ValueError(f"{path} has none of the columns {URL_COLUMNS}")
+
+    titles = df["title"] if "title" in df.columns else [""] * len(df)
+    return [
+        {"url": url, "label": label, "title": str(title)}
+        for url, title in zip(df[url_col], titles)
+        if isinstance(url, str) and url
+    ]
+
+
+def rows_from_catalog(view, label, db=CATALOG_PATH, run_id=None, language=None):
+    url_col = next(c for c in URL_COLUMNS if c in VIEW_COLUMNS[view])
+
+    catalog = Catalog(db)
+    rows = [{"url": url, "label": label, "title": title}
+            for url, title in catalog.query_view(view, [url_col, "title"], run_id, language)]
+    catalog.close()
+    return rows
+
+
+def dedupe_rows(rows):
+    """
+    One row per poster URL (the first one wins): the same poster is often in
+    several CSVs / languages and would otherwise be downloaded and stored
+    twice. Returns (rows, dropped, conflicts) — conflicts are URLs that
+    came with more than one label.
+    """
+    first = {}
+    dropped = 0
+    conflicts = set()
+    for row in rows:
+        seen = first.get(row["url"])
+        if seen is None:
+            first[row["url"]] = row
+            continue
+        dropped += 1
+        if seen["label"] != row["label"]:
+            conflicts.add(row["url"])
+    return list(first.values()), dropped, conflicts
+
+
+# ---------------------------------------------
+# Download + resize (runs in the worker threads)
+# ---------------------------------------------
+def load_resized(url, size=IMAGE_SIZE):
+    buf, reserved = tmdb_http.download(url)
+    try:
+        with Image.open(io.BytesIO(buf)) as img:
+            # Centre crop to the target aspect, then scale
+            return ImageOps.fit(img.convert("RGB"), size, Image.LANCZOS)
+    finally:
+        if reserved:
+            tmdb_http.image_budget.release(reserved)
+
+
+def encode_jpeg(img):
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=JPEG_QUALITY)
+    return out.getvalue()
+
+
+# ---------------------------------------------
+# Writers
+# ---------------------------------------------
+class TarShardWriter:
+    """WebDataset layout: consecutive samples, one tar per SHARD_SIZE."""
+
+    def __init__(self, folder, shard_size=SHARD_SIZE):
+        self.folder = folder
+        self.shard_size = shard_size
+        self.count = 0
+        self.shards = []
+        self._tar = None
+
+    def _add(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = time.time()
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def write(self, img, row, label_index):
+        if self.count % self.shard_size == 0:
+            self.close()
+            path = os.path.join(self.folder, f"posters-{len(self.shards):06d}.tar")
+            self._tar = tarfile.open(path, "w")
+            self.shards.append(path)
+
+        key = f"{self.count:08d}"
+        self._add(f"{key}.jpg", encode_jpeg(img))
+        self._add(f"{key}.cls", str(label_index).encode())
+        self._add(f"{key}.json", json.dumps(row).encode("utf-8"))
+        self.count += 1
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+
+class NumpyWriter:
+    """Raw uint8 rows appended sequentially; labels and index written at the end."""
+
+    def __init__(self, folder, size=IMAGE_SIZE):
+        self.folder = folder
+        self.size = size
+        self.count = 0
+        self.labels = []
+        self.index = []
+        self._f = open(os.path.join(folder, "images.uint8"), "wb")
+
+    def write(self, img, row, label_index):
+        self._f.write(np.asarray(img, dtype=np.uint8).tobytes())
+        self.labels.append(label_index)
+        self.index.append({"row": self.count, **row})
+        self.count += 1
+
+    def close(self):
+        if self._f is None:
+            return
+        self._f.close()
+        self._f = None
+
+        np.save(os.path.join(self.folder, "labels.npy"), np.asarray(self.labels, dtype=np.int32))
+        pd.DataFrame(self.index, columns=["row", "url", "label", "title"]).to_csv(
+            os.path.join(self.folder, "index.csv"), index=False
+        )
+
+
+def load_numpy_dataset(folder):
+    """(images memmap N x H x W x 3, labels, classes) written by --format numpy."""
+    with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    shape = tuple(meta["shape"])
+    if shape[0] == 0:
+        # np.memmap refuses an empty file
+        images = np.empty(shape, dtype=np.uint8)
+    else:
+        images = np.memmap(os.path.join(folder, "images.uint8"), dtype=np.uint8, mode="r",
+                           shape=shape)
+    labels = np.load(os.path.join(folder, "labels.npy"))
+    return images, labels, meta["classes"]
+
+
+# ---------------------------------------------
+# Export
+# ---------------------------------------------
+def export_dataset(rows, folder=DATASET_FOLDER, fmt="tar", size=IMAGE_SIZE,
+                   max_workers=MAX_WORKERS, shuffle_seed=None):
+    os.makedirs(folder, exist_ok=True)
+
+    rows, dropped, conflicts = dedupe_rows(rows)
+    if dropped:
+        print(f"Skipping {dropped} duplicate poster URLs")
+    if conflicts:
+        print(f"[WARN] {len(conflicts)} posters appear under more than one label — "
+              f"kept the label of the first input")
+
+    if shuffle_seed is not None:
+        random.Random(shuffle_seed).shuffle(rows)
+
+    classes = sorted({r["label"] for r in rows})
+    class_index = {label: i for i, label in enumerate(classes)}
+
+    writer = TarShardWriter(folder) if fmt == "tar" else NumpyWriter(folder, size)
+    failed = []
+
+    def on_error(row, exc):
+        failed.append({**row, "error": str(exc)})
+
+    start = time.perf_counter()
+    try:
+        # Downloads + resizing in parallel, writes stay sequential in this thread
+        for row, img in stream_map(lambda r: load_resized(r["url"], size), rows,
+                                   max_workers, on_error=on_error):
+            writer.write(img, row, class_index[row["label"]])
+
+            if writer.count % 500 == 0:
+                rate = writer.count / (time.perf_counter() - start)
+                print(f"Exported {writer.count}/{len(rows)} posters ({rate:.0f}/s)…")
+    finally:
+        writer.close()
+
+    width, height = size
+    meta = {
+        "format": fmt,
+        "count": writer.count,
+        "classes": classes,
+        "image_size": [width, height],
+        "shape": [writer.count, height, width, 3],
+        "dtype": "uint8",
+        "shards": [os.path.basename(p) for p in getattr(writer, "shards", [])],
+    }
+    with open(os.path.join(folder, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    if failed:
+        pd.DataFrame(failed).to_csv(os.path.join(folder, "failed.csv"), index=False)
+        print(f"[WARN] {len(failed)} posters could not be exported — see failed.csv")
+
+    return meta
+
+
+def parse_input(spec):
+    """'path.csv=label' (label defaults to the file name)."""
+    path, _, label = spec.partition("=")
+    return path, label or os.path.splitext(os.path.basename(path))[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export poster CSVs as a training dataset")
+    parser.add_argument("inputs", nargs="*", metavar="CSV[=LABEL]")
+    parser.add_argument("--view", choices=sorted(VIEW_COLUMNS),
+                        help="read from this catalog view instead of / as well as CSVs")
+    parser.add_argument("--view-label", help="label for --view rows (default: the view name)")
+    parser.add_argument("--run", type=int, help="--view: only rows from this run id")
+    parser.add_argument("--language", help="--view: only posters in this language")
+    parser.add_argument("--db", default=CATALOG_PATH)
+    parser.add_argument("--out", default=DATASET_FOLDER)
+    parser.add_argument("--format", choices=["tar", "numpy"], default="tar")
+    parser.add_argument("--size", type=int, nargs=2, metavar=("W", "H"), default=IMAGE_SIZE)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--shuffle", type=int, metavar="SEED",
+                        help="shuffle the samples (recommended for tar shards)")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for spec in args.inputs:
+        path, label = parse_input(spec)
+        rows.extend(rows_from_csv(path, label))
+    if args.view:
+        rows.extend(rows_from_catalog(args.view, args.view_label or args.view, args.db,
+                                      args.run, args.language))
+
+    if not rows:
+        parser.error("nothing to export — give CSVs and/or --view")
+
+    print(f"Exporting {len(rows)} posters as {args.format} to {args.out}")
+    meta = export_dataset(rows, args.out, args.format, tuple(args.size), args.workers, args.shuffle)
+    print(f"Done: {meta['count']} samples, classes {meta['classes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# ---------------------------------------------
+# CineMaterial HTML extraction backends
+#
+# The scraper only needs two things from a page:
+#   listing page -> text + href of every `.media-box-title a`
+#   show page    -> src of every `.poster img`
+# Building a full BeautifulSoup tree with html.parser for that costs
+# more CPU than the download. Backends, fastest first:
+#
+#   selectolax  Lexbor CSS selectors (pip install selectolax)
+#   lxml        libxml2 + XPath (no cssselect needed)
+#   strainer    BeautifulSoup, but only the matching subtrees are built
+#   soup        full BeautifulSoup tree (the original code path)
+#
+# get_backend("auto") picks the first one that is installed. Compare them
+# on saved pages with bench_extract.py.
+# ---------------------------------------------
+
+BACKEND_ORDER = ["selectolax", "lxml", "strainer", "soup"]
+
+LISTING_CLASS = "media-box-title"
+POSTER_CLASS = "poster"
+
+
+# ---- soup: full tree ---------------------------------
+def _soup_listing(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return [(a.text.strip(), a["href"]) for a in soup.select(f".{LISTING_CLASS} a") if a.has_attr("href")]
+
+
+def _soup_posters(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return [img.get("src") for img in soup.select(f".{POSTER_CLASS} img") if img.get("src")]
+
+
+# ---- strainer: partial tree ----------------------------
+def _class_word(name):
+    # While parsing, the strainer sees the raw attribute ("poster big"),
+    # so match the class as a whole word rather than the exact value
+    return re.compile(rf"(^|\s){re.escape(name)}(\s|$)")
+
+
+_LISTING_ONLY = SoupStrainer(class_=_class_word(LISTING_CLASS))
+_POSTERS_ONLY = SoupStrainer(class_=_class_word(POSTER_CLASS))
+
+
+def _strainer_listing(html):
+    soup = BeautifulSoup(html, "html.parser", parse_only=_LISTING_ONLY)
+    return [(a.text.strip(), a["href"]) for a in soup.select(f".{LISTING_CLASS} a") if a.has_attr("href")]
+
+
+def _strainer_posters(html):
+    soup = BeautifulSoup(html, "html.parser", parse_only=_POSTERS_ONLY)
+    return [img.get("src") for img in soup.select(f".{POSTER_CLASS} img") if img.get("src")]
+
+
+# ---- lxml: XPath ---------------------------------------
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_LISTING_XPATH = f"//*[{_has_class(LISTING_CLASS)}]//a[@href]"
+_POSTERS_XPATH = f"//*[{_has_class(POSTER_CLASS)}]//img[@src]"
+
+
+def _lxml_tree(html):
+    import lxml.html
+    return lxml.html.fromstring(html)
+
+
+def _lxml_listing(html):
+    if not html.strip():
+        return []
+    # Nested matches would repeat a link; keep document order without duplicates
+    links = dict.fromkeys(_lxml_tree(html).xpath(_LISTING_XPATH))
+    return [(a.text_content().strip(), a.get("href")) for a in links]
+
+
+def _lxml_posters(html):
+    if not html.strip():
+        return []
+    imgs = dict.fromkeys(_lxml_tree(html).xpath(_POSTERS_XPATH))
+    return [img.get("src") for img in imgs if img.get("src")]
+
+
+# ---- selectolax: Lexbor CSS ----------------------------
+def _lexbor_tree(html):
+    from selectolax.lexbor import LexborHTMLParser
+    return LexborHTMLParser(html)
+
+
+def _selectolax_listing(html):
+    nodes = _lexbor_tree(html).css(f".{LISTING_CLASS} a")
+    return [(a.text().strip(), a.attributes["href"]) for a in nodes if a.attributes.get("href") is not None]
+
+
+def _selectolax_posters(html):
+    nodes = _lexbor_tree(html).css(f".{POSTER_CLASS} img")
+    return [img.attributes.get("src") for img in nodes if img.attributes.get("src")]
+
+
+# ---------------------------------------------
+BACKENDS = {
+    "soup": (_soup_listing, _soup_posters),
+    "strainer": (_strainer_listing, _strainer_posters),
+    "lxml": (_lxml_listing, _lxml_posters),
+    "selectolax": (_selectolax_listing, _selectolax_posters),
+}
+
+_REQUIRES = {"lxml": "lxml.html", "selectolax": "selectolax.lexbor"}
+
+
+def available(name):
+    module = _REQUIRES.get(name)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def get_backend(name="auto"):
+    """(listing_links, poster_srcs) functions of a backend; 'auto' = fastest installed."""
+    if name == "auto":
+        name = next(n for n in BACKEND_ORDER if available(n))
+    if name not in BACKENDS:
+        raise ValueError(f"unknown extraction backend {name!r} (choose from {', '.join(BACKENDS)})")
+    if not available(name):
+        raise ImportError(f"extraction backend {name!r} is not installed")
+    return BACKENDS[name]
@@ -0,0 +1,103 @@
+import glob
+import gzip
+import heapq
+import os
+import re
+from datetime import datetime
+
+import msgspec
+
+from tmdb_records import Movie, Show
+
+# ---------------------------------------------
+# Seed the crawl from TMDB's daily ID exports
+#
+# TMDB publishes one gzipped JSON-lines file per day with every movie / TV
+# id and its popularity:
+#
+#   http://files.tmdb.org/p/exports/movie_ids_MM_DD_YYYY.json.gz
+#   http://files.tmdb.org/p/exports/tv_series_ids_MM_DD_YYYY.json.gz
+#
+# Download them into EXPORT_FOLDER (no API key needed). The file is
+# decompressed and parsed line by line, and only the top `limit` titles
+# are ever held in memory (a min-heap), so enumerating the whole catalog
+# costs zero API calls instead of 500 /popular pages.
+# ---------------------------------------------
+
+EXPORT_FOLDER = r"C:\openCVtraining\tmdb_exports"
+
+EXPORT_PREFIX = {"movie": "movie_ids", "tv": "tv_series_ids"}
+
+
+class ExportEntry(msgspec.Struct, gc=False):
+    id: int
+    original_title: str = ""   # movie exports
+    original_name: str = ""    # tv exports
+    popularity: float = 0.0
+    adult: bool = False
+    video: bool = False
+
+
+decode_entry = msgspec.json.Decoder(ExportEntry).decode
+
+
+def latest_export(kind, folder=EXPORT_FOLDER):
+    """Newest <prefix>_MM_DD_YYYY.json.gz in `folder` (by the date in the name)."""
+    prefix = EXPORT_PREFIX[kind]
+    pattern = re.compile(rf"{prefix}_(\d\d_\d\d_\d{{4}})\.json\.gz$")
+
+    dated = []
+    for path in glob.glob(os.path.join(folder, f"{prefix}_*.json.gz")):
+        m = pattern.search(os.path.basename(path))
+        if m:
+            dated.append((datetime.strptime(m.group(1), "%m_%d_%Y"), path))
+
+    if not dated:
+        raise FileNotFoundError(f"No {prefix}_*.json.gz export in {folder}")
+
+    return max(dated)[1]
+
+
+def iter_export(path):
+    """Stream-decompress an export and yield one ExportEntry per line."""
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield decode_entry(line)
+
+
+def top_by_popularity(entries, limit=None, min_popularity=0.0):
+    """
+    Entries with popularity >= min_popularity, most popular first.
+    Adult titles and video releases are skipped, like /popular does.
+    With `limit`, memory stays at `limit` entries however large the export.
+    """
+    heap = []
+    for e in entries:
+        if e.adult or e.video or e.popularity < min_popularity:
+            continue
+
+        item = (e.popularity, -e.id, e)
+        if limit is None or len(heap) < limit:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    return [e for _, _, e in sorted(heap, key=lambda t: t[:2], reverse=True)]
+
+
+def seed_movies(path=None, limit=None, min_popularity=0.0):
+    """
+    Movie records from a movie_ids export. Only id, original title and
+    popularity are known — release_date stays None until the details call.
+    """
+    path = path or latest_export("movie")
+    top = top_by_popularity(iter_export(path), limit, min_popularity)
+    return [Movie(id=e.id, title=e.original_title, popularity=e.popularity) for e in top]
+
+
+def seed_shows(path=None, limit=None, min_popularity=0.0):
+    """Show records from a tv_series_ids export (first_air_date stays None)."""
+    path = path or latest_export("tv")
+    top = top_by_popularity(iter_export(path), limit, min_popularity)
+    return [Show(id=e.id, name=e.original_name, popularity=e.popularity) for e in top]
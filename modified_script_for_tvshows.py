@@ -3,10 +3,11 @@ import pandas as pd
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
-from io import BytesIO
 import pytesseract
 import os
 
+import tmdb_http
+
 # ---------------------------------------------
 # Tesseract path
 # ---------------------------------------------
@@ -159,10 +160,10 @@ def fetch_tv_posters(show):
 
         url = IMAGE_BASE + file_path
         try:
-            img_bytes = requests.get(url).content
-            img = Image.open(BytesIO(img_bytes))
+            with tmdb_http.open_poster(url, p.get("width"), p.get("height")) as img:
+                has_credits = has_bottom_credits(img)
 
-            if has_bottom_credits(img):
+            if has_credits:
                 credit_found_count += 1
                 results.append({
                     "title": title,
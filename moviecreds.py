@@ -1,13 +1,23 @@
 
 
-import requests
+import argparse
+import msgspec
 import pandas as pd
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
-from io import BytesIO
 import pytesseract
 import os
+import time
+
+import tmdb_http
+from retry_queue import is_transient, run_with_retries
+from catalog import CATALOG_PATH, Catalog
+from crawl_plan import Plan, plan_titles, save_stats_on_exit, stats
+from id_exports import seed_movies
+from poster_store import store_title
+from refresh_scheduler import RefreshScheduler, due_titles
+from tmdb_records import Movie, decode_images, decode_movie_details, decode_movie_page, to_dict
+from work_queue import WorkQueue, run_worker
 
 # Tesseract path (Windows)
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
@@ -15,6 +25,7 @@ pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tessera
 
 POPULAR_URL = "https://api.themoviedb.org/3/movie/popular"
 IMAGES_URL = "https://api.themoviedb.org/3/movie/{id}/images"
+DETAILS_URL = "https://api.themoviedb.org/3/movie/{id}"
 IMAGE_BASE = "https://image.tmdb.org/t/p/original"
 
 MIN_DATE = datetime(2014, 11, 11)
@@ -23,25 +34,58 @@ MAX_DATE = datetime(2025, 11, 11)
 MAX_WORKERS = 10
 MAX_POPULAR_PAGES = 500
 
+# --seed: how many of the most popular export ids to crawl (500 pages x 20)
+SEED_LIMIT = 10000
+
+# Bounded-memory mode: cap on poster bytes (downloaded + decoded) in flight at once
+BOUNDED_MEMORY = False
+MAX_INFLIGHT_BYTES = 512 * 1024 * 1024
+
+# Poster languages to select (iso_639_1), all from the same /images response.
+# Non-English languages get their own output file (…_credit_block_de.csv).
+LANGUAGES = ["en"]  # e.g. ["en", "de", "fr", "es"]
+
+# Also record every run in the local catalog database (catalog.py)
+WRITE_CATALOG = True
+
+# Keep every title's raw poster metadata in the columnar store (poster_store.py)
+WRITE_POSTER_STORE = True
+
+# Schedule each recorded title's next check (refresh_scheduler.py);
+# --due-only then skips titles that are not due
+REFRESH_SCHEDULE = True
+
 OUTPUT_FOLDER = r"C:\openCVtraining"
 OUTPUT_FILE = os.path.join(OUTPUT_FOLDER, "real_movie_posters_with_credit_block.csv")
+FAILED_FILE = os.path.join(OUTPUT_FOLDER, "real_movie_posters_failed.csv")
 
 
 # --------------------------------------------------
 # OCR: Detect if poster has bottom credits
 # --------------------------------------------------
-def has_bottom_credits(img: Image.Image) -> bool:
+CREDIT_KEYWORDS = [
+    "directed", "produced", "executive", "written",
+    "screenplay", "production", "starring", "cinematography",
+    "music", "soundtrack", "editor", "casting", "photography"
+]
+
+# Localised billing blocks (stems, so OCR dropping accents still matches)
+LOCAL_CREDIT_KEYWORDS = {
+    "de": ["regie", "drehbuch", "produktion", "produzent", "kamera", "schnitt", "musik"],
+    "fr": ["realis", "scenario", "musique", "produit", "montage", "photographie"],
+    "es": ["direcci", "dirigid", "guion", "musica", "producci", "fotograf", "montaje"],
+}
+
+
+def has_bottom_credits(img: Image.Image, language="en") -> bool:
     width, height = img.size
     crop_height = int(height * 0.18)
-    bottom_area = img.crop((0, height - crop_height, width, height))
-
-    text = pytesseract.image_to_string(bottom_area).lower().strip()
+    start = time.monotonic()
+    with img.crop((0, height - crop_height, width, height)) as bottom_area:
+        text = pytesseract.image_to_string(bottom_area).lower().strip()
+    stats.observe("ocr", seconds=time.monotonic() - start)
 
-    credit_keywords = [
-        "directed", "produced", "executive", "written",
-        "screenplay", "production", "starring", "cinematography",
-        "music", "soundtrack", "editor", "casting", "photography"
-    ]
+    credit_keywords = CREDIT_KEYWORDS + LOCAL_CREDIT_KEYWORDS.get(language, [])
 
     return any(word in text for word in credit_keywords)
 
@@ -49,138 +93,376 @@ def has_bottom_credits(img: Image.Image) -> bool:
 # --------------------------------------------------
 # Filter posters before OCR
 # --------------------------------------------------
-def filter_candidate_posters(posters):
+def filter_candidate_posters(posters, language="en"):
+    return filter_candidates_by_language(posters, [language])[language]
+
+
+def filter_candidates_by_language(posters, languages):
+    """One pass over the posters, returns {language: sorted candidates}."""
     banned = ["textless", "clean", "logo", "no-text", "no text"]
 
-    keep = []
+    keep = {lang: [] for lang in languages}
     for p in posters:
-        if p.get("iso_639_1") != "en":
+        lang = p.iso_639_1
+        if lang not in keep:
             continue
-        if p.get("width", 0) < 1500:
+        if p.width < 1500:
             continue
 
-        file_path = p.get("file_path", "").lower()
+        file_path = p.file_path.lower()
         if any(b in file_path for b in banned):
             continue
 
-        keep.append(p)
+        keep[lang].append(p)
 
-    return sorted(
-        keep,
-        key=lambda p: (p.get("vote_count", 0), p.get("width", 0) * p.get("height", 0)),
-        reverse=True
-    )
+    return {
+        lang: sorted(
+            candidates,
+            key=lambda p: (p.vote_count, p.width * p.height),
+            reverse=True
+        )
+        for lang, candidates in keep.items()
+    }
 
 
 # --------------------------------------------------
 # Fetch popular movies in date range
 # --------------------------------------------------
 def fetch_popular_movies():
-    movies = []
+    return list(iter_popular_movies())
+
 
-    for page in range(1, MAX_POPULAR_PAGES + 1):
-        resp = requests.get(
+def iter_popular_movies(max_pages=MAX_POPULAR_PAGES):
+    """Yield in-range movies page by page — nothing is fetched before it is needed."""
+    for page in range(1, max_pages + 1):
+        resp = decode_movie_page(tmdb_http.get(
             POPULAR_URL,
             params={"api_key": API_KEY, "language": "en-US", "page": page}
-        ).json()
+        ).content)
 
-        for m in resp.get("results", []):
-            release_date = m.get("release_date")
-            if not release_date:
-                continue
+        print(f"Fetched page {page}")
 
-            try:
-                rd = datetime.strptime(release_date, "%Y-%m-%d")
-            except:
-                continue
+        kept = [m for m in resp.results if in_date_range(m.release_date)]
+        stats.observe_value("movie.popular_kept_per_page", len(kept))
+        yield from kept
 
-            if MIN_DATE <= rd <= MAX_DATE:
-                movies.append({
-                    "id": m["id"],
-                    "title": m["title"],
-                    "release_date": release_date,
-                    "popularity": m.get("popularity", 0)
-                })
+        if page >= resp.total_pages:
+            break
 
-        print(f"Fetched page {page}")
 
-        if page >= resp.get("total_pages", page):
-            break
+def in_date_range(release_date):
+    if not release_date:
+        return False
+
+    try:
+        rd = datetime.strptime(release_date, "%Y-%m-%d")
+    except ValueError:
+        return False
+
+    return MIN_DATE <= rd <= MAX_DATE
+
 
+def load_movies(args):
+    """The popular list, or (--seed) the top of a daily ID export — no API calls."""
+    if args.seed:
+        path = None if args.seed == "latest" else args.seed
+        print("Seeding movies from the TMDB ID export…")
+        movies = seed_movies(path, args.seed_limit, args.min_popularity)
+    else:
+        print("Fetching popular movies between 2014–2025…")
+        movies = fetch_popular_movies()
+
+    if args.due_only:
+        movies = due_titles("movie", "credit_block", movies)
     return movies
 
 
 # --------------------------------------------------
 # Fetch ONLY ONE poster URL with credits
 # --------------------------------------------------
-def fetch_movie_poster(movie):
-    movie_id = movie["id"]
-    title = movie["title"]
+def fetch_movie_poster(movie, language="en"):
+    return (fetch_movie_posters(movie, [language]) or {}).get(language)
 
-    # Poster metadata
-    posters_raw = requests.get(
-        IMAGES_URL.format(id=movie_id),
-        params={"api_key": API_KEY}
-    ).json().get("posters", [])
 
-    posters = filter_candidate_posters(posters_raw)
+def fetch_movie_posters(movie, languages=None):
+    """
+    One /images call, then the OCR pick per language: {language: row}.
+    None for a seeded id outside the date range: nothing to record.
+    """
+    languages = languages or LANGUAGES
 
-    for p in posters:
-        path = p.get("file_path")
-        if not path:
+    # Poster metadata
+    if movie.release_date is None:
+        # Seeded from an ID export: the details call (images appended)
+        # brings title and release date, then the date window applies
+        details = decode_movie_details(tmdb_http.get(
+            DETAILS_URL.format(id=movie.id),
+            params={"api_key": API_KEY, "append_to_response": "images",
+                    "include_image_language": ",".join(list(languages) + ["null"])}
+        ).content)
+
+        # A copy: the caller's (queued / retried) record stays unseeded
+        movie = msgspec.structs.replace(movie, title=details.title or movie.title,
+                                        release_date=details.release_date or "")
+        if not in_date_range(movie.release_date):
+            return None
+
+        posters_raw = details.images.posters
+    else:
+        posters_raw = decode_images(tmdb_http.get(
+            IMAGES_URL.format(id=movie.id),
+            params={"api_key": API_KEY}
+        ).content).posters
+
+    if WRITE_POSTER_STORE:
+        store_title("movie", movie.id, posters_raw)
+
+    found = {}
+    for lang, posters in filter_candidates_by_language(posters_raw, languages).items():
+        row = pick_credit_poster(movie, posters, lang)
+        if row:
+            found[lang] = row
+
+    return found
+
+
+def pick_credit_poster(movie, posters, language):
+    for tried, p in enumerate(posters, start=1):
+        if not p.file_path:
             continue
 
-        image_url = IMAGE_BASE + path
+        image_url = IMAGE_BASE + p.file_path
 
         try:
-            img_data = requests.get(image_url).content
-            img = Image.open(BytesIO(img_data))
+            with tmdb_http.open_poster(image_url, p.width, p.height) as img:
+                has_credits = has_bottom_credits(img, language)
 
             # Must contain professional credit block
-            if has_bottom_credits(img):
+            if has_credits:
+                stats.observe_value("moviecreds.posters_tried", tried)
                 return {
-                    "title": title,
-                    "release_date": movie["release_date"],
-                    "popularity": movie["popularity"],
+                    "title": movie.title,
+                    "release_date": movie.release_date,
+                    "popularity": movie.popularity,
                     "poster_image_url": image_url,
-                    "width": p.get("width"),
-                    "height": p.get("height"),
-                    "vote_count": p.get("vote_count")
+                    "width": p.width,
+                    "height": p.height,
+                    "vote_count": p.vote_count
                 }
-        except:
+        except Exception as e:
+            # Network trouble goes back to the retry queue, bad images are skipped
+            if is_transient(e):
+                raise
             continue
 
+    stats.observe_value("moviecreds.posters_tried", len(posters))
     return None
 
 
+def output_file_for(language):
+    if language == "en":
+        return OUTPUT_FILE
+    root, ext = os.path.splitext(OUTPUT_FILE)
+    return f"{root}_{language}{ext}"
+
+
+def save_to_catalog(catalog, run_id, movie, found):
+    if found:
+        # Seeded movies only learn their title and date in the details call
+        row = next(iter(found.values()))
+        movie = msgspec.structs.replace(movie, title=row["title"], release_date=row["release_date"])
+
+    posters_by_lang = {}
+    for lang in LANGUAGES:
+        row = found.get(lang)
+        posters_by_lang[lang] = [{
+            "url": row["poster_image_url"],
+            "width": row["width"],
+            "height": row["height"],
+            "vote_count": row["vote_count"]
+        }] if row else []
+
+    catalog.record_title(
+        run_id, "movie", movie.id, movie.title, movie.release_date, movie.popularity,
+        source="credit_block", posters_by_lang=posters_by_lang
+    )
+
+    if REFRESH_SCHEDULE:
+        RefreshScheduler(catalog).record("movie", "credit_block", movie.id, movie.popularity,
+                                         movie.release_date, [row["poster_image_url"] for row in found.values()])
+
+
+def schedule_retries(catalog, failed):
+    if REFRESH_SCHEDULE:
+        scheduler = RefreshScheduler(catalog)
+        for movie, _ in failed:
+            scheduler.record_failure("movie", "credit_block", movie.id)
+
+
+def write_outputs(results, failed):
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+    for lang, rows in results.items():
+        out_file = output_file_for(lang)
+        pd.DataFrame(rows).to_csv(out_file, index=False)
+        print(f"\nDone! File saved to:\n{out_file}\n")
+
+    if failed:
+        pd.DataFrame([{**to_dict(m), "error": str(e)} for m, e in failed]).to_csv(FAILED_FILE, index=False)
+        print(f"[WARN] {len(failed)} movies could not be processed — listed in:\n{FAILED_FILE}\n")
+
+
+# --------------------------------------------------
+# QUEUE MODE — several worker processes / hosts share one crawl
+#   python moviecreds.py --queue crawl.db --enqueue     (once)
+#   python moviecreds.py --queue crawl.db --worker      (on every worker)
+#   python moviecreds.py --queue crawl.db --export      (when drained)
+# --------------------------------------------------
+def run_queue_mode(args):
+    run_all = not (args.enqueue or args.worker or args.export)
+    queue = WorkQueue(args.queue)
+
+    if args.enqueue or run_all:
+        movies = load_movies(args)
+        added = queue.enqueue([to_dict(m) for m in movies])
+        print(f"Queued {added} new movies ({len(movies)} found)")
+
+    if args.worker or run_all:
+        run_worker(queue, lambda item: fetch_movie_posters(Movie(**item)), MAX_WORKERS,
+                   describe=lambda m: f"{m['title']} ({m['id']})",
+                   breaker=tmdb_http.breaker)
+
+    if args.export or run_all:
+        catalog = Catalog() if WRITE_CATALOG else None
+        run_id = catalog.start_run("moviecreds.py --queue") if catalog else None
+
+        results = {lang: [] for lang in LANGUAGES}
+        for item, found in queue.results():
+            if found is None:
+                continue
+            for lang, row in found.items():
+                results.setdefault(lang, []).append(row)
+
+            if catalog:
+                save_to_catalog(catalog, run_id, Movie(**item), found)
+
+        failed = [(Movie(**m), e) for m, e in queue.failures()]
+        write_outputs(results, failed)
+
+        if catalog:
+            schedule_retries(catalog, failed)
+            catalog.finish_run(run_id)
+            catalog.close()
+
+    queue.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TMDB movie posters with an OCR-verified credit block")
+    parser.add_argument("--queue", metavar="DB",
+                        help="SQLite work-queue file shared by all worker processes")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="fetch the popular list and queue every movie")
+    parser.add_argument("--worker", action="store_true",
+                        help="process queued movies until the queue is drained")
+    parser.add_argument("--export", action="store_true",
+                        help="write the CSVs from the queue's results")
+    parser.add_argument("--seed", nargs="?", const="latest", metavar="EXPORT",
+                        help="enumerate movies from a movie_ids_*.json.gz export "
+                             "(default: newest in id_exports.EXPORT_FOLDER) instead of /popular")
+    parser.add_argument("--seed-limit", type=int, default=SEED_LIMIT,
+                        help="keep only this many of the most popular export ids")
+    parser.add_argument("--min-popularity", type=float, default=0.0,
+                        help="skip export ids below this popularity")
+    parser.add_argument("--due-only", action="store_true",
+                        help="only process titles that are new or due on the refresh schedule")
+    parser.add_argument("--plan", action="store_true",
+                        help="estimate requests, bytes, OCR calls and time, then exit (no network)")
+    return parser.parse_args(argv)
+
+
+# --------------------------------------------------
+# PLAN (--plan): estimate the crawl without running it
+# --------------------------------------------------
+def plan_crawl(args):
+    plan = Plan("moviecreds.py", MAX_WORKERS)
+    titles = plan_titles(plan, args, "movie", "credit_block", MAX_POPULAR_PAGES, CATALOG_PATH)
+
+    if args.seed:
+        plan.request_stage("details + images", "api.themoviedb.org/3/movie/{id}", titles)
+    else:
+        plan.request_stage("/images", "api.themoviedb.org/3/movie/{id}/images", titles)
+
+    # OCR stops at the first credit-block poster per language
+    posters = titles * len(LANGUAGES) * plan.value("moviecreds.posters_tried")
+    plan.request_stage("poster downloads", "image.tmdb.org/t/p/original/{id}", posters)
+    plan.work_stage("OCR", "ocr", posters, parallel=min(MAX_WORKERS, os.cpu_count() or 1))
+
+    plan.note(f"{titles:,} movies, languages {', '.join(LANGUAGES)}, "
+              f"~{plan.value('moviecreds.posters_tried'):.1f} posters OCR'd per movie and language")
+    plan.print()
+
+
 # --------------------------------------------------
 # MAIN
 # --------------------------------------------------
-def main():
-    print("Fetching popular movies between 2014–2025…")
-    movies = fetch_popular_movies()
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.plan:
+        plan_crawl(args)
+        return
+
+    save_stats_on_exit()
+
+    if BOUNDED_MEMORY:
+        tmdb_http.set_inflight_budget(MAX_INFLIGHT_BYTES)
+
+    if args.queue:
+        run_queue_mode(args)
+        print(f"Memory: {tmdb_http.memory_report()}")
+        print(f"Downloads: {tmdb_http.download_report()}")
+        return
+
+    movies = load_movies(args)
     print(f"Movies found: {len(movies)}")
 
-    results = []
+    catalog = Catalog() if WRITE_CATALOG else None
+    run_id = catalog.start_run("moviecreds.py") if catalog else None
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {executor.submit(fetch_movie_poster, m): m for m in movies}
+    results = {lang: [] for lang in LANGUAGES}
+    processed = 0
 
-        for i, future in enumerate(as_completed(futures), start=1):
-            result = future.result()
-            if result:
-                results.append(result)
-                print(f"✔ Poster found for {result['title']}")
+    def collect(movie, found):
+        nonlocal processed
+        processed += 1
 
-            if i % 50 == 0:
-                print(f"Processed {i}/{len(movies)} movies…")
+        for lang, result in (found or {}).items():
+            results[lang].append(result)
+            print(f"✔ Poster found for {result['title']} [{lang}]")
 
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+        if catalog and found is not None:
+            save_to_catalog(catalog, run_id, movie, found)
+
+        if processed % 50 == 0:
+            print(f"Processed {processed}/{len(movies)} movies…")
+
+    failed = run_with_retries(
+        fetch_movie_posters, movies, MAX_WORKERS, collect,
+        describe=lambda m: f"{m.title} ({m.id})",
+        breaker=tmdb_http.breaker
+    )
+
+    write_outputs(results, failed)
 
-    df = pd.DataFrame(results)
-    df.to_csv(OUTPUT_FILE, index=False)
+    if catalog:
+        schedule_retries(catalog, failed)
+        catalog.finish_run(run_id)
+        catalog.close()
+        print(f"Catalog updated: {catalog.path} (run {run_id})")
 
-    print(f"\nDone! File saved to:\n{OUTPUT_FILE}\n")
+    print(f"Memory: {tmdb_http.memory_report()}")
+    print(f"Downloads: {tmdb_http.download_report()}")
 
 
 if __name__ == "__main__":
@@ -3,10 +3,12 @@ import pandas as pd
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
-from io import BytesIO
 import pytesseract
 import os
 
+import tmdb_http
+from catalog import Catalog, split_cast
+
 # ---------------------------------------------
 # Tesseract path
 # ---------------------------------------------
@@ -33,6 +35,9 @@ MAX_POPULAR_PAGES = 500
 
 OUTPUT_FOLDER = r"C:\openCVtraining"
 
+# Also record every run in the local catalog database (catalog.py)
+WRITE_CATALOG = True
+
 
 # ---------------------------------------------
 # Detect bottom billing block using OCR
@@ -159,10 +164,10 @@ def fetch_movie_poster(movie):
         url = IMAGE_BASE + path
 
         try:
-            img_bytes = requests.get(url).content
-            img = Image.open(BytesIO(img_bytes))
+            with tmdb_http.open_poster(url, p.get("width"), p.get("height")) as img:
+                has_credits = has_bottom_credits(img)
 
-            if has_bottom_credits(img):
+            if has_credits:
                 return {
                     "title": title,
                     "release_date": movie["release_date"],
@@ -173,12 +178,31 @@ def fetch_movie_poster(movie):
                     "height": p.get("height"),
                     "vote_count": p.get("vote_count")
                 }
-        except:
+        except requests.RequestException:
+            # Transport error: no answer for this movie, not a miss
+            raise
+        except (OSError, tmdb_http.ImageTooLarge, pytesseract.TesseractError) as e:
+            # This poster can't be checked (unreadable, oversized); try the next
+            print(f"[WARN] Skipping poster {url}: {e}")
             continue
 
     return None
 
 
+def save_to_catalog(catalog, run_id, movie, result):
+    catalog.record_title(
+        run_id, "movie", movie["id"], movie["title"], movie["release_date"], movie["popularity"],
+        cast=split_cast(result["top_billed_cast"]) if result else None,
+        source="credit_block",
+        posters_by_lang={"en": [{
+            "url": result["poster_image_url"],
+            "width": result["width"],
+            "height": result["height"],
+            "vote_count": result["vote_count"]
+        }] if result else []}
+    )
+
+
 # ---------------------------------------------
 # MAIN
 # ---------------------------------------------
@@ -187,13 +211,24 @@ def main():
     movies = fetch_popular_movies()
     print(f"Movies found: {len(movies)}")
 
+    catalog = Catalog() if WRITE_CATALOG else None
+    run_id = catalog.start_run("movieposters_hopefinal.py") if catalog else None
+
     results = []
 
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as exe:
         futures = {exe.submit(fetch_movie_poster, m): m for m in movies}
 
         for i, f in enumerate(as_completed(futures), start=1):
-            result = f.result()
+            try:
+                result = f.result()
+            except Exception as e:
+                # Nothing recorded: the catalog keeps the movie's last real answer
+                print(f"[ERROR] Failed for {futures[f]['title']}: {e}")
+                continue
+
+            if catalog:
+                save_to_catalog(catalog, run_id, futures[f], result)
             if result:
                 results.append(result)
                 print(f"✔ Poster found for {result['title']}")
@@ -223,6 +258,11 @@ def main():
 
     print(f"\nDONE — saved to:\n{unique_file}\n")
 
+    if catalog:
+        catalog.finish_run(run_id)
+        catalog.close()
+        print(f"Catalog updated: {catalog.path} (run {run_id})")
+
 
 # ---------------------------------------------
 # EXECUTE
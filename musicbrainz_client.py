@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from retry_queue import retry_after_header
+
+# ---------------------------------------------
+# Rate-limited client for MusicBrainz + Cover Art Archive
+#
+# Every host gets its own token bucket. musicbrainz.org allows one request
+# per second per client (https://musicbrainz.org/doc/MusicBrainz_API/Rate_Limiting),
+# so its bucket holds a single token refilled every second: requests are
+# spaced exactly 1s apart no matter how many threads ask, and a slow
+# response does not add a sleep on top. coverartarchive.org is a separate
+# service with far looser limits and is queried from a thread pool while
+# the MusicBrainz stream keeps its pace.
+# ---------------------------------------------
+
+# host -> (requests per second, burst)
+HOST_RATES = {
+    "musicbrainz.org": (1.0, 1),
+    "coverartarchive.org": (10.0, 10),
+}
+DEFAULT_RATE = (5.0, 5)
+
+MAX_RETRIES = 3
+RETRY_STATUS = {429, 503}  # MusicBrainz answers 503 when the limit is exceeded
+POOL_SIZE = 16
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available; callers are served in arrival order."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+            # Take the token now (possibly going negative) and sleep off the debt
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Server asked us to back off: nobody gets a token for `seconds`."""
+        with self._lock:
+            # Settle the refill up to now first, so the pause starts now
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # One token `seconds` from now (behind anyone already queued)
+            self._tokens = min(self._tokens, 0.0) + 1.0 - seconds * self.rate
+
+
+class RateLimitedClient:
+    def __init__(self, headers=None, rates=HOST_RATES, timeout=30):
+        self.rates = rates
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.requests = {}
+        self.waited = {}
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.rates.get(host, DEFAULT_RATE)
+                self._buckets[host] = TokenBucket(rate, burst)
+            return self._buckets[host]
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        # Like requests.head: redirects are returned, not followed
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        host = urlparse(url).netloc
+        bucket = self.bucket(host)
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(MAX_RETRIES + 1):
+            waited = bucket.acquire()
+            r = self.session.request(method, url, **kwargs)
+
+            with self._lock:
+                self.requests[host] = self.requests.get(host, 0) + 1
+                self.waited[host] = self.waited.get(host, 0.0) + waited
+
+            if r.status_code not in RETRY_STATUS or attempt == MAX_RETRIES:
+                return r
+
+            bucket.pause(retry_after_header(r) or 2 ** attempt)
+
+    def report(self):
+        with self._lock:
+            return ", ".join(
+                f"{host}: {n} requests ({self.waited.get(host, 0.0):.0f}s paced)"
+                for host, n in sorted(self.requests.items())
+            )
+
+
+class NegativeCache:
+    """Keys known to have no result (e.g. no cover art), remembered for `ttl` seconds in a JSON file."""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._misses = {}
+        self._dirty = False
+        self.hits = 0
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._misses = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def __contains__(self, key):
+        with self._lock:
+            seen = self._misses.get(key)
+            if seen is None:
+                return False
+            if time.time() - seen > self.ttl:
+                del self._misses[key]
+                self._dirty = True
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, key):
+        with self._lock:
+            self._misses[key] = time.time()
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self._misses)
+            self._dirty = False
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
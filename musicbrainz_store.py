@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import sqlite3
+import tarfile
+import time
+
+# ---------------------------------------------
+# Local MusicBrainz store (SQLite) fed from the JSON data dumps
+#
+#   https://data.metabrainz.org/pub/musicbrainz/data/json-dumps/<date>/
+#       artist.tar.xz         -> mbdump/artist         (one JSON artist per line)
+#       release-group.tar.xz  -> mbdump/release-group  (one JSON release group per line)
+#
+#   python musicbrainz_store.py ingest artist.tar.xz release-group.tar.xz
+#
+# The archives are read as a stream (nothing is unpacked to disk) and
+# written in batches. Afterwards Coverart.py answers "top groups" and
+# "albums of artist X" with indexed queries instead of 1 req/s web calls;
+# the web service only tops up artists the dump does not have.
+# ---------------------------------------------
+
+STORE_PATH = r"C:\OpenCVTraining\musicbrainz.db"
+BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artists (
+    id           TEXT PRIMARY KEY,
+    name         TEXT NOT NULL,
+    sort_name    TEXT,
+    type         TEXT,
+    rating_votes INTEGER NOT NULL DEFAULT 0,
+    source       TEXT NOT NULL DEFAULT 'dump'   -- dump | web
+);
+CREATE INDEX IF NOT EXISTS artists_type_votes ON artists (type, rating_votes DESC);
+
+CREATE TABLE IF NOT EXISTS release_groups (
+    id                 TEXT PRIMARY KEY,
+    title              TEXT NOT NULL,
+    primary_type       TEXT,
+    first_release_date TEXT
+);
+
+-- secondary types (Compilation, Live, Soundtrack, ...)
+CREATE TABLE IF NOT EXISTS release_group_types (
+    release_group_id TEXT NOT NULL REFERENCES release_groups (id),
+    type             TEXT NOT NULL,
+    PRIMARY KEY (release_group_id, type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS artist_release_groups (
+    artist_id        TEXT NOT NULL,
+    release_group_id TEXT NOT NULL REFERENCES release_groups (id),
+    position         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (artist_id, release_group_id)
+) WITHOUT ROWID;
+
+-- artists whose release groups are complete (from a dump or a web top-up)
+CREATE TABLE IF NOT EXISTS artists_loaded (
+    artist_id TEXT PRIMARY KEY,
+    source    TEXT NOT NULL,
+    loaded_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ingests (
+    entity      TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    finished_at REAL NOT NULL
+);
+"""
+
+
+def _artist_row(a, source):
+    return (a["id"], a.get("name") or "", a.get("sort-name"), a.get("type"),
+            (a.get("rating") or {}).get("votes-count") or 0, source)
+
+
+def _release_group_rows(rg):
+    """(release group row, [secondary types], [(artist_id, position)])"""
+    row = (rg["id"], rg.get("title") or "", rg.get("primary-type"), rg.get("first-release-date"))
+    artists = [
+        (credit["artist"]["id"], i)
+        for i, credit in enumerate(rg.get("artist-credit") or [])
+        if credit.get("artist", {}).get("id")
+    ]
+    return row, rg.get("secondary-types") or [], artists
+
+
+class MusicBrainzStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ---- writes ---------------------------------------
+    def add_artists(self, artists, source="dump"):
+        self.conn.executemany(
+            """
+            INSERT INTO artists (id, name, sort_name, type, rating_votes, source)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                name = excluded.name, sort_name = excluded.sort_name, type = excluded.type,
+                rating_votes = MAX(artists.rating_votes, excluded.rating_votes),
+                source = CASE WHEN artists.source = 'dump' THEN 'dump' ELSE excluded.source END
+            """,
+            [_artist_row(a, source) for a in artists]
+        )
+
+    def add_release_groups(self, release_groups, artist_id=None):
+        """Release group JSON as in the dump / the web service (ws/2 browse).
+
+        Browse results carry no artist-credit, so pass the artist they were
+        browsed for as `artist_id`.
+        """
+        rg_rows, type_rows, link_rows = [], [], []
+        for rg in release_groups:
+            row, types, artists = _release_group_rows(rg)
+            if artist_id is not None and not artists:
+                artists = [(artist_id, 0)]
+
+            rg_rows.append(row)
+            type_rows.extend((row[0], t) for t in types)
+            link_rows.extend((a, row[0], pos) for a, pos in artists)
+
+        self.conn.executemany(
+            """
+            INSERT INTO release_groups (id, title, primary_type, first_release_date) VALUES (?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                title = excluded.title, primary_type = excluded.primary_type,
+                first_release_date = excluded.first_release_date
+            """,
+            rg_rows
+        )
+        self.conn.executemany("INSERT OR IGNORE INTO release_group_types VALUES (?, ?)", type_rows)
+        self.conn.executemany("INSERT OR IGNORE INTO artist_release_groups VALUES (?, ?, ?)", link_rows)
+
+    def mark_loaded(self, artist_ids, source):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO artists_loaded VALUES (?, ?, ?)",
+            [(a, source, now) for a in artist_ids]
+        )
+
+    # ---- queries --------------------------------------
+    def has_release_groups_dump(self):
+        return self.conn.execute(
+            "SELECT 1 FROM ingests WHERE entity = 'release-group' LIMIT 1"
+        ).fetchone() is not None
+
+    def top_artists(self, limit, artist_type="Group"):
+        """Artists of a type, most rated first, as {"id", "name"} like the search API."""
+        cur = self.conn.execute(
+            """
+            SELECT id, name FROM artists
+            WHERE type = ?
+            ORDER BY rating_votes DESC, name
+            LIMIT ?
+            """,
+            (artist_type, limit)
+        )
+        return [{"id": i, "name": n} for i, n in cur]
+
+    def is_loaded(self, artist_id):
+        """Are the artist's release groups in the store (dump artist, or topped up)?"""
+        if self.has_release_groups_dump():
+            dumped = self.conn.execute(
+                "SELECT 1 FROM artists WHERE id = ? AND source = 'dump'", (artist_id,)
+            ).fetchone()
+            if dumped is not None:
+                return True
+        return self.conn.execute(
+            "SELECT 1 FROM artists_loaded WHERE artist_id = ?", (artist_id,)
+        ).fetchone() is not None
+
+    def release_groups(self, artist_id, primary_type="Album", limit=5):
+        """An artist's release groups of a primary type, oldest first."""
+        cur = self.conn.execute(
+            """
+            SELECT rg.id, rg.title, rg.primary_type, rg.first_release_date
+            FROM artist_release_groups arg
+            JOIN release_groups rg ON rg.id = arg.release_group_id
+            WHERE arg.artist_id = ? AND rg.primary_type = ?
+            ORDER BY COALESCE(rg.first_release_date, '9999'), rg.title
+            LIMIT ?
+            """,
+            (artist_id, primary_type, limit)
+        )
+        return [{"id": i, "title": t, "primary-type": p, "first-release-date": d}
+                for i, t, p, d in cur]
+
+    # ---- dump ingestion -------------------------------
+    def ingest(self, path):
+        """Load one dump archive (artist / release-group .tar.xz) or an extracted JSON-lines file."""
+        start = time.perf_counter()
+        total = 0
+
+        for entity, lines in _dump_members(path):
+            add = self.add_artists if entity == "artist" else self.add_release_groups
+            batch = []
+            count = 0
+
+            # Bulk load: one transaction per batch, no fsync per statement
+            self.conn.execute("PRAGMA synchronous = OFF")
+            for line in lines:
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= BATCH_SIZE:
+                    with self.conn:
+                        add(batch)
+                    count += len(batch)
+                    batch = []
+                    print(f"  {entity}: {count:,} rows ({time.perf_counter() - start:.0f}s)", end="\r")
+
+            with self.conn:
+                if batch:
+                    add(batch)
+                count += len(batch)
+                self.conn.execute("INSERT INTO ingests VALUES (?, ?, ?, ?)",
+                                  (entity, os.path.basename(path), count, time.time()))
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+
+            print(f"  {entity}: {count:,} rows from {os.path.basename(path)}")
+            total += count
+
+        if not total:
+            print(f"[WARN] {path}: no mbdump/artist or mbdump/release-group data found")
+        return total
+
+    def counts(self):
+        return {
+            table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("artists", "release_groups", "release_group_types", "artist_release_groups")
+        }
+
+
+def _entity_of(name):
+    base = os.path.basename(name).split(".")[0]
+    return base if base in ("artist", "release-group") else None
+
+
+def _dump_members(path):
+    """(entity, line iterator) for each artist / release-group file in a dump."""
+    if tarfile.is_tarfile(path):
+        # Stream mode: members are read in order without unpacking to disk
+        with tarfile.open(path, "r|*") as tar:
+            for member in tar:
+                entity = _entity_of(member.name)
+                if entity is None or not member.isfile():
+                    continue
+                # Binary lines (json.loads takes bytes)
+                yield entity, tar.extractfile(member)
+        return
+
+    entity = _entity_of(path)
+    if entity is None:
+        raise ValueError(f"{path}: expected an artist or release-group dump")
+    with open(path, "rb") as f:
+        yield entity, f
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local MusicBrainz store from the JSON dumps")
+    parser.add_argument("--db", default=STORE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="load artist / release-group dumps")
+    ingest.add_argument("dumps", nargs="+")
+    sub.add_parser("stats", help="row counts")
+
+    args = parser.parse_args(argv)
+    store = MusicBrainzStore(args.db)
+    try:
+        if args.command == "ingest":
+            for path in args.dumps:
+                print(f"Ingesting {path} …")
+                store.ingest(path)
+        for table, n in store.counts().items():
+            print(f"{table:<24}{n:>12,}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
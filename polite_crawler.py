@@ -0,0 +1,119 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+from retry_queue import retry_after_header
+
+# ---------------------------------------------
+# Polite concurrent fetching
+#
+# PoliteFetcher wraps one requests.Session (cookies included) and allows
+# at most `max_per_host` requests per host at a time. Each of those
+# connection slots keeps its own politeness delay: a slot waits `delay`
+# seconds after its own last request before sending the next one, so
+# N slots give N requests per `delay` seconds instead of one global
+# sleep serialising everything. 429 / 503 answers park the slot for the
+# server's Retry-After and the request is sent again.
+# ---------------------------------------------
+
+MAX_PER_HOST = 4
+POLITE_DELAY = 1.0
+MAX_RETRIES = 3
+BACKOFF_STATUS = {429, 503}
+
+
+class _Slot:
+    def __init__(self):
+        self.next_at = 0.0
+
+
+class _Host:
+    def __init__(self, slots):
+        self.cond = threading.Condition()
+        self.free = [_Slot() for _ in range(slots)]
+
+
+class PoliteFetcher:
+    def __init__(self, session, max_per_host=MAX_PER_HOST, delay=POLITE_DELAY, delays=None,
+                 timeout=30):
+        """`delays` overrides `delay` per host, e.g. {"www.cinematerial.com": 1.0}."""
+        self.session = session
+        self.max_per_host = max_per_host
+        self.delay = delay
+        self.delays = delays or {}
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self.requests = 0
+        self.waited = 0.0
+
+        # Enough pooled connections for every slot (the default pool keeps 10)
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(10, max_per_host))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    def _host(self, name):
+        with self._lock:
+            host = self._hosts.get(name)
+            if host is None:
+                host = self._hosts[name] = _Host(self.max_per_host)
+            return host
+
+    def _acquire(self, host):
+        with host.cond:
+            while not host.free:
+                host.cond.wait()
+            # The slot that became ready first
+            host.free.sort(key=lambda s: s.next_at)
+            return host.free.pop(0)
+
+    def _release(self, host, slot):
+        with host.cond:
+            host.free.append(slot)
+            host.cond.notify()
+
+    def get(self, url, consume=None, **kwargs):
+        """
+        session.get(url) within the host's concurrency limit and politeness delay.
+        With `consume` (for stream=True) the slot is held until consume(resp)
+        has read the body, and its result is returned instead of the response.
+        """
+        name = urlparse(url).netloc
+        host = self._host(name)
+        delay = self.delays.get(name, self.delay)
+        kwargs.setdefault("timeout", self.timeout)
+
+        slot = self._acquire(host)
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                wait = slot.next_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                    with self._lock:
+                        self.waited += wait
+
+                try:
+                    resp = self.session.get(url, **kwargs)
+                finally:
+                    slot.next_at = time.monotonic() + delay
+                with self._lock:
+                    self.requests += 1
+
+                if resp.status_code not in BACKOFF_STATUS or attempt == MAX_RETRIES:
+                    if consume is None:
+                        return resp
+                    with resp:
+                        return consume(resp)
+
+                resp.close()
+                # Server asked us to slow down: park this slot, not the whole crawl
+                backoff = max(retry_after_header(resp), delay * 2 ** (attempt + 1))
+                slot.next_at = time.monotonic() + backoff
+        finally:
+            self._release(host, slot)
+
+    def report(self):
+        return f"{self.requests} requests, {self.waited:.0f}s politeness waits"
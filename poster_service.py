@@ -0,0 +1,275 @@
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import msgspec
+
+import moviecreds
+import tmdb
+import tmdb_http
+from catalog import CATALOG_PATH, Catalog
+from poster_store import store_title
+from tmdb_records import Movie, decode_movie_details
+
+# ---------------------------------------------
+# Poster lookup service
+#
+#   python poster_service.py --port 8765
+#   GET /poster/<tmdb_movie_id>?language=en
+#
+# Answers "best credit-block poster for title X" (plus the top official
+# posters) per request instead of waiting for the nightly CSV:
+#   1. in-memory LRU                         -> microseconds
+#   2. the local catalog (catalog.py)        -> about a millisecond
+#   3. TMDB details + OCR (moviecreds rules) -> seconds, then cached
+# Concurrent requests for the same uncached title share one fetch.
+# Titles without a credit-block poster are cached too (in memory and in
+# the catalog), and only asked again after MISS_TTL_DAYS.
+# ---------------------------------------------
+
+HOST = "127.0.0.1"
+PORT = 8765
+LRU_SIZE = 10000
+MISS_TTL_DAYS = 30
+
+
+class LRUCache:
+    def __init__(self, capacity=LRU_SIZE):
+        self.capacity = capacity
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "capacity": self.capacity,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class UnknownTitle(Exception):
+    pass
+
+
+class PosterLookup:
+    def __init__(self, db=CATALOG_PATH, lru_size=LRU_SIZE):
+        self.cache = LRUCache(lru_size)
+        self.flights = tmdb_http.SingleFlight()
+
+        # One connection shared by the handler threads, one statement at a time
+        self.catalog = Catalog(db, check_same_thread=False)
+        self.catalog_lock = threading.Lock()
+        with self.catalog_lock:
+            self.run_id = self.catalog.start_run("poster_service.py")
+
+    def close(self):
+        with self.catalog_lock:
+            self.catalog.finish_run(self.run_id)
+            self.catalog.close()
+
+    def lookup(self, tmdb_id, language="en"):
+        """(answer, source) with source one of memory | catalog | tmdb."""
+        key = (tmdb_id, language)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            answer, expires = cached
+            # Misses expire like they do in the catalog
+            if expires is None or datetime.now() < expires:
+                return answer, "memory"
+
+        return self.flights.do(key, lambda: self._load(tmdb_id, language))[0]
+
+    def _load(self, tmdb_id, language):
+        with self.catalog_lock:
+            stored = self.catalog.posters_for("movie", tmdb_id, language)
+
+        checked_at = datetime.now()
+        if stored is not None and self._usable(stored):
+            info, by_source, checked = stored
+            answer = self._answer(tmdb_id, language, info,
+                                  by_source.get("credit_block", []), by_source.get("official", []))
+            if "credit_block" in checked:
+                checked_at = datetime.fromisoformat(checked["credit_block"])
+            source = "catalog"
+        else:
+            answer = self._fetch(tmdb_id, language)
+            source = "tmdb"
+
+        expires = None
+        if answer["credit_block_poster"] is None:
+            expires = checked_at + timedelta(days=MISS_TTL_DAYS)
+        self.cache.put((tmdb_id, language), (answer, expires))
+        return answer, source
+
+    @staticmethod
+    def _usable(stored):
+        """Catalog answer is good: has a credit-block poster, or a recent known miss."""
+        _, by_source, checked = stored
+        credit = by_source.get("credit_block")
+        # Titles only seen by tmdb.py (official posters, no OCR yet) are fetched
+        if credit is None:
+            return False
+        if credit or "credit_block" not in checked:
+            return True
+        age = datetime.now() - datetime.fromisoformat(checked["credit_block"])
+        return age < timedelta(days=MISS_TTL_DAYS)
+
+    def _fetch(self, tmdb_id, language):
+        # One details call with the posters appended, no date window here
+        details = tmdb_http.get(
+            moviecreds.DETAILS_URL.format(id=tmdb_id),
+            params={"api_key": moviecreds.API_KEY, "append_to_response": "images",
+                    "include_image_language": f"{language},null"}
+        )
+        if details.status_code == 404:
+            raise UnknownTitle(tmdb_id)
+        details.raise_for_status()
+
+        try:
+            details = decode_movie_details(details.content)
+        except msgspec.ValidationError:
+            raise UnknownTitle(tmdb_id)
+        if not details.id:
+            # An error body ({"status_code": 34, ...}) with a non-404 status
+            raise UnknownTitle(tmdb_id)
+
+        movie = Movie(id=details.id, title=details.title,
+                      release_date=details.release_date, popularity=details.popularity)
+        posters = details.images.posters
+
+        if moviecreds.WRITE_POSTER_STORE:
+            store_title("movie", movie.id, posters)
+
+        official = [{
+            "url": tmdb.IMAGE_BASE + p.file_path,
+            "width": p.width,
+            "height": p.height,
+            "vote_count": p.vote_count
+        } for p in tmdb.pick_theatrical_posters(posters, language) if p.file_path]
+
+        credit = []
+        row = moviecreds.pick_credit_poster(
+            movie, moviecreds.filter_candidate_posters(posters, language), language
+        )
+        if row:
+            credit = [{
+                "url": row["poster_image_url"],
+                "width": row["width"],
+                "height": row["height"],
+                "vote_count": row["vote_count"]
+            }]
+
+        with self.catalog_lock:
+            for source, found in (("credit_block", credit), ("official", official)):
+                self.catalog.record_title(
+                    self.run_id, "movie", movie.id, movie.title, movie.release_date, movie.popularity,
+                    source=source, posters_by_lang={language: found}
+                )
+
+        info = {"title": movie.title, "release_date": movie.release_date,
+                "popularity": movie.popularity}
+        return self._answer(tmdb_id, language, info, credit, official)
+
+    @staticmethod
+    def _answer(tmdb_id, language, info, credit, official):
+        return {
+            "tmdb_id": tmdb_id,
+            "language": language,
+            **info,
+            "credit_block_poster": credit[0] if credit else None,
+            "official_posters": official,
+        }
+
+
+# ---------------------------------------------
+# HTTP
+# ---------------------------------------------
+class Handler(BaseHTTPRequestHandler):
+    lookup = None  # PosterLookup, set in main()
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+
+        if parts == ["health"]:
+            return self._send(200, {"ok": True})
+
+        if parts == ["stats"]:
+            return self._send(200, {"cache": self.lookup.cache.stats(),
+                                    "coalesced": self.lookup.flights.shared})
+
+        if len(parts) != 2 or parts[0] != "poster" or not parts[1].isdigit():
+            return self._send(404, {"error": "use /poster/<tmdb_movie_id>?language=en"})
+
+        language = parse_qs(url.query).get("language", ["en"])[0]
+
+        try:
+            answer, source = self.lookup.lookup(int(parts[1]), language)
+        except UnknownTitle:
+            return self._send(404, {"error": f"unknown TMDB movie {parts[1]}"})
+        except Exception as e:
+            return self._send(502, {"error": str(e)})
+
+        ms = (time.perf_counter() - start) * 1000
+        self._send(200, {**answer, "source": source, "ms": round(ms, 3)})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        # Quiet: one line per request is too much at storefront volume
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-title poster lookup service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--lru-size", type=int, default=LRU_SIZE)
+    parser.add_argument("--db", default=CATALOG_PATH)
+    args = parser.parse_args(argv)
+
+    Handler.lookup = PosterLookup(args.db, args.lru_size)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Serving posters on http://{args.host}:{args.port}/poster/<tmdb_id>?language=en")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        Handler.lookup.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# ---------------------------------------------
+# Columnar poster-metadata store (Parquet)
+#
+# The scrapers drop the raw /images poster list of every title here,
+# one Parquet file per title (hive layout kind=<movie|tv>/title_id=<id>).
+# The selection rules of pick_theatrical_posters / filter_candidate_posters
+# can then be re-run over the whole catalog as vectorised Arrow/NumPy
+# operations — no API calls, no per-title Python loop:
+#
+#   python poster_store.py --rules theatrical --languages en de --out picks.parquet
+# ---------------------------------------------
+
+STORE_PATH = r"C:\openCVtraining\poster_store"
+
+SCHEMA = pa.schema([
+    ("file_path", pa.string()),
+    ("width", pa.int32()),
+    ("height", pa.int32()),
+    ("iso_639_1", pa.string()),
+    ("vote_count", pa.int32()),
+    ("vote_average", pa.float32()),
+])
+
+# Same rules the scripts apply per title
+RULES = {
+    # tmdb.py pick_theatrical_posters
+    "theatrical": {"min_width": 1500, "banned": (), "top_k": 5},
+    # moviecreds.py / tvshowstmdb.py filter_candidate_posters
+    "candidates": {"min_width": 1500, "banned": ("textless", "clean", "logo", "no-text", "no text"),
+                   "top_k": None},
+}
+
+
+class PosterStore:
+    def __init__(self, root=STORE_PATH):
+        self.root = root
+
+    def _title_dir(self, kind, title_id):
+        return os.path.join(self.root, f"kind={kind}", f"title_id={title_id}")
+
+    def write_title(self, kind, title_id, posters):
+        """Replace the stored poster list of one title (tmdb_records.Poster objects)."""
+        table = pa.table({
+            "file_path": [p.file_path for p in posters],
+            "width": [p.width for p in posters],
+            "height": [p.height for p in posters],
+            "iso_639_1": [p.iso_639_1 for p in posters],
+            "vote_count": [p.vote_count for p in posters],
+            "vote_average": [p.vote_average for p in posters],
+        }, schema=SCHEMA)
+
+        folder = self._title_dir(kind, title_id)
+        os.makedirs(folder, exist_ok=True)
+
+        # Write-then-rename so readers never see a half-written file
+        # (dot-files are skipped by the dataset reader). The temp name is
+        # unique per call: threads of one process may write the same title.
+        fd, tmp = tempfile.mkstemp(prefix=".posters.", suffix=".tmp", dir=folder)
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp)
+            os.replace(tmp, os.path.join(folder, "posters.parquet"))
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def load(self, kind=None):
+        """All stored posters as one Arrow table with `kind` and `title_id` columns."""
+        dataset = ds.dataset(
+            self.root, format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([("kind", pa.string()), ("title_id", pa.int64())]), flavor="hive"
+            )
+        )
+        flt = ds.field("kind") == kind if kind else None
+        return dataset.to_table(filter=flt)
+
+
+def store_title(kind, title_id, posters):
+    """write_title for the scrapers: a failed write does not cost the title."""
+    try:
+        PosterStore().write_title(kind, title_id, posters)
+    except Exception as e:
+        print(f"[WARN] Poster store write failed for {title_id}: {e}")
+
+
+# ---------------------------------------------
+# Vectorised selection
+# ---------------------------------------------
+def _codes(column):
+    """Integer codes for a string column (for use as a lexsort key)."""
+    return pc.dictionary_encode(column.combine_chunks()).indices.to_numpy(zero_copy_only=False)
+
+
+def select_posters(table, languages=("en",), min_width=1500, banned=(), top_k=None):
+    """
+    Apply the poster rules to every title at once.
+
+    Keeps posters in one of `languages` with width >= min_width and none of
+    the `banned` terms in their file path, orders each (title, language)
+    group by vote_count then area (both descending, ties in stored order)
+    and keeps the first `top_k` of every group. Adds a 1-based `rank`.
+    """
+    lang = table["iso_639_1"]
+    mask = pc.and_(
+        pc.fill_null(pc.is_in(lang, value_set=pa.array(list(languages), pa.string())), False),
+        pc.greater_equal(table["width"], min_width)
+    )
+
+    if banned:
+        path = pc.utf8_lower(table["file_path"])
+        for term in banned:
+            mask = pc.and_(mask, pc.invert(pc.match_substring(path, term)))
+
+    picked = table.filter(mask)
+    if picked.num_rows == 0:
+        return picked.append_column("rank", pa.array([], pa.int32()))
+
+    kind = _codes(picked["kind"])
+    title_id = picked["title_id"].to_numpy()
+    lang_code = _codes(picked["iso_639_1"])
+    votes = picked["vote_count"].to_numpy(zero_copy_only=False).astype(np.int64)
+    area = (picked["width"].to_numpy(zero_copy_only=False).astype(np.int64)
+            * picked["height"].to_numpy(zero_copy_only=False).astype(np.int64))
+
+    # lexsort: last key is primary — group, then best poster first
+    order = np.lexsort((-area, -votes, lang_code, title_id, kind))
+
+    group = np.stack([kind[order], title_id[order], lang_code[order]], axis=1)
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = np.any(group[1:] != group[:-1], axis=1)
+
+    positions = np.arange(len(order))
+    group_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    rank = positions - group_start + 1
+
+    if top_k is not None:
+        keep = rank <= top_k
+        order, rank = order[keep], rank[keep]
+
+    return picked.take(pa.array(order)).append_column("rank", pa.array(rank, pa.int32()))
+
+
+# ---------------------------------------------
+# CLI: re-select across the whole store
+# ---------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run poster selection over the stored catalog")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--kind", choices=["movie", "tv"])
+    parser.add_argument("--rules", choices=sorted(RULES), default="theatrical")
+    parser.add_argument("--languages", nargs="+", default=["en"])
+    parser.add_argument("--min-width", type=int)
+    parser.add_argument("--top-k", type=int)
+    parser.add_argument("--out", help="write the selection here (.parquet or .csv)")
+    args = parser.parse_args(argv)
+
+    rules = dict(RULES[args.rules])
+    if args.min_width is not None:
+        rules["min_width"] = args.min_width
+    if args.top_k is not None:
+        rules["top_k"] = args.top_k
+
+    start = time.perf_counter()
+    table = PosterStore(args.store).load(args.kind)
+    loaded = time.perf_counter()
+    picked = select_posters(table, args.languages, **rules)
+    done = time.perf_counter()
+
+    print(f"Loaded {table.num_rows} posters in {loaded - start:.2f}s, "
+          f"selected {picked.num_rows} in {done - loaded:.2f}s")
+
+    if args.out:
+        if args.out.endswith(".csv"):
+            picked.to_pandas().to_csv(args.out, index=False)
+        else:
+            pq.write_table(picked, args.out)
+        print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import hashlib
+import random
+from datetime import datetime, timedelta
+
+from catalog import CATALOG_PATH, Catalog
+
+# ---------------------------------------------
+# Popularity-weighted refresh schedule
+#
+# Every title the scrapers record gets a next-due time in the catalog
+# (table title_refresh), one per source: tmdb.py ("official") and
+# moviecreds.py / tvshowstmdb.py ("credit_block") pick different posters
+# and keep separate schedules. Popular titles, titles released recently (or
+# not yet) and titles whose poster picks actually changed on the last
+# checks come back within days; the long tail only every few months.
+# With --due-only the scripts skip everything that is not due yet:
+#
+#   python moviecreds.py --due-only
+#   python refresh_scheduler.py --kind movie      (what is due when)
+# ---------------------------------------------
+
+MIN_INTERVAL_DAYS = 1
+MAX_INTERVAL_DAYS = 90
+
+# popularity at which the interval is halved
+POPULARITY_SCALE = 25.0
+
+# released within this many days (or upcoming) -> checked 4x as often
+RECENT_DAYS = 120
+
+# spread titles with the same interval over neighbouring nights
+JITTER = 0.1
+
+# a title whose fetch failed is tried again after this long
+RETRY_DELAY_HOURS = 6
+
+
+def refresh_interval(popularity, release_date, checks=0, changes=0, today=None):
+    """Days until the next check."""
+    today = today or datetime.now()
+    days = MAX_INTERVAL_DAYS / (1 + (popularity or 0) / POPULARITY_SCALE)
+
+    try:
+        released = datetime.strptime(release_date or "", "%Y-%m-%d")
+    except ValueError:
+        released = None
+
+    if released is not None:
+        age = (today - released).days
+        if age < RECENT_DAYS:
+            days /= 4
+        elif age < 365:
+            days /= 2
+
+    # Observed change rate (smoothed towards 1/2 while there are few checks):
+    # titles that changed every time come back twice as fast, titles that
+    # never change up to 4x slower
+    rate = (changes + 1) / (checks + 2)
+    days *= min(4.0, max(0.5, 0.5 / rate))
+
+    days *= 1 + random.uniform(-JITTER, JITTER)
+    return min(MAX_INTERVAL_DAYS, max(MIN_INTERVAL_DAYS, days))
+
+
+def fingerprint(urls):
+    """Stable hash of a title's picked poster URLs (order-independent)."""
+    return hashlib.sha1("\n".join(sorted(urls)).encode("utf-8")).hexdigest()
+
+
+class RefreshScheduler:
+    def __init__(self, catalog):
+        self.conn = catalog.conn
+
+    def due(self, kind, source, titles, now=None):
+        """The titles (records with .id) that are new to `source` or past their next-due time."""
+        now = (now or datetime.now()).isoformat(timespec="seconds")
+        next_due = dict(self.conn.execute(
+            """
+            SELECT t.tmdb_id, r.next_due
+            FROM titles t JOIN title_refresh r ON r.title_id = t.id
+            WHERE t.kind = ? AND r.source = ?
+            """,
+            (kind, source)
+        ))
+        return [t for t in titles if next_due.get(t.id) is None or next_due[t.id] <= now]
+
+    def record(self, kind, source, tmdb_id, popularity, release_date, urls, now=None):
+        """Note a completed check of one title by `source` and schedule its next one."""
+        now = now or datetime.now()
+
+        row = self.conn.execute(
+            """
+            SELECT t.id, r.fingerprint, r.checks, r.changes
+            FROM titles t LEFT JOIN title_refresh r ON r.title_id = t.id AND r.source = ?
+            WHERE t.kind = ? AND t.tmdb_id = ?
+            """,
+            (source, kind, tmdb_id)
+        ).fetchone()
+        if row is None:
+            return None
+
+        title_id, old_fp, checks, changes = row
+        checks, changes = checks or 0, changes or 0
+
+        fp = fingerprint(urls)
+        if old_fp is not None:
+            checks += 1
+            changes += fp != old_fp
+
+        days = refresh_interval(popularity, release_date, checks, changes, now)
+        next_due = now + timedelta(days=days)
+
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO title_refresh (title_id, source, fingerprint, checks, changes,
+                                           last_checked, next_due)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (title_id, source) DO UPDATE SET
+                    fingerprint = excluded.fingerprint, checks = excluded.checks,
+                    changes = excluded.changes, last_checked = excluded.last_checked,
+                    next_due = excluded.next_due
+                """,
+                (title_id, source, fp, checks, changes, now.isoformat(timespec="seconds"),
+                 next_due.isoformat(timespec="seconds"))
+            )
+
+        return next_due
+
+    def record_failure(self, kind, source, tmdb_id, now=None):
+        """A failed fetch: due again after RETRY_DELAY_HOURS, fingerprint and counts untouched."""
+        now = now or datetime.now()
+        row = self.conn.execute(
+            "SELECT id FROM titles WHERE kind = ? AND tmdb_id = ?", (kind, tmdb_id)
+        ).fetchone()
+        if row is None:
+            # Never recorded: due on every run until a fetch succeeds
+            return None
+
+        next_due = now + timedelta(hours=RETRY_DELAY_HOURS)
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO title_refresh (title_id, source, next_due) VALUES (?, ?, ?)
+                ON CONFLICT (title_id, source) DO UPDATE SET next_due = excluded.next_due
+                """,
+                (row[0], source, next_due.isoformat(timespec="seconds"))
+            )
+
+        return next_due
+
+
+def due_titles(kind, source, titles, db=CATALOG_PATH):
+    """--due-only: keep the titles that are new or due for `source`, report how many were skipped."""
+    titles = list(titles)
+    catalog = Catalog(db)
+    due = RefreshScheduler(catalog).due(kind, source, titles)
+    catalog.close()
+
+    print(f"Refresh schedule: {len(due)} of {len(titles)} titles due")
+    return due
+
+
+# ---------------------------------------------
+# CLI: how much is due over the coming nights
+# ---------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the refresh schedule")
+    parser.add_argument("--db", default=CATALOG_PATH)
+    parser.add_argument("--kind", choices=["movie", "tv"], default="movie")
+    parser.add_argument("--source", choices=["official", "credit_block"], default="credit_block",
+                        help="official = tmdb.py, credit_block = moviecreds.py / tvshowstmdb.py")
+    parser.add_argument("--days", type=int, default=14)
+    args = parser.parse_args(argv)
+
+    catalog = Catalog(args.db)
+    rows = catalog.conn.execute(
+        """
+        SELECT substr(r.next_due, 1, 10) AS day, COUNT(*)
+        FROM title_refresh r JOIN titles t ON t.id = r.title_id
+        WHERE t.kind = ? AND r.source = ?
+        GROUP BY day ORDER BY day
+        """,
+        (args.kind, args.source)
+    ).fetchall()
+    never = catalog.conn.execute(
+        """
+        SELECT COUNT(*) FROM titles t
+        WHERE t.kind = ? AND NOT EXISTS (
+            SELECT 1 FROM title_refresh r WHERE r.title_id = t.id AND r.source = ?
+        )
+        """,
+        (args.kind, args.source)
+    ).fetchone()[0]
+    catalog.close()
+
+    today = datetime.now().date()
+    horizon = (today + timedelta(days=args.days)).isoformat()
+    overdue = sum(n for day, n in rows if day <= today.isoformat())
+    later = sum(n for day, n in rows if day > horizon)
+
+    print(f"{args.kind} ({args.source}): {overdue} due by today, {never} never scheduled")
+    for day, n in rows:
+        if today.isoformat() < day <= horizon:
+            print(f"  {day}  {n}")
+    print(f"  later  {later}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+# ---------------------------------------------
+# Deferred retries + per-host circuit breaker
+#
+# Workers raise on transient failures (timeouts, connection resets,
+# 429 / 5xx answers, an open circuit) instead of swallowing them.
+# run_with_retries() parks those items on a RetryQueue with exponential
+# backoff and re-submits them while the run is still going, as soon as
+# their backoff has elapsed and their host's circuit is closed again.
+# ---------------------------------------------
+
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+# Longest Retry-After honoured (seconds); same as RetryQueue's default max_delay
+MAX_RETRY_AFTER = 120.0
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+    def __init__(self, host, retry_at):
+        super().__init__(f"circuit open for {host}")
+        self.host = host
+        self.retry_at = retry_at
+
+
+def is_transient(exc) -> bool:
+    if isinstance(exc, (CircuitOpenError, requests.ConnectionError,
+                        requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in TRANSIENT_STATUS
+    return False
+
+
+def host_of(exc):
+    if isinstance(exc, CircuitOpenError):
+        return exc.host
+    request = getattr(exc, "request", None)
+    if request is not None and request.url:
+        return urlparse(request.url).netloc
+    return None
+
+
+def retry_after(exc) -> float:
+    """Seconds the server asked us to wait (Retry-After) with a failed request, or 0."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return 0.0
+    return retry_after_header(response)
+
+
+def retry_after_header(response, cap=MAX_RETRY_AFTER) -> float:
+    """A response's Retry-After in seconds (delta-seconds or HTTP date), at most `cap`, or 0."""
+    value = response.headers.get("Retry-After", "")
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return 0.0
+        if when.tzinfo is None:
+            # "-0000" dates come back naive; HTTP dates are UTC
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+
+    if not math.isfinite(seconds):
+        # "inf" / "nan" parse as floats
+        return 0.0
+    return min(cap, max(0.0, seconds))
+
+
+# ---------------------------------------------
+# Circuit breaker
+# ---------------------------------------------
+class HostCircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures on a host.
+    While open every request to that host fails fast with CircuitOpenError.
+    Once the cooldown has passed a single probe request is let through
+    (half-open); success closes the circuit, failure re-opens it with a
+    doubled cooldown (capped at `max_cooldown`).
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=15.0, max_cooldown=300.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._trips = {}
+        self._open_until = {}
+        self._probing = set()
+
+    def before_request(self, host):
+        with self._lock:
+            until = self._open_until.get(host)
+            if until is None:
+                return
+
+            now = time.monotonic()
+            if now < until:
+                raise CircuitOpenError(host, until)
+            if host in self._probing:
+                raise CircuitOpenError(host, now + 1.0)
+
+            self._probing.add(host)
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._trips.pop(host, None)
+            self._open_until.pop(host, None)
+            self._probing.discard(host)
+
+    def record_failure(self, host):
+        with self._lock:
+            # Requests already in flight when the circuit opened don't extend it
+            if time.monotonic() < self._open_until.get(host, 0.0):
+                return
+
+            failures = self._failures.get(host, 0) + 1
+            probe_failed = host in self._probing
+
+            if probe_failed or failures >= self.failure_threshold:
+                trips = self._trips.get(host, 0) + 1
+                delay = min(self.max_cooldown, self.cooldown * 2 ** (trips - 1))
+                self._trips[host] = trips
+                self._open_until[host] = time.monotonic() + delay
+                self._probing.discard(host)
+                self._failures[host] = 0
+                print(f"[BREAKER] {host} unavailable — pausing it for {delay:.0f}s")
+            else:
+                self._failures[host] = failures
+
+    def retry_at(self, host) -> float:
+        """Monotonic time from which `host` may be tried again (0 = now)."""
+        with self._lock:
+            return self._open_until.get(host, 0.0)
+
+
+# ---------------------------------------------
+# Retry queue
+# ---------------------------------------------
+class RetryQueue:
+    """
+    Min-heap of parked items ordered by the time they become due.
+
+    Backoff is base_delay * 2**(attempts-1) with jitter, capped at max_delay.
+    Items are given up after `max_attempts` real failures or after having
+    been parked for `give_up_after` seconds in total (a host that never
+    comes back). Fast-fails on an open circuit do not count as attempts.
+    """
+
+    def __init__(self, base_delay=2.0, max_delay=120.0, max_attempts=6, give_up_after=1800.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.give_up_after = give_up_after
+
+        self._heap = []
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item, attempts, host=None, first_failed=None, not_before=0.0) -> bool:
+        """Park `item` after `attempts` failed tries. False = give up on it."""
+        now = time.monotonic()
+        first_failed = now if first_failed is None else first_failed
+
+        if attempts >= self.max_attempts or now - first_failed > self.give_up_after:
+            return False
+
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempts - 1))
+        due = now + delay * (0.5 + random.random() / 2)
+        due = max(due, now + not_before)
+
+        heapq.heappush(self._heap, (due, next(self._seq), item, attempts, host, first_failed))
+        return True
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_ready(self, breaker=None):
+        """Items whose backoff elapsed and whose host is not currently open."""
+        now = time.monotonic()
+        ready = []
+        deferred = []
+
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            _, _, item, attempts, host, first_failed = entry
+
+            blocked_until = breaker.retry_at(host) if breaker and host else 0.0
+            if blocked_until > now:
+                deferred.append((blocked_until, next(self._seq)) + entry[2:])
+                continue
+
+            ready.append((item, attempts, first_failed))
+
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+
+        return ready
+
+
+# ---------------------------------------------
+# Driver
+# ---------------------------------------------
+def park_failure(retry_queue, item, attempts, first_failed, exc, describe=str) -> bool:
+    """
+    Park `item` (which failed with `exc` after `attempts` tries) for a retry.
+    False = not transient, or out of retries: the caller records it as failed.
+    """
+    if not is_transient(exc):
+        print(f"[ERROR] {describe(item)} failed: {exc}")
+        return False
+
+    if not isinstance(exc, CircuitOpenError):
+        attempts += 1
+
+    wait_for = retry_after(exc)
+    if isinstance(exc, CircuitOpenError):
+        wait_for = max(wait_for, exc.retry_at - time.monotonic())
+
+    if retry_queue.push(item, attempts, host_of(exc), first_failed, wait_for):
+        if not isinstance(exc, CircuitOpenError):
+            print(f"[RETRY] {describe(item)} (attempt {attempts}) — {exc}")
+        return True
+
+    print(f"[ERROR] {describe(item)} gave up after {attempts} attempts: {exc}")
+    return False
+
+
+def run_with_retries(fn, items, max_workers, on_result, describe=str,
+                     retry_queue=None, breaker=None):
+    """
+    Run fn(item) for every item on a thread pool.
+
+    on_result(item, result) is called in the calling thread for each success.
+    Transient failures are parked and retried; everything else (or items
+    that exhausted their retries) is returned as a list of (item, error).
+    """
+    if retry_queue is None:
+        # Not `or`: an empty queue is falsy
+        retry_queue = RetryQueue()
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as exe:
+        pending = {exe.submit(fn, item): (item, 0, None) for item in items}
+
+        while pending or retry_queue:
+            due = retry_queue.next_due()
+            timeout = None if due is None else max(0.0, due - time.monotonic())
+
+            if pending:
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(timeout)
+                done = ()
+
+            for future in done:
+                item, attempts, first_failed = pending.pop(future)
+
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if not park_failure(retry_queue, item, attempts, first_failed, e, describe):
+                        failed.append((item, e))
+                    continue
+
+                on_result(item, result)
+
+            for item, attempts, first_failed in retry_queue.pop_ready(breaker):
+                pending[exe.submit(fn, item)] = (item, attempts, first_failed)
+
+    return failed
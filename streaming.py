@@ -0,0 +1,54 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+# ---------------------------------------------
+# Bounded, lazy parallel map
+#
+# stream_map() runs fn over an iterable on a thread pool but reads the
+# input only as results are consumed: at most `max_pending` items are in
+# flight. No project imports, so light consumers (dataset_export.py) can
+# use it without pulling in the scraper scripts; tmdb_stream.py builds
+# its per-title generators on it.
+# ---------------------------------------------
+
+MAX_WORKERS = 10
+
+
+def _print_error(item, exc):
+    print(f"[ERROR] {item} failed: {exc}")
+
+
+def stream_map(fn, items, max_workers=MAX_WORKERS, max_pending=None, on_error=_print_error):
+    """
+    Yield (item, fn(item)) in completion order, reading `items` lazily.
+    Failed items go to on_error(item, exc) (None re-raises instead).
+    """
+    max_pending = max_pending or max_workers * 2
+    items = iter(items)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {}
+    try:
+        for item in islice(items, max_pending):
+            pending[executor.submit(fn, item)] = item
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    on_error(item, e)
+                else:
+                    yield item, result
+
+                # One out, one in
+                for nxt in islice(items, 1):
+                    pending[executor.submit(fn, nxt)] = nxt
+    finally:
+        # Also runs when the consumer stops early (generator closed)
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,69 @@
+import pytest
+import requests
+
+import Coverart
+from musicbrainz_client import NegativeCache
+
+RG = "0a1b2c3d"
+
+
+class FakeResponse:
+    def __init__(self, status_code, location=None):
+        self.status_code = status_code
+        self.headers = {"Location": location} if location else {}
+        self.is_redirect = location is not None
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class FakeClient:
+    def __init__(self, answer):
+        self.answer = answer
+        self.heads = []
+
+    def head(self, url, **kwargs):
+        self.heads.append(url)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+@pytest.fixture
+def caa(monkeypatch, tmp_path):
+    def serve(answer):
+        client = FakeClient(answer)
+        monkeypatch.setattr(Coverart, "client", client)
+        return client
+
+    monkeypatch.setattr(Coverart, "no_cover", NegativeCache(str(tmp_path / "missing.json"), 3600))
+    return serve
+
+
+def test_redirect_is_the_cover_url(caa):
+    caa(FakeResponse(307, "https://archive.org/download/x/front-500.jpg"))
+    assert Coverart.get_cover_url(RG, "500") == "https://archive.org/download/x/front-500.jpg"
+
+
+def test_missing_cover_is_cached_per_size(caa):
+    client = caa(FakeResponse(404))
+    assert Coverart.get_cover_url(RG, "500") is None
+    assert Coverart.get_cover_url(RG, "500") is None
+    assert len(client.heads) == 1
+
+    # No 500px thumbnail says nothing about the full-size front
+    assert Coverart.get_cover_url(RG, "") is None
+    assert client.heads[-1].endswith(f"/{RG}/front")
+
+
+@pytest.mark.parametrize("answer", [
+    FakeResponse(503), FakeResponse(429), requests.ConnectionError("reset"),
+])
+def test_failed_lookup_raises_and_is_not_cached(caa, answer):
+    client = caa(answer)
+    with pytest.raises(requests.RequestException):
+        Coverart.get_cover_url(RG, "500")
+
+    client.answer = FakeResponse(307, "https://archive.org/download/x/front-500.jpg")
+    assert Coverart.get_cover_url(RG, "500") is not None
@@ -0,0 +1,116 @@
+import csv
+
+import pytest
+
+from catalog import Catalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    c = Catalog(str(tmp_path / "catalog.db"))
+    yield c
+    c.close()
+
+
+def poster(url, width=2000):
+    return {"url": url, "width": width, "height": 3000, "vote_count": 1}
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_cast_keeps_billing_order(catalog):
+    run = catalog.start_run("test")
+    # People inserted in another order than billed
+    catalog.record_title(run, "movie", 1, "Other", "2020-01-01", 1.0, cast=["Zoe", "Adam"])
+    catalog.record_title(run, "movie", 2, "Film", "2020-01-01", 1.0,
+                         cast=["Carl", "Adam", "Zoe", "Bea"],
+                         source="official", posters_by_lang={"en": [poster("/a.jpg")]})
+
+    [(cast,)] = catalog.conn.execute(
+        "SELECT top_billed_cast FROM v_tmdb_popular_posters WHERE title = 'Film_1'"
+    ).fetchall()
+    assert cast == "Carl | Adam | Zoe | Bea"
+
+
+def test_older_runs_keep_their_posters(catalog, tmp_path):
+    first = catalog.start_run("test")
+    catalog.record_title(first, "movie", 1, "Film", "2020-01-01", 1.0, cast=["Ann"],
+                         source="credit_block", posters_by_lang={"en": [poster("/old.jpg")]})
+    second = catalog.start_run("test")
+    catalog.record_title(second, "movie", 1, "Film", "2020-01-01", 1.0, cast=["Ann"],
+                         source="credit_block", posters_by_lang={"en": [poster("/new.jpg")]})
+
+    out = str(tmp_path / "out.csv")
+    catalog.export_csv("v_final_posters", out)
+    assert [r["poster_image_url"] for r in read_csv(out)] == ["/new.jpg"]
+
+    catalog.export_csv("v_final_posters", out, run_id=first)
+    assert [r["poster_image_url"] for r in read_csv(out)] == ["/old.jpg"]
+
+    # A later run that finds nothing leaves no current poster
+    third = catalog.start_run("test")
+    catalog.record_title(third, "movie", 1, "Film", "2020-01-01", 1.0,
+                         source="credit_block", posters_by_lang={"en": []})
+    assert catalog.posters_for("movie", 1, "en")[1] == {"credit_block": []}
+    assert catalog.export_csv("v_final_posters", out, run_id=second) == 1
+
+
+def test_rerecording_in_one_run_replaces(catalog):
+    run = catalog.start_run("test")
+    for url in ("/a.jpg", "/b.jpg"):
+        catalog.record_title(run, "movie", 1, "Film", "2020-01-01", 1.0,
+                             source="official", posters_by_lang={"en": [poster(url)]})
+
+    info, by_source, _ = catalog.posters_for("movie", 1, "en")
+    assert info["title"] == "Film"
+    assert [p["url"] for p in by_source["official"]] == ["/b.jpg"]
+    assert catalog.conn.execute("SELECT COUNT(*) FROM posters").fetchone()[0] == 1
+
+
+def test_cast_never_fetched_is_not_no_cast(catalog, tmp_path):
+    run = catalog.start_run("test")
+    # moviecreds.py: no cast
+    catalog.record_title(run, "movie", 1, "Creds", "2020-01-01", 1.0,
+                         source="credit_block", posters_by_lang={"en": [poster("/c.jpg")]})
+    # movieposters_hopefinal.py: cast fetched, but empty
+    catalog.record_title(run, "movie", 2, "Quiet", "2020-01-01", 1.0, cast=["(No Cast Listed)"],
+                         source="credit_block", posters_by_lang={"en": [poster("/q.jpg")]})
+
+    out = str(tmp_path / "final.csv")
+    catalog.export_csv("v_final_posters", out)
+    assert {r["title"]: r["top_billed_cast"] for r in read_csv(out)} == {
+        "Creds": "", "Quiet": "(No Cast Listed)"
+    }
+
+    catalog.export_csv("v_credit_posters", out)
+    rows = read_csv(out)
+    assert "top_billed_cast" not in rows[0]
+    assert sorted(r["title"] for r in rows) == ["Creds", "Quiet"]
+
+
+def test_tv_fallback_posters_are_their_own_source(catalog):
+    run = catalog.start_run("test")
+    catalog.record_title(run, "tv", 5, "Show", "2020-01-01", 1.0, source="fallback",
+                         posters_by_lang={"en": [poster("/f1.jpg"), poster("/f2.jpg")]})
+
+    rows = catalog.conn.execute("SELECT poster_image_url, source FROM v_tv_posters").fetchall()
+    assert rows == [("/f1.jpg", "fallback"), ("/f2.jpg", "fallback")]
+    assert catalog.conn.execute("SELECT COUNT(*) FROM v_final_posters").fetchone()[0] == 0
+
+
+def test_checks_remember_misses(catalog):
+    run = catalog.start_run("test")
+    assert catalog.posters_for("movie", 1, "en") is None
+
+    catalog.record_title(run, "movie", 1, "Film", "2020-01-01", 1.0, source="credit_block",
+                         posters_by_lang={"en": [], "de": [poster("/de.jpg")]})
+
+    info, by_source, checked = catalog.posters_for("movie", 1, "en")
+    assert by_source == {"credit_block": []}
+    assert set(checked) == {"credit_block"}
+    assert catalog.posters_for("movie", 1, "de")[1]["credit_block"][0]["url"] == "/de.jpg"
+    # Never looked at in French
+    assert catalog.posters_for("movie", 1, "fr") is None
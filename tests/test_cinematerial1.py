@@ -0,0 +1,104 @@
+import pytest
+
+import cinematerial1
+from cinematerial_state import CrawlState
+
+SHOW = "https://www.cinematerial.com/tv/show-1"
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class FakeFetcher:
+    """One show page holding `posters`; 304 when its ETag is sent back."""
+
+    status = 200
+    posters = ["/a.jpg", "/b.jpg"]
+    requests = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get(self, url, headers=None, **kwargs):
+        FakeFetcher.requests.append((url, dict(headers or {})))
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(self.status, " ".join(self.posters), {"ETag": '"v1"'})
+
+    def report(self):
+        return ""
+
+
+@pytest.fixture
+def crawl(tmp_path, monkeypatch):
+    failing = set()
+
+    def fake_poster(fetcher, title, url):
+        return {"title": title, "image_url": url, "local_file": "" if url in failing else "f.jpg",
+                "cast_detected": "", "year_detected": ""}
+
+    monkeypatch.setattr(cinematerial1, "PoliteFetcher", FakeFetcher)
+    monkeypatch.setattr(cinematerial1, "iter_listing_pages", lambda fetch: iter([[("Show", SHOW)]]))
+    monkeypatch.setattr(cinematerial1, "parse_poster_urls", str.split)
+    monkeypatch.setattr(cinematerial1, "process_poster", fake_poster)
+    FakeFetcher.status = 200
+    FakeFetcher.requests = []
+
+    state = CrawlState(str(tmp_path / "state.db"))
+
+    def run():
+        FakeFetcher.requests.clear()
+        return [r["image_url"] for r in cinematerial1.crawl(state=state)]
+
+    run.failing = failing
+    run.state = state
+    yield run
+    state.close()
+
+
+def test_failed_poster_is_retried_on_the_next_run(crawl):
+    crawl.failing.add("/b.jpg")
+    assert crawl() == ["/a.jpg", "/b.jpg"]
+
+    # No 304: the page is read again and only the missing poster downloaded
+    crawl.failing.clear()
+    assert crawl() == ["/b.jpg"]
+    assert FakeFetcher.requests == [(SHOW, {})]
+
+    # Everything stored now: the next visit is conditional
+    assert crawl() == []
+    assert FakeFetcher.requests == [(SHOW, {"If-None-Match": '"v1"'})]
+
+
+def test_error_page_keeps_the_stored_state(crawl):
+    crawl()
+    fingerprint = crawl.state._conn.execute("SELECT fingerprint FROM shows").fetchone()
+
+    crawl.state._conn.execute("UPDATE shows SET etag = NULL")
+    FakeFetcher.status = 500
+    assert crawl() == []
+
+    assert crawl.state._conn.execute("SELECT fingerprint FROM shows").fetchone() == fingerprint
+    assert crawl.state.update_show(SHOW, "Show", ["/a.jpg", "/b.jpg"]) == []
+
+
+def test_pagination_only_stops_early_after_a_full_walk(crawl, monkeypatch):
+    other = "https://www.cinematerial.com/tv/show-2"
+    monkeypatch.setattr(cinematerial1, "iter_listing_pages",
+                        lambda fetch: iter([[("Show", SHOW)], [("Other", other)]]))
+
+    # An earlier walk got through page 1 only
+    crawl.state.update_show(SHOW, "Show", [])
+    assert not crawl.state.listing_walked()
+
+    crawl()
+    assert sorted(url for url, _ in FakeFetcher.requests) == [SHOW, other]
+    assert crawl.state.listing_walked()
+
+    # Page 1 holds only known shows now: stop there
+    crawl()
+    assert [url for url, _ in FakeFetcher.requests] == [SHOW]
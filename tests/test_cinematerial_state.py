@@ -0,0 +1,60 @@
+import pytest
+
+from cinematerial_state import CrawlState
+
+SHOW = "https://www.cinematerial.com/tv/show-1"
+VALIDATORS = {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+@pytest.fixture
+def state(tmp_path):
+    s = CrawlState(str(tmp_path / "state.db"))
+    yield s
+    s.close()
+
+
+def poster_row(url, local_file="x.jpg"):
+    return {"title": "Show", "image_url": url, "local_file": local_file,
+            "cast_detected": "", "year_detected": ""}
+
+
+def test_validators_wait_for_the_posters(state):
+    assert state.update_show(SHOW, "Show", ["/a.jpg", "/b.jpg"]) == ["/a.jpg", "/b.jpg"]
+    # Crashed before the downloads finished: no 304 on the next visit
+    assert state.conditional_headers(SHOW) == {}
+
+    state.record_poster(SHOW, poster_row("/a.jpg"))
+    state.record_poster(SHOW, poster_row("/b.jpg"))
+    state.show_complete(SHOW, VALIDATORS, ["/a.jpg", "/b.jpg"])
+
+    assert state.conditional_headers(SHOW) == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+
+def test_only_missing_posters_are_returned(state):
+    state.update_show(SHOW, "Show", ["/a.jpg", "/b.jpg"])
+    state.record_poster(SHOW, poster_row("/a.jpg"))
+    state.record_poster(SHOW, poster_row("/b.jpg", local_file=""))
+
+    assert state.update_show(SHOW, "Show", ["/a.jpg", "/b.jpg", "/c.jpg"]) == ["/b.jpg", "/c.jpg"]
+
+
+def test_new_page_drops_old_validators(state):
+    state.update_show(SHOW, "Show", ["/a.jpg"])
+    state.record_poster(SHOW, poster_row("/a.jpg"))
+    state.show_complete(SHOW, VALIDATORS, ["/a.jpg"])
+
+    state.update_show(SHOW, "Show", ["/a.jpg", "/b.jpg"])
+    assert state.conditional_headers(SHOW) == {}
+
+
+def test_counts_new_changed_unchanged(state):
+    state.update_show(SHOW, "Show", ["/a.jpg"])
+    state.show_complete(SHOW, VALIDATORS, ["/a.jpg"])
+    state.update_show(SHOW, "Show", ["/a.jpg"])
+    state.update_show(SHOW, "Show", ["/a.jpg", "/b.jpg"])
+    state.not_modified(SHOW)
+
+    assert (state.new, state.changed, state.unchanged) == (1, 1, 2)
+    assert state.rows() == []
@@ -0,0 +1,67 @@
+import base64
+import json
+import os
+
+import pytest
+from Crypto.Cipher import AES
+
+import cookie_crypto
+from cookie_crypto import CookieDecryptError, decrypt_cookie_editor, export_format
+
+COOKIES = json.dumps([{"name": "session", "value": "abc", "domain": ".cinematerial.com"}])
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(cookie_crypto, "_known_variants", {})
+    monkeypatch.setattr(cookie_crypto, "_keys", {})
+
+
+def encrypt(text, password, variant):
+    """A Cookie Editor style export: base64(salt | iv | ciphertext | tag)."""
+    salt, iv = os.urandom(cookie_crypto.SALT_BYTES), os.urandom(cookie_crypto.IV_BYTES)
+    key = cookie_crypto.derive_key(password, salt, variant)
+    ciphertext, tag = AES.new(key, AES.MODE_GCM, iv).encrypt_and_digest(text.encode("utf-8"))
+    return base64.b64encode(salt + iv + ciphertext + tag).decode("ascii")
+
+
+@pytest.mark.parametrize("variant", cookie_crypto.KDF_VARIANTS)
+def test_round_trip_for_every_variant(variant):
+    blob = encrypt(COOKIES, "hunter2", variant)
+    assert decrypt_cookie_editor(blob, "hunter2", fmt="export") == COOKIES
+    assert cookie_crypto._known_variants["export"] == variant
+
+
+def test_wrong_password_is_an_error():
+    blob = encrypt(COOKIES, "hunter2", cookie_crypto.KDF_VARIANTS[0])
+    with pytest.raises(CookieDecryptError):
+        decrypt_cookie_editor(blob, "hunter3")
+
+
+def test_truncated_export_is_an_error():
+    with pytest.raises(CookieDecryptError):
+        decrypt_cookie_editor(base64.b64encode(b"short").decode(), "hunter2")
+
+
+def test_known_format_derives_one_key(monkeypatch):
+    fmt = export_format({"data": "", "version": 2})
+    variant = cookie_crypto.KDF_VARIANTS[1]
+    decrypt_cookie_editor(encrypt(COOKIES, "hunter2", variant), "hunter2", fmt)
+    blob = encrypt(COOKIES, "hunter2", variant)
+
+    derived = []
+    real = cookie_crypto.derive_key
+    monkeypatch.setattr(cookie_crypto, "derive_key",
+                        lambda *args: derived.append(args[2]) or real(*args))
+
+    assert decrypt_cookie_editor(blob, "hunter2", fmt) == COOKIES
+    assert derived == [variant]
+
+
+def test_known_format_falls_back_when_the_variant_changed():
+    fmt = export_format({"data": ""})
+    cookie_crypto._known_variants[fmt] = cookie_crypto.KDF_VARIANTS[0]
+
+    variant = cookie_crypto.KDF_VARIANTS[2]
+    assert decrypt_cookie_editor(encrypt(COOKIES, "hunter2", variant), "hunter2", fmt) == COOKIES
+    assert cookie_crypto._known_variants[fmt] == variant
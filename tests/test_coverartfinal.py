@@ -0,0 +1,127 @@
+import asyncio
+import io
+import json
+
+import pytest
+import requests
+
+import coverartfinal
+from coverartfinal import SpotifyAuthError, SpotifyRateLimited, spotify_search_artist
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body or {}
+        self.headers = headers or {}
+        self.text = json.dumps(self._body)
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class FakeSession:
+    def __init__(self, get=(), post=()):
+        self.get_responses = list(get)
+        self.post_responses = list(post)
+        self.gets = 0
+
+    def get(self, url, **kwargs):
+        self.gets += 1
+        return self.get_responses.pop(0) if len(self.get_responses) > 1 else self.get_responses[0]
+
+    def post(self, url, **kwargs):
+        return self.post_responses.pop(0)
+
+
+class NoLimit:
+    def acquire(self):
+        return 0.0
+
+    def pause(self, seconds):
+        pass
+
+
+class StaticToken:
+    def headers(self, stale=None):
+        return {"Authorization": "Bearer t"}
+
+
+@pytest.fixture
+def spotify(monkeypatch):
+    monkeypatch.setattr(coverartfinal, "spotify_rate", NoLimit())
+    monkeypatch.setattr(coverartfinal, "spotify_token", StaticToken())
+
+    def use(**responses):
+        session = FakeSession(**responses)
+        monkeypatch.setattr(coverartfinal, "session", session)
+        return session
+
+    return use
+
+
+def artists(*items):
+    return FakeResponse(200, {"artists": {"items": list(items)}})
+
+
+def test_best_match_and_true_miss(spotify):
+    spotify(get=[artists({"id": "1", "name": "Tool", "popularity": 70},
+                         {"id": "2", "name": "Toolbox", "popularity": 90})])
+    assert spotify_search_artist("Tool")["id"] == "1"
+
+    spotify(get=[artists()])
+    assert spotify_search_artist("Nobody") is None
+
+
+def test_server_error_is_not_a_miss(spotify):
+    spotify(get=[FakeResponse(503)])
+    with pytest.raises(requests.HTTPError):
+        spotify_search_artist("Tool")
+
+
+def test_rate_limit_exhaustion_raises(spotify):
+    session = spotify(get=[FakeResponse(429, headers={"Retry-After": "1"})])
+    with pytest.raises(SpotifyRateLimited):
+        spotify_search_artist("Tool")
+    assert session.gets == coverartfinal.SPOTIFY_MAX_RETRIES + 1
+
+
+def test_rate_limit_then_success(spotify):
+    spotify(get=[FakeResponse(429), artists({"id": "1", "name": "Tool"})])
+    assert spotify_search_artist("Tool")["id"] == "1"
+
+
+def test_token_endpoint_failure_raises(spotify, monkeypatch):
+    monkeypatch.setattr(coverartfinal, "spotify_token", coverartfinal.SpotifyToken())
+    spotify(get=[artists()], post=[FakeResponse(400, {"error": "invalid_client"})])
+    with pytest.raises(SpotifyAuthError):
+        spotify_search_artist("Tool")
+
+
+def test_resolution_counts_failures_apart_from_misses(monkeypatch):
+    def search(name):
+        if name == "down":
+            raise requests.ConnectionError("reset")
+        return {"id": name, "name": name} if name.startswith("hit") else None
+
+    monkeypatch.setattr(coverartfinal, "spotify_search_artist", search)
+    found, ck = {}, io.StringIO()
+
+    counts = asyncio.run(coverartfinal.resolve_artists(["hit1", "miss", "down", "hit2"], found, ck))
+
+    assert counts == {"found": 2, "no_match": 1, "failed": 1}
+    assert sorted(found) == ["hit1", "hit2"]
+    assert len(ck.getvalue().splitlines()) == 2
+
+
+def test_resolution_stops_on_auth_error(monkeypatch):
+    def search(name):
+        raise SpotifyAuthError("token request failed: HTTP 400")
+
+    monkeypatch.setattr(coverartfinal, "spotify_search_artist", search)
+    with pytest.raises(SpotifyAuthError):
+        asyncio.run(coverartfinal.resolve_artists(["a", "b"], {}, io.StringIO()))
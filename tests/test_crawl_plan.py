@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+
+import crawl_plan
+from crawl_plan import ResponseStats
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_workers_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "stats.json")
+    a, b = ResponseStats(path), ResponseStats(path)
+
+    a.observe("ocr", seconds=1.0)
+    b.observe("ocr", seconds=3.0)
+    b.observe("ocr", seconds=5.0)
+    a.save()
+    b.save()
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["ocr"] == {"count": 3, "bytes": 0, "seconds": 9.0}
+
+    # Saving again adds nothing twice; b now also sees a's sample
+    b.save()
+    assert ResponseStats(path).mean("ocr") == (0, 3.0, 3)
+    assert b.mean("ocr") == (0, 3.0, 3)
+
+
+def test_facts_have_their_own_field(tmp_path):
+    path = str(tmp_path / "stats.json")
+    stats = ResponseStats(path)
+    assert stats.mean_value("moviecreds.posters_tried") == (3.0, 0)
+
+    stats.observe_value("moviecreds.posters_tried", 2)
+    stats.observe_value("moviecreds.posters_tried", 4)
+    stats.save()
+
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["moviecreds.posters_tried"] == {"count": 2, "value": 6.0}
+    assert ResponseStats(path).mean_value("moviecreds.posters_tried") == (3.0, 2)
+
+
+def test_old_samples_fade_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawl_plan, "MAX_SAMPLES", 10)
+    stats = ResponseStats(str(tmp_path / "stats.json"))
+    for _ in range(11):
+        stats.observe("ocr", seconds=2.0)
+
+    _, seconds, samples = stats.mean("ocr")
+    assert samples == 5
+    assert seconds == 2.0
+
+
+def test_stale_lock_is_taken_over(tmp_path):
+    lock = str(tmp_path / "stats.json.lock")
+    open(lock, "w").close()
+    os.utime(lock, (0, 0))
+
+    with crawl_plan._file_lock(lock):
+        assert os.path.exists(lock)
+    assert not os.path.exists(lock)
+
+
+def test_importing_does_not_write_stats(tmp_path):
+    # STATS_PATH is a Windows path: elsewhere it lands relative to the cwd
+    subprocess.run(
+        [sys.executable, "-c",
+         "import sys; sys.path.insert(0, sys.argv[1]); "
+         "import tmdb_http; tmdb_http.stats.observe('ocr', seconds=1.0)", REPO],
+        cwd=tmp_path, check=True
+    )
+    written = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert written == []
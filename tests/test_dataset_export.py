@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+from PIL import Image
+
+import dataset_export
+from dataset_export import dedupe_rows, export_dataset, load_numpy_dataset
+
+
+def row(url, label="credit_block", title="Film"):
+    return {"url": url, "label": label, "title": title}
+
+
+def test_import_does_not_pull_in_the_scrapers():
+    # Fresh interpreter: other tests import the scripts into this one
+    loaded = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, dataset_export; "
+         "print(sorted({'moviecreds', 'tmdb', 'tvshowstmdb', 'tmdb_stream'} & set(sys.modules)))"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(dataset_export.__file__))
+    ).stdout.strip()
+    assert loaded == "[]"
+
+
+def test_dedupe_keeps_first_row_per_url():
+    rows, dropped, conflicts = dedupe_rows([
+        row("/a.jpg"), row("/b.jpg"), row("/a.jpg"), row("/b.jpg", label="official"),
+    ])
+
+    assert [(r["url"], r["label"]) for r in rows] == [("/a.jpg", "credit_block"),
+                                                      ("/b.jpg", "credit_block")]
+    assert dropped == 2
+    assert conflicts == {"/b.jpg"}
+
+
+def test_each_url_is_downloaded_once(tmp_path, monkeypatch):
+    downloads = []
+
+    def fake_load(url, size):
+        downloads.append(url)
+        return Image.new("RGB", size)
+
+    monkeypatch.setattr(dataset_export, "load_resized", fake_load)
+    rows = [row("/a.jpg"), row("/b.jpg", label="official"), row("/a.jpg", label="official")]
+
+    meta = export_dataset(rows, str(tmp_path), fmt="numpy", size=(4, 6), max_workers=2)
+    images, labels, classes = load_numpy_dataset(str(tmp_path))
+
+    assert sorted(downloads) == ["/a.jpg", "/b.jpg"]
+    assert meta["count"] == 2
+    assert images.shape == (2, 6, 4, 3)
+    assert sorted(np.asarray(labels).tolist()) == [0, 1]
+    assert classes == ["credit_block", "official"]
+
+
+def test_empty_numpy_dataset_loads(tmp_path, monkeypatch):
+    def broken(url, size):
+        raise OSError("404")
+
+    monkeypatch.setattr(dataset_export, "load_resized", broken)
+    export_dataset([row("/a.jpg")], str(tmp_path), fmt="numpy", size=(4, 6), max_workers=1)
+    images, labels, classes = load_numpy_dataset(str(tmp_path))
+
+    assert images.shape == (0, 6, 4, 3)
+    assert len(labels) == 0
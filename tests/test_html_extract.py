@@ -0,0 +1,43 @@
+import glob
+import os
+
+import pytest
+
+from html_extract import BACKENDS, available, get_backend
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "html")
+
+
+def pages(kind):
+    paths = sorted(glob.glob(os.path.join(FIXTURES, f"{kind}-*.html")))
+    assert paths, f"no {kind} fixtures in {FIXTURES}"
+    result = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            result.append(f.read())
+    return result
+
+
+def test_reference_output():
+    listing, posters = BACKENDS["soup"]
+    assert listing(pages("listing")[0]) == [
+        ("The Bear", "https://www.cinematerial.com/tv/the-bear-i14452964"),
+        ("Shōgun", "https://www.cinematerial.com/tv/shogun-i2788316"),
+        ("New Fallout & Friends", "https://www.cinematerial.com/tv/fallout-i12637874"),
+    ]
+    assert [len(posters(html)) for html in pages("show")] == [4, 0]
+
+
+@pytest.mark.parametrize("name", list(BACKENDS))
+def test_backend_matches_beautifulsoup(name):
+    if not available(name):
+        pytest.skip(f"{name} is not installed")
+
+    listing, posters = get_backend(name)
+    ref_listing, ref_posters = BACKENDS["soup"]
+
+    for html in pages("listing"):
+        assert listing(html) == ref_listing(html)
+    for html in pages("show"):
+        assert posters(html) == ref_posters(html)
+    assert listing("") == [] and posters("") == []
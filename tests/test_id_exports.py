@@ -0,0 +1,53 @@
+import gzip
+import json
+
+import pytest
+
+import id_exports
+
+LINES = [
+    {"adult": False, "id": 1, "original_title": "Mid", "popularity": 5.0, "video": False},
+    {"adult": True, "id": 2, "original_title": "Adult", "popularity": 90.0, "video": False},
+    {"adult": False, "id": 3, "original_title": "Top", "popularity": 50.0, "video": False},
+    {"adult": False, "id": 4, "original_title": "Video", "popularity": 80.0, "video": True},
+    {"adult": False, "id": 5, "original_title": "Tail", "popularity": 0.5, "video": False},
+    {"adult": False, "id": 6, "original_title": "Tie", "popularity": 5.0, "video": False},
+]
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / "movie_ids_05_01_2025.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for line in LINES:
+            f.write(json.dumps(line) + "\n")
+        f.write("\n")
+    return str(path)
+
+
+def test_iter_export_streams_every_line(export):
+    entries = list(id_exports.iter_export(export))
+    assert [e.id for e in entries] == [1, 2, 3, 4, 5, 6]
+    assert entries[1].adult and entries[3].video
+
+
+def test_top_by_popularity_skips_adult_and_video(export):
+    top = id_exports.top_by_popularity(id_exports.iter_export(export))
+    # Ties: lower id first
+    assert [e.id for e in top] == [3, 1, 6, 5]
+
+
+def test_limit_and_popularity_cutoff(export):
+    top = id_exports.top_by_popularity(id_exports.iter_export(export), limit=2)
+    assert [e.id for e in top] == [3, 1]
+
+    top = id_exports.top_by_popularity(id_exports.iter_export(export), min_popularity=5.0)
+    assert [e.id for e in top] == [3, 1, 6]
+
+
+def test_seed_movies_from_latest_export(export, tmp_path):
+    (tmp_path / "movie_ids_04_30_2025.json.gz").write_bytes(b"")
+    assert id_exports.latest_export("movie", str(tmp_path)) == export
+
+    movies = id_exports.seed_movies(export, limit=1)
+    assert [(m.id, m.title, m.popularity, m.release_date) for m in movies] == [(3, "Top", 50.0, None)]
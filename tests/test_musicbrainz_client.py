@@ -0,0 +1,94 @@
+import pytest
+
+import musicbrainz_client
+from musicbrainz_client import RateLimitedClient, TokenBucket
+
+
+class FakeClock:
+    """monotonic() + sleep() that only advances when slept on."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(musicbrainz_client, "time", c)
+    return c
+
+
+def test_requests_are_spaced_by_the_rate(clock):
+    bucket = TokenBucket(1.0, 1)
+    waits = [round(bucket.acquire(), 6) for _ in range(3)]
+
+    assert waits == [0.0, 1.0, 1.0]
+    assert clock.now == 2.0
+
+
+def test_burst_then_rate(clock):
+    bucket = TokenBucket(10.0, 3)
+    waits = [round(bucket.acquire(), 6) for _ in range(5)]
+    assert waits == [0.0, 0.0, 0.0, 0.1, 0.1]
+
+
+def test_idle_time_refills_up_to_burst_only(clock):
+    bucket = TokenBucket(1.0, 2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 100
+    waits = [round(bucket.acquire(), 6) for _ in range(3)]
+    assert waits == [0.0, 0.0, 1.0]
+
+
+def test_pause_starts_now_after_idle_time(clock):
+    bucket = TokenBucket(1.0, 1)
+    bucket.acquire()
+    clock.now += 100
+
+    # Without settling the refill first, the idle 100s would swallow the pause
+    bucket.pause(5)
+    assert bucket.acquire() == pytest.approx(5.0)
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_pause_right_after_a_request(clock):
+    bucket = TokenBucket(1.0, 1)
+    bucket.acquire()
+    bucket.pause(3)
+    assert bucket.acquire() == pytest.approx(3.0)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def request(self, method, url, **kwargs):
+        self.sent.append(musicbrainz_client.time.monotonic())
+        return self.responses.pop(0)
+
+
+def test_client_waits_retry_after_before_retrying(clock):
+    client = RateLimitedClient()
+    client.session = FakeSession([FakeResponse(503, {"Retry-After": "4"}), FakeResponse(200)])
+
+    r = client.get("https://musicbrainz.org/ws/2/artist/")
+
+    assert r.status_code == 200
+    assert client.session.sent == [0.0, 4.0]
+    assert client.requests == {"musicbrainz.org": 2}
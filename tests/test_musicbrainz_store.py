@@ -0,0 +1,87 @@
+import io
+import json
+import tarfile
+
+import pytest
+
+import musicbrainz_store
+from musicbrainz_store import MusicBrainzStore
+
+ARTISTS = [
+    {"id": "a1", "name": "Alpha", "sort-name": "Alpha", "type": "Group", "rating": {"votes-count": 5}},
+    {"id": "a2", "name": "Beta", "type": "Group", "rating": {"votes-count": 50}},
+    {"id": "a3", "name": "Solo", "type": "Person"},
+]
+
+RELEASE_GROUPS = [
+    {"id": "rg2", "title": "Second", "primary-type": "Album", "first-release-date": "2001",
+     "secondary-types": ["Live"], "artist-credit": [{"artist": {"id": "a1"}}]},
+    {"id": "rg1", "title": "First", "primary-type": "Album", "first-release-date": "1999",
+     "artist-credit": [{"artist": {"id": "a1"}}, {"artist": {"id": "a2"}}]},
+    {"id": "rg3", "title": "Single", "primary-type": "Single", "first-release-date": "2000",
+     "artist-credit": [{"artist": {"id": "a1"}}]},
+]
+
+
+def lines(records):
+    return "".join(json.dumps(r) + "\n\n" for r in records).encode("utf-8")
+
+
+def write_dump(path, members):
+    with tarfile.open(path, "w:xz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = MusicBrainzStore(str(tmp_path / "mb.db"))
+    yield s
+    s.close()
+
+
+def test_ingest_dump_archives(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(musicbrainz_store, "BATCH_SIZE", 2)
+    write_dump(tmp_path / "artist.tar.xz", {"TIMESTAMP": b"2024", "mbdump/artist": lines(ARTISTS)})
+    write_dump(tmp_path / "release-group.tar.xz", {"mbdump/release-group": lines(RELEASE_GROUPS)})
+
+    assert store.ingest(str(tmp_path / "artist.tar.xz")) == 3
+    assert store.ingest(str(tmp_path / "release-group.tar.xz")) == 3
+
+    assert store.counts() == {"artists": 3, "release_groups": 3,
+                              "release_group_types": 1, "artist_release_groups": 4}
+    assert store.top_artists(10) == [{"id": "a2", "name": "Beta"}, {"id": "a1", "name": "Alpha"}]
+    assert [rg["id"] for rg in store.release_groups("a1")] == ["rg1", "rg2"]
+    assert store.is_loaded("a1")
+    assert not store.is_loaded("unknown")
+
+
+def test_ingest_extracted_file(store, tmp_path):
+    path = tmp_path / "artist"
+    path.write_bytes(lines(ARTISTS))
+    assert store.ingest(str(path)) == 3
+
+    other = tmp_path / "label"
+    other.write_bytes(b"{}\n")
+    with pytest.raises(ValueError):
+        store.ingest(str(other))
+
+
+def test_web_top_up_keeps_dump_data(store):
+    with store.conn:
+        store.add_artists(ARTISTS[:1])
+        store.add_artists([{"id": "a1", "name": "Alpha (web)", "type": "Group"},
+                           {"id": "a9", "name": "Web Only", "type": "Group"}], source="web")
+        store.add_release_groups([{"id": "rg9", "title": "Browsed", "primary-type": "Album"}],
+                                 artist_id="a9")
+        store.mark_loaded(["a9"], "web")
+
+    source, votes = store.conn.execute("SELECT source, rating_votes FROM artists WHERE id = 'a1'").fetchone()
+    assert (source, votes) == ("dump", 5)
+
+    # No release-group dump loaded: only topped-up artists count as complete
+    assert not store.is_loaded("a1")
+    assert store.is_loaded("a9")
+    assert [rg["title"] for rg in store.release_groups("a9")] == ["Browsed"]
@@ -0,0 +1,95 @@
+import pytest
+
+import polite_crawler
+from polite_crawler import PoliteFetcher
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Answers with `responses` in order (then 200) and notes when each request was sent."""
+
+    def __init__(self, clock, *responses):
+        self.clock = clock
+        self.responses = list(responses)
+        self.sent = []
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def get(self, url, **kwargs):
+        self.sent.append((url, self.clock.now))
+        return self.responses.pop(0) if self.responses else FakeResponse()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(polite_crawler, "time", clock)
+    return clock
+
+
+def sent_at(session, host="a.test"):
+    return [t - 100.0 for url, t in session.sent if host in url]
+
+
+def test_each_slot_keeps_its_own_delay(clock):
+    session = FakeSession(clock)
+    fetcher = PoliteFetcher(session, max_per_host=2, delay=1.0)
+
+    for i in range(4):
+        fetcher.get(f"https://a.test/{i}")
+    fetcher.get("https://b.test/")
+
+    # Two slots: two requests per delay, not one
+    assert sent_at(session) == [0.0, 0.0, 1.0, 1.0]
+    # Another host has its own slots
+    assert sent_at(session, "b.test") == [1.0]
+    assert fetcher.waited == 1.0
+
+
+def test_per_host_delay_override(clock):
+    session = FakeSession(clock)
+    fetcher = PoliteFetcher(session, max_per_host=1, delay=1.0, delays={"a.test": 3.0})
+
+    for _ in range(3):
+        fetcher.get("https://a.test/")
+    assert sent_at(session) == [0.0, 3.0, 6.0]
+
+
+def test_429_parks_the_slot_for_retry_after(clock):
+    session = FakeSession(clock, FakeResponse(429, {"Retry-After": "5"}), FakeResponse(429))
+    fetcher = PoliteFetcher(session, max_per_host=1, delay=1.0)
+
+    resp = fetcher.get("https://a.test/")
+
+    assert resp.status_code == 200
+    # Retry-After 5s, then no header: delay * 2 ** 2
+    assert sent_at(session) == [0.0, 5.0, 9.0]
+
+
+def test_gives_up_after_max_retries(clock, monkeypatch):
+    monkeypatch.setattr(polite_crawler, "MAX_RETRIES", 1)
+    session = FakeSession(clock, FakeResponse(503), FakeResponse(503), FakeResponse(200))
+    fetcher = PoliteFetcher(session, max_per_host=1, delay=1.0)
+
+    assert fetcher.get("https://a.test/").status_code == 503
+    assert sent_at(session) == [0.0, 2.0]
@@ -0,0 +1,122 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import moviecreds
+import poster_service
+import tmdb_http
+from poster_service import PosterLookup, UnknownTitle
+
+DETAILS = {
+    "id": 7, "title": "Film", "release_date": "2020-01-01", "popularity": 2.0,
+    "images": {"posters": [
+        {"file_path": "/p.jpg", "width": 2000, "height": 3000, "iso_639_1": "en", "vote_count": 3}
+    ]},
+}
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.content = json.dumps(body).encode()
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def tmdb_api(monkeypatch):
+    calls = []
+
+    def get(url, params=None, **kwargs):
+        calls.append(url)
+        if url.endswith("/404"):
+            return FakeResponse({"status_code": 34}, 404)
+        return FakeResponse(DETAILS)
+
+    monkeypatch.setattr(tmdb_http, "get", get)
+    monkeypatch.setattr(moviecreds, "API_KEY", "test-key", raising=False)
+    monkeypatch.setattr(moviecreds, "WRITE_POSTER_STORE", False)
+    # No credit-block poster on any title
+    monkeypatch.setattr(moviecreds, "pick_credit_poster", lambda movie, posters, language: None)
+    return calls
+
+
+def lookup_once(db, tmdb_id):
+    service = PosterLookup(db)
+    try:
+        return service.lookup(tmdb_id, "en")
+    finally:
+        service.close()
+
+
+def test_miss_is_served_from_the_catalog_after_a_restart(tmp_path, tmdb_api):
+    db = str(tmp_path / "catalog.db")
+
+    answer, source = lookup_once(db, 7)
+    assert source == "tmdb"
+    assert answer["credit_block_poster"] is None
+    assert answer["official_posters"][0]["url"].endswith("/p.jpg")
+
+    answer, source = lookup_once(db, 7)
+    assert source == "catalog"
+    assert answer["credit_block_poster"] is None
+    assert answer["title"] == "Film"
+    assert len(tmdb_api) == 1
+
+
+def test_old_miss_is_fetched_again(tmp_path, tmdb_api, monkeypatch):
+    db = str(tmp_path / "catalog.db")
+    lookup_once(db, 7)
+
+    later = datetime.now() + timedelta(days=poster_service.MISS_TTL_DAYS + 1)
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return later
+
+    monkeypatch.setattr(poster_service, "datetime", Later)
+    assert lookup_once(db, 7)[1] == "tmdb"
+    assert len(tmdb_api) == 2
+
+
+def test_cached_miss_expires_in_memory(tmp_path, tmdb_api, monkeypatch):
+    service = PosterLookup(str(tmp_path / "catalog.db"))
+    try:
+        assert service.lookup(7)[1] == "tmdb"
+        assert service.lookup(7)[1] == "memory"
+
+        later = datetime.now() + timedelta(days=poster_service.MISS_TTL_DAYS + 1)
+
+        class Later(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return later
+
+        monkeypatch.setattr(poster_service, "datetime", Later)
+        assert service.lookup(7)[1] == "tmdb"
+        assert len(tmdb_api) == 2
+    finally:
+        service.close()
+
+
+def test_memory_and_unknown_titles(tmp_path, tmdb_api):
+    service = PosterLookup(str(tmp_path / "catalog.db"))
+    try:
+        assert service.lookup(7)[1] == "tmdb"
+        assert service.lookup(7)[1] == "memory"
+        with pytest.raises(UnknownTitle):
+            service.lookup(404)
+    finally:
+        service.close()
+
+
+def test_lru_evicts_least_recently_used():
+    cache = poster_service.LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
@@ -0,0 +1,69 @@
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tmdb
+from poster_store import RULES, PosterStore, select_posters
+from tmdb_records import Poster
+
+
+def posters(seed, n=12):
+    rnd = random.Random(seed)
+    return [
+        Poster(file_path=f"/{seed}-{i}{rnd.choice(['', '-textless', '-clean'])}.jpg",
+               width=rnd.choice([1000, 1500, 2000]), height=rnd.choice([1500, 3000]),
+               iso_639_1=rnd.choice(["en", "de", None]), vote_count=rnd.randint(0, 3))
+        for i in range(n)
+    ]
+
+
+def test_concurrent_writes_of_one_title(tmp_path):
+    store = PosterStore(str(tmp_path))
+    lists = [posters(seed) for seed in range(16)]
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda ps: store.write_title("movie", 1, ps), lists))
+
+    folder = os.path.join(str(tmp_path), "kind=movie", "title_id=1")
+    assert os.listdir(folder) == ["posters.parquet"]
+    table = store.load("movie")
+    assert table.num_rows == 12
+    assert table["file_path"].to_pylist() in [[p.file_path for p in ps] for ps in lists]
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    import poster_store
+
+    def broken(table, path):
+        with open(path, "wb") as f:
+            f.write(b"half")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(poster_store.pq, "write_table", broken)
+    folder = os.path.join(str(tmp_path), "kind=tv", "title_id=9")
+    with pytest.raises(OSError):
+        PosterStore(str(tmp_path)).write_title("tv", 9, posters(1))
+    assert os.listdir(folder) == []
+
+
+def test_vectorised_selection_matches_per_title_rules(tmp_path):
+    store = PosterStore(str(tmp_path))
+    by_title = {title_id: posters(title_id) for title_id in range(1, 30)}
+    for title_id, ps in by_title.items():
+        store.write_title("movie", title_id, ps)
+
+    picked = select_posters(store.load("movie"), ["en", "de"], **RULES["theatrical"])
+
+    got = {}
+    for row in picked.to_pylist():
+        got.setdefault((row["title_id"], row["iso_639_1"]), []).append((row["rank"], row["file_path"]))
+
+    expected = {}
+    for title_id, ps in by_title.items():
+        for lang, chosen in tmdb.pick_posters_by_language(ps, ["en", "de"]).items():
+            if chosen:
+                expected[(title_id, lang)] = [(i, p.file_path) for i, p in enumerate(chosen, start=1)]
+
+    assert got == expected
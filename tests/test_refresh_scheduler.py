@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import refresh_scheduler
+from catalog import Catalog
+from refresh_scheduler import RefreshScheduler, refresh_interval
+
+NOW = datetime(2025, 6, 1)
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(refresh_scheduler, "JITTER", 0.0)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    c = Catalog(str(tmp_path / "catalog.db"))
+    run = c.start_run("test")
+    for tmdb_id in (1, 2):
+        c.record_title(run, "movie", tmdb_id, f"Film {tmdb_id}", "2010-01-01", 5.0)
+    yield c
+    c.close()
+
+
+def titles(*ids):
+    return [SimpleNamespace(id=i) for i in ids]
+
+
+def test_interval_shrinks_for_popular_and_recent_titles():
+    tail = refresh_interval(0, "2000-01-01", today=NOW)
+    popular = refresh_interval(100, "2000-01-01", today=NOW)
+    recent = refresh_interval(0, "2025-05-01", today=NOW)
+
+    assert tail == refresh_scheduler.MAX_INTERVAL_DAYS
+    assert popular < tail / 4
+    assert recent == tail / 4
+
+
+def test_interval_follows_observed_changes():
+    never = refresh_interval(5, "2010-01-01", checks=10, changes=0, today=NOW)
+    always = refresh_interval(5, "2010-01-01", checks=10, changes=10, today=NOW)
+    assert always < never
+    assert refresh_interval(1000, "2025-06-01", checks=10, changes=10, today=NOW) \
+        == refresh_scheduler.MIN_INTERVAL_DAYS
+
+
+def test_new_and_overdue_titles_are_due(catalog):
+    scheduler = RefreshScheduler(catalog)
+    next_due = scheduler.record("movie", "official", 1, 5.0, "2010-01-01", ["/a.jpg"], now=NOW)
+
+    assert [t.id for t in scheduler.due("movie", "official", titles(1, 2), now=NOW)] == [2]
+    assert [t.id for t in scheduler.due("movie", "official", titles(1, 2), now=next_due)] == [1, 2]
+
+
+def test_sources_keep_their_own_schedule(catalog):
+    scheduler = RefreshScheduler(catalog)
+
+    # tmdb.py and moviecreds.py take turns on the same title, each picking
+    # the same posters as last time but different ones from the other
+    for day in range(4):
+        now = NOW + timedelta(days=day)
+        scheduler.record("movie", "official", 1, 5.0, "2010-01-01", ["/official.jpg"], now=now)
+        scheduler.record("movie", "credit_block", 1, 5.0, "2010-01-01", ["/credits.jpg"], now=now)
+
+    rows = catalog.conn.execute(
+        "SELECT source, checks, changes FROM title_refresh ORDER BY source"
+    ).fetchall()
+    assert rows == [("credit_block", 3, 0), ("official", 3, 0)]
+
+    # A check by one script does not make the title "done" for the other
+    scheduler.record("movie", "official", 2, 5.0, "2010-01-01", ["/b.jpg"], now=NOW)
+    assert [t.id for t in scheduler.due("movie", "credit_block", titles(2), now=NOW)] == [2]
+    assert scheduler.due("movie", "official", titles(2), now=NOW) == []
+
+
+
+def test_failed_fetch_is_retried_soon_without_counting_a_check(catalog):
+    scheduler = RefreshScheduler(catalog)
+    scheduler.record("movie", "official", 1, 5.0, "2010-01-01", ["/a.jpg"], now=NOW)
+
+    later = NOW + timedelta(days=200)
+    retry_at = scheduler.record_failure("movie", "official", 1, now=later)
+    assert retry_at == later + timedelta(hours=refresh_scheduler.RETRY_DELAY_HOURS)
+    assert scheduler.due("movie", "official", titles(1), now=later) == []
+    assert [t.id for t in scheduler.due("movie", "official", titles(1), now=retry_at)] == [1]
+
+    row = catalog.conn.execute(
+        "SELECT fingerprint, checks, changes FROM title_refresh WHERE source = 'official'"
+    ).fetchone()
+    assert row == (refresh_scheduler.fingerprint(["/a.jpg"]), 0, 0)
+
+    # First failure of a title never checked by this source: no fingerprint to compare with
+    scheduler.record_failure("movie", "credit_block", 2, now=NOW)
+    scheduler.record("movie", "credit_block", 2, 5.0, "2010-01-01", ["/b.jpg"], now=NOW)
+    assert catalog.conn.execute(
+        "SELECT checks, changes FROM title_refresh WHERE source = 'credit_block'"
+    ).fetchone() == (0, 0)
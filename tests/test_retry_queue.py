@@ -0,0 +1,172 @@
+import email.utils
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+import retry_queue
+from retry_queue import (CircuitOpenError, HostCircuitBreaker, RetryQueue,
+                         is_transient, retry_after, retry_after_header, run_with_retries)
+
+
+def http_error(status, headers=None, url="https://api.example.org/x"):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response.request = requests.Request("GET", url).prepare()
+    return requests.HTTPError(response=response, request=response.request)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(retry_queue.time, "monotonic", c)
+    return c
+
+
+def test_transient_errors():
+    assert is_transient(requests.Timeout())
+    assert is_transient(requests.ConnectionError())
+    assert is_transient(CircuitOpenError("h", 0.0))
+    assert is_transient(http_error(429))
+    assert is_transient(http_error(503))
+    assert not is_transient(http_error(404))
+    assert not is_transient(ValueError())
+
+
+def test_retry_after_header():
+    assert retry_after(http_error(429, {"Retry-After": "7"})) == 7.0
+    assert retry_after(http_error(429, {"Retry-After": "soon"})) == 0.0
+    assert retry_after(requests.Timeout()) == 0.0
+
+
+def test_retry_after_http_date():
+    later = email.utils.format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60),
+                                        usegmt=True)
+    earlier = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+    assert 55 < retry_after_header(http_error(503, {"Retry-After": later}).response) <= 60
+    assert retry_after_header(http_error(503, {"Retry-After": earlier}).response) == 0.0
+
+    # "-0000" zone: parsed as a naive datetime, still UTC
+    naive = (datetime.now(timezone.utc) + timedelta(seconds=60)).strftime("%a, %d %b %Y %H:%M:%S -0000")
+    assert 55 < retry_after_header(http_error(503, {"Retry-After": naive}).response) <= 60
+
+
+def test_retry_after_is_finite_and_capped():
+    for value in ("inf", "-inf", "nan", "Infinity"):
+        assert retry_after_header(http_error(429, {"Retry-After": value}).response) == 0.0
+
+    far = http_error(429, {"Retry-After": "86400"}).response
+    assert retry_after_header(far) == retry_queue.MAX_RETRY_AFTER
+    assert retry_after_header(far, cap=10.0) == 10.0
+
+
+def test_backoff_grows_and_gives_up(clock, monkeypatch):
+    monkeypatch.setattr(retry_queue.random, "random", lambda: 1.0)
+    q = RetryQueue(base_delay=2.0, max_delay=10.0, max_attempts=4)
+
+    assert q.push("a", 1)
+    assert q.next_due() == clock.now + 2.0
+    assert q.push("b", 3)
+    assert max(e[0] for e in q._heap) == clock.now + 8.0
+    assert q.push("c", 3, not_before=30.0)
+    assert max(e[0] for e in q._heap) == clock.now + 30.0
+
+    assert not q.push("d", 4)
+    assert not q.push("e", 1, first_failed=clock.now - q.give_up_after - 1)
+    assert len(q) == 3
+
+
+def test_pop_ready_respects_backoff_and_breaker(clock, monkeypatch):
+    monkeypatch.setattr(retry_queue.random, "random", lambda: 1.0)
+    breaker = HostCircuitBreaker(failure_threshold=1, cooldown=60.0)
+    q = RetryQueue(base_delay=1.0)
+    q.push("open", 1, host="down.example.org")
+    q.push("fine", 1, host="up.example.org")
+    breaker.record_failure("down.example.org")
+
+    assert q.pop_ready(breaker) == []
+    clock.now += 1.0
+    assert [item for item, _, _ in q.pop_ready(breaker)] == ["fine"]
+    assert len(q) == 1
+
+    clock.now += 60.0
+    assert [item for item, _, _ in q.pop_ready(breaker)] == ["open"]
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = HostCircuitBreaker(failure_threshold=2, cooldown=10.0, max_cooldown=15.0)
+    host = "image.tmdb.org"
+
+    breaker.record_failure(host)
+    breaker.before_request(host)
+    breaker.record_failure(host)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(host)
+
+    # Half-open: one probe, everyone else still fails fast
+    clock.now += 10.0
+    breaker.before_request(host)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(host)
+
+    # Failed probe: re-opened with a doubled (capped) cooldown
+    breaker.record_failure(host)
+    assert breaker.retry_at(host) == clock.now + 15.0
+
+    clock.now += 15.0
+    breaker.before_request(host)
+    breaker.record_success(host)
+    breaker.before_request(host)
+    assert breaker.retry_at(host) == 0.0
+
+
+def test_run_with_retries_retries_transient_failures():
+    calls = {}
+    lock = threading.Lock()
+
+    def fn(item):
+        with lock:
+            calls[item] = calls.get(item, 0) + 1
+            n = calls[item]
+        if item == "flaky" and n < 3:
+            raise requests.Timeout("slow")
+        if item == "broken":
+            raise ValueError("bad payload")
+        return item.upper()
+
+    results = {}
+    failed = run_with_retries(
+        fn, ["ok", "flaky", "broken"], max_workers=2,
+        on_result=results.__setitem__,
+        retry_queue=RetryQueue(base_delay=0.01, max_delay=0.02),
+    )
+
+    assert results == {"ok": "OK", "flaky": "FLAKY"}
+    assert calls["flaky"] == 3
+    assert [(item, type(e)) for item, e in failed] == [("broken", ValueError)]
+
+
+def test_run_with_retries_gives_up_after_max_attempts():
+    def fn(item):
+        raise http_error(503)
+
+    start = time.monotonic()
+    failed = run_with_retries(
+        fn, ["x"], max_workers=1, on_result=lambda *a: None,
+        retry_queue=RetryQueue(base_delay=0.01, max_delay=0.01, max_attempts=3),
+    )
+
+    assert [item for item, _ in failed] == ["x"]
+    assert time.monotonic() - start < 5
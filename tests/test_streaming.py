@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from streaming import stream_map
+
+
+def test_yields_every_item_and_reports_failures():
+    failed = []
+
+    def fn(n):
+        if n == 3:
+            raise ValueError("boom")
+        return n * n
+
+    results = dict(stream_map(fn, range(6), max_workers=3,
+                              on_error=lambda item, exc: failed.append(item)))
+
+    assert results == {0: 0, 1: 1, 2: 4, 4: 16, 5: 25}
+    assert failed == [3]
+
+
+def test_on_error_none_reraises():
+    def fn(n):
+        raise ValueError(n)
+
+    with pytest.raises(ValueError):
+        list(stream_map(fn, range(3), on_error=None))
+
+
+def test_input_is_read_lazily():
+    read = []
+
+    def items():
+        for n in range(100):
+            read.append(n)
+            yield n
+
+    stream = stream_map(lambda n: n, items(), max_workers=2, max_pending=4)
+    next(stream)
+    stream.close()
+
+    # max_pending up front, plus one refill per finished item
+    assert len(read) <= 6
+
+
+def test_leaving_early_cancels_queued_work():
+    started = []
+    lock = threading.Lock()
+
+    def fn(n):
+        with lock:
+            started.append(n)
+        time.sleep(0.05)
+        return n
+
+    stream = stream_map(fn, range(50), max_workers=2, max_pending=10)
+    next(stream)
+    stream.close()
+    time.sleep(0.2)
+
+    assert len(started) < 10
@@ -0,0 +1,163 @@
+import json
+
+import pytest
+import requests
+
+import tmdb
+from poster_store import PosterStore
+from tmdb_records import Movie, Poster
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.content = json.dumps(body).encode()
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+
+POSTERS = {"posters": [
+    {"file_path": "/big.jpg", "width": 2000, "height": 3000, "iso_639_1": "en", "vote_count": 5},
+    {"file_path": "/small.jpg", "width": 1000, "height": 1500, "iso_639_1": "en", "vote_count": 9},
+]}
+CREDITS = {"cast": [{"name": "Ann"}, {"name": "Bob"}]}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """URL -> (body, status) served by the fake session."""
+    routes = {}
+
+    def get(url, params=None, **kwargs):
+        body, status = routes[url]
+        return FakeResponse(body, status)
+
+    monkeypatch.setattr(tmdb.session, "get", get)
+    monkeypatch.setattr(tmdb, "LANGUAGES", ["en"])
+    # The key is not kept in the repo
+    monkeypatch.setattr(tmdb, "API_KEY", "test-key", raising=False)
+    return routes
+
+
+def test_store_write_error_is_not_a_poster_fetch_error(api, monkeypatch, capsys):
+    api[tmdb.IMAGES_URL.format(id=7)] = (POSTERS, 200)
+    api[tmdb.CREDITS_URL.format(id=7)] = (CREDITS, 200)
+
+    def broken(self, kind, title_id, posters):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(PosterStore, "write_title", broken)
+    rows = tmdb.fetch_movie_assets(Movie(id=7, title="Film", release_date="2020-01-01"))
+
+    assert [r["poster_url"] for r in rows] == [tmdb.IMAGE_BASE + "/big.jpg"]
+    assert rows[0]["top_billed_cast"] == "Ann | Bob"
+    out = capsys.readouterr().out
+    assert "Poster store write failed for 7: disk full" in out
+    assert "Poster fetch failed" not in out
+
+
+NOT_FOUND = {"success": False, "status_code": 34,
+             "status_message": "The resource you requested could not be found."}
+
+
+def test_seeded_404_is_skipped(api, capsys):
+    api[tmdb.DETAILS_URL.format(id=404)] = (NOT_FOUND, 404)
+    seeded = Movie(id=404, title="Deleted")
+
+    assert tmdb.fetch_movie_assets(seeded) is None
+    assert seeded == Movie(id=404, title="Deleted")
+
+
+def test_seeded_network_error_raises(api, monkeypatch):
+    def down(url, params=None, **kwargs):
+        raise requests.ConnectionError("reset")
+
+    monkeypatch.setattr(tmdb.session, "get", down)
+    with pytest.raises(requests.ConnectionError):
+        tmdb.fetch_movie_assets(Movie(id=1, title="X"))
+
+
+def test_seeded_movie_outside_date_range_is_skipped(api):
+    api[tmdb.DETAILS_URL.format(id=3)] = ({"id": 3, "title": "Old", "release_date": "1999-01-01"}, 200)
+    assert tmdb.fetch_movie_assets(Movie(id=3, title="Old")) is None
+
+
+def test_failed_images_call_raises_instead_of_no_posters(api):
+    api[tmdb.IMAGES_URL.format(id=7)] = ({}, 503)
+    api[tmdb.CREDITS_URL.format(id=7)] = (CREDITS, 200)
+
+    with pytest.raises(requests.HTTPError):
+        tmdb.fetch_movie_assets(Movie(id=7, title="Film", release_date="2020-01-01"))
+
+
+def test_seeded_movie_keeps_caller_record_and_carries_title(api, monkeypatch, tmp_path):
+    api[tmdb.DETAILS_URL.format(id=9)] = ({
+        "id": 9, "title": "Under_Score Film", "release_date": "2020-05-01", "popularity": 3.0,
+        "images": POSTERS, "credits": CREDITS,
+    }, 200)
+    monkeypatch.setattr(tmdb, "WRITE_POSTER_STORE", False)
+    monkeypatch.setattr(tmdb, "REFRESH_SCHEDULE", False)
+    seeded = Movie(id=9, title="original title")
+
+    rows = tmdb.fetch_movie_assets(seeded)
+
+    assert seeded.release_date is None
+    assert rows[0]["title"] == "Under_Score Film_1"
+    assert rows[0]["movie_title"] == "Under_Score Film"
+
+    from catalog import Catalog
+    catalog = Catalog(str(tmp_path / "c.db"))
+    tmdb.save_to_catalog(catalog, catalog.start_run("test"), seeded, rows)
+    assert catalog.posters_for("movie", 9, "en")[0] == {
+        "title": "Under_Score Film", "release_date": "2020-05-01", "popularity": 0.0
+    }
+    catalog.close()
+
+
+def test_posters_ranked_by_votes_then_size_per_language():
+    posters = [
+        Poster(file_path="/en_small.jpg", width=1500, height=2250, iso_639_1="en", vote_count=9),
+        Poster(file_path="/en_big.jpg", width=2000, height=3000, iso_639_1="en", vote_count=9),
+        Poster(file_path="/en_top.jpg", width=1500, height=2250, iso_639_1="en", vote_count=20),
+        Poster(file_path="/en_narrow.jpg", width=1000, height=1500, iso_639_1="en", vote_count=99),
+        Poster(file_path="/de.jpg", width=2000, height=3000, iso_639_1="de", vote_count=1),
+        Poster(file_path="/fr.jpg", width=2000, height=3000, iso_639_1="fr", vote_count=1),
+    ] + [Poster(file_path=f"/en_{i}.jpg", width=1500, height=2250, iso_639_1="en") for i in range(5)]
+
+    picked = tmdb.pick_posters_by_language(posters, ["en", "de"])
+
+    assert set(picked) == {"en", "de"}
+    assert [p.file_path for p in picked["en"]][:3] == ["/en_top.jpg", "/en_big.jpg", "/en_small.jpg"]
+    assert len(picked["en"]) == 5
+    assert [p.file_path for p in picked["de"]] == ["/de.jpg"]
+    assert tmdb.pick_theatrical_posters(posters, "de") == picked["de"]
+
+
+def test_textless_posters_are_never_picked():
+    # iso_639_1 null is TMDB's textless artwork: not a fallback for any language
+    posters = [Poster(file_path=f"/{i}.jpg", width=2000, height=3000, iso_639_1=lang, vote_count=50)
+               for i, lang in enumerate([None, "", "null"])]
+    posters.append(Poster(file_path="/en.jpg", width=2000, height=3000, iso_639_1="en"))
+
+    assert tmdb.pick_posters_by_language(posters, ["en", "de"]) == {"en": [posters[-1]], "de": []}
+
+
+def test_one_output_file_per_language(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tmdb, "LANGUAGES", ["en", "de", "pt"])
+    en = Poster(file_path="/en.jpg", width=2000, height=3000, iso_639_1="en")
+    de = Poster(file_path="/de.jpg", width=2000, height=3000, iso_639_1="de")
+    rows = tmdb.build_rows(Movie(id=1, title="Film", release_date="2020-01-01"),
+                           {"en": [en], "de": [de]}, "Ann")
+
+    tmdb.write_outputs(rows)
+
+    english = (tmp_path / "tmdb_popular_official_english_posters_2014_2025.csv").read_text()
+    german = (tmp_path / "tmdb_popular_official_german_posters_2014_2025.csv").read_text()
+    other = (tmp_path / "tmdb_popular_official_pt_posters_2014_2025.csv").read_text()
+    assert "/en.jpg" in english and "/de.jpg" not in english
+    assert "/de.jpg" in german and "/en.jpg" not in german
+    assert other.strip() == ("title,release_date,popularity,poster_url,width,"
+                             "height,language,vote_count,top_billed_cast")
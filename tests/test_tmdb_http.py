@@ -0,0 +1,196 @@
+import io
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import tmdb_http
+
+
+class FakeResponse:
+    def __init__(self, body, delay=0.0, status_code=200):
+        self.body = body
+        self.content = body
+        self.delay = delay
+        self.status_code = status_code
+        self.headers = {"Content-Length": str(len(body))}
+        self.url = "https://image.tmdb.org/t/p/original/x.jpg"
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        time.sleep(self.delay)
+        yield self.body
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(tmdb_http, "download_latency", tmdb_http.LatencyTracker())
+    monkeypatch.setattr(tmdb_http, "COALESCE_REQUESTS", False)
+    monkeypatch.setattr(tmdb_http, "image_budget", None)
+
+
+def serve(monkeypatch, *delays, body=b"x" * 100):
+    """The n-th request to the fake session takes delays[n] seconds."""
+    calls = iter(delays)
+    lock = threading.Lock()
+
+    def get(url, params=None, timeout=None, **kwargs):
+        with lock:
+            delay = next(calls)
+        return FakeResponse(body, delay)
+
+    monkeypatch.setattr(tmdb_http.session, "get", get)
+
+
+def test_hedge_win_records_latency_since_first_attempt(fresh, monkeypatch):
+    monkeypatch.setattr(tmdb_http, "HEDGE_DEFAULT_DELAY", 0.3)
+    serve(monkeypatch, 2.0, 0.05)
+
+    buf, reserved = tmdb_http.download("https://image.tmdb.org/t/p/original/x.jpg",
+                                       hedge=True, deadline=5)
+
+    tracker = tmdb_http.download_latency
+    assert (buf, reserved) == (b"x" * 100, 0)
+    assert (tracker.hedged, tracker.hedge_wins) == (1, 1)
+    # Hedge fired after the cold-start delay (0.3s), then took 0.05s: the
+    # caller waited ~0.35s, not 0.05s
+    assert 0.3 <= tracker.quantile(0.5) < 2.0
+
+
+def test_deadline_miss_is_a_timeout(fresh, monkeypatch):
+    serve(monkeypatch, 1.0)
+
+    with pytest.raises(tmdb_http.DownloadDeadlineExceeded):
+        tmdb_http.download("https://image.tmdb.org/t/p/original/x.jpg", hedge=False, deadline=0.2)
+    assert tmdb_http.download_latency.deadline_misses == 1
+
+
+def test_hedge_delay_follows_p95(fresh):
+    tracker = tmdb_http.download_latency
+    assert tracker.hedge_delay() == tmdb_http.HEDGE_DEFAULT_DELAY
+
+    for i in range(100):
+        tracker.record(0.5 if i < 95 else 2.0)
+    assert tracker.hedge_delay() == 2.0
+
+
+def test_open_poster_returns_budget(fresh, monkeypatch):
+    png = io.BytesIO()
+    Image.new("RGB", (20, 30)).save(png, "PNG")
+    serve(monkeypatch, 0.0, body=png.getvalue())
+    tmdb_http.set_inflight_budget(10 ** 6)
+
+    with tmdb_http.open_poster("https://image.tmdb.org/t/p/original/x.png", 20, 30) as img:
+        assert img.size == (20, 30)
+        assert tmdb_http.image_budget.in_use > 0
+    assert tmdb_http.image_budget.in_use == 0
+
+
+def test_byte_budget_blocks_until_released():
+    budget = tmdb_http.ByteBudget(100)
+    assert budget.acquire(80) == 80
+    # Oversized single items are capped so they can still run alone
+    got = []
+    t = threading.Thread(target=lambda: got.append(budget.acquire(500)))
+    t.start()
+    time.sleep(0.05)
+    assert got == []
+
+    budget.release(80)
+    t.join(1)
+    assert got == [100]
+    assert budget.peak == 100
+
+
+@pytest.fixture
+def coalesced(fresh, monkeypatch):
+    monkeypatch.setattr(tmdb_http, "COALESCE_REQUESTS", True)
+    monkeypatch.setattr(tmdb_http, "flights", tmdb_http.SingleFlight())
+
+
+def run_together(n, fn, release):
+    """n threads call fn(); `release` is set once n - 1 of them wait on the leader."""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+
+    deadline = time.monotonic() + 2
+    while tmdb_http.flights.shared < n - 1 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+
+    for t in threads:
+        t.join(2)
+    return results, errors
+
+
+def blocking_session(monkeypatch, release, respond):
+    calls = []
+
+    def get(url, params=None, timeout=None, **kwargs):
+        calls.append(url)
+        release.wait(2)
+        return respond()
+
+    monkeypatch.setattr(tmdb_http.session, "get", get)
+    return calls
+
+
+def test_concurrent_gets_share_one_request(coalesced, monkeypatch):
+    release = threading.Event()
+    resp = FakeResponse(b"{}")
+    calls = blocking_session(monkeypatch, release, lambda: resp)
+
+    results, errors = run_together(8, lambda: tmdb_http.get("https://api.test/3/movie/1"), release)
+
+    assert errors == []
+    assert len(calls) == 1
+    assert results == [resp] * 8
+
+
+def test_leader_error_reaches_every_waiter(coalesced, monkeypatch):
+    release = threading.Event()
+
+    def fail():
+        raise tmdb_http.requests.ConnectionError("reset")
+
+    calls = blocking_session(monkeypatch, release, fail)
+
+    results, errors = run_together(8, lambda: tmdb_http.get("https://api.test/3/movie/2"), release)
+
+    assert results == []
+    assert len(calls) == 1
+    assert len(errors) == 8
+    assert all(isinstance(e, tmdb_http.requests.ConnectionError) for e in errors)
+    # Nothing kept: the next call goes upstream again
+    release.clear()
+    monkeypatch.setattr(tmdb_http.session, "get",
+                        lambda url, **kw: calls.append(url) or FakeResponse(b""))
+    tmdb_http.get("https://api.test/3/movie/2")
+    assert len(calls) == 2
+
+
+def test_concurrent_downloads_share_one_transfer(coalesced, monkeypatch):
+    release = threading.Event()
+    calls = blocking_session(monkeypatch, release, lambda: FakeResponse(b"poster"))
+    url = "https://image.tmdb.org/t/p/original/shared.jpg"
+
+    results, errors = run_together(6, lambda: tmdb_http.download(url, hedge=False), release)
+
+    assert errors == []
+    assert len(calls) == 1
+    assert [buf for buf, _ in results] == [b"poster"] * 6
@@ -0,0 +1,51 @@
+from tmdb_records import (Movie, decode_credits, decode_images, decode_movie_details,
+                          decode_movie_page, decode_show_details, to_dict)
+
+# What api.themoviedb.org returns for a deleted / unknown id (HTTP 404)
+NOT_FOUND = (b'{"success":false,"status_code":34,'
+             b'"status_message":"The resource you requested could not be found."}')
+
+
+def test_error_body_decodes_to_empty_defaults():
+    assert decode_movie_page(NOT_FOUND).results == []
+    assert decode_images(NOT_FOUND).posters == []
+    assert decode_credits(NOT_FOUND).cast == []
+
+    movie = decode_movie_details(NOT_FOUND)
+    assert movie.id == 0
+    assert movie.release_date is None
+    assert movie.images.posters == []
+
+    show = decode_show_details(NOT_FOUND)
+    assert show.id == 0
+    assert show.first_air_date is None
+
+
+def test_details_with_appended_images_and_credits():
+    body = b'''{
+        "id": 550, "title": "Fight Club", "release_date": "1999-10-15",
+        "popularity": 61.4, "overview": "ignored", "genres": [{"id": 18}],
+        "images": {"posters": [
+            {"file_path": "/a.jpg", "width": 2000, "height": 3000,
+             "iso_639_1": "en", "vote_count": 12, "vote_average": 5.3}
+        ]},
+        "credits": {"cast": [{"name": "Edward Norton"}, {"name": "Brad Pitt"}],
+                    "crew": [{"name": "ignored"}]}
+    }'''
+    details = decode_movie_details(body)
+
+    assert (details.id, details.title, details.release_date) == (550, "Fight Club", "1999-10-15")
+    assert details.images.posters[0].file_path == "/a.jpg"
+    assert details.images.posters[0].iso_639_1 == "en"
+    assert [c.name for c in details.credits.cast] == ["Edward Norton", "Brad Pitt"]
+
+
+def test_page_and_to_dict():
+    page = decode_movie_page(b'{"page": 1, "total_pages": 3, "results": '
+                             b'[{"id": 1, "title": "A", "release_date": "2020-01-01", '
+                             b'"popularity": 2.5, "adult": false}]}')
+
+    assert page.total_pages == 3
+    assert to_dict(page.results[0]) == {"id": 1, "title": "A", "release_date": "2020-01-01",
+                                        "popularity": 2.5}
+    assert Movie(**to_dict(page.results[0])) == page.results[0]
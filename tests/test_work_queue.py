@@ -0,0 +1,112 @@
+import threading
+import time
+
+import requests
+
+from retry_queue import RetryQueue
+from work_queue import WorkQueue, run_worker
+
+
+def make_queue(tmp_path, **kwargs):
+    return WorkQueue(str(tmp_path / "queue.db"), **kwargs)
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.enqueue([{"id": 1}, {"id": 2}]) == 2
+    assert queue.enqueue([{"id": 2}, {"id": 3}]) == 1
+    assert queue.counts()["ready"] == 3
+
+
+def test_lease_is_exclusive_until_it_expires(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=0.05)
+    queue.enqueue([{"id": 1}, {"id": 2}])
+
+    assert [job for job, _ in queue.lease("a", 5)] == ["1", "2"]
+    assert queue.lease("b", 5) == []
+
+    time.sleep(0.1)
+    assert [job for job, _ in queue.lease("b", 5)] == ["1", "2"]
+    # "a" lost its lease: its late result is dropped
+    assert not queue.complete("a", "1", {"x": 1})
+    assert queue.complete("b", "1", {"x": 2})
+    assert queue.results() == [({"id": 1}, {"x": 2})]
+
+
+def test_fail_requeues_until_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    queue.enqueue([{"id": 1}])
+
+    queue.lease("a", 1)
+    queue.fail("a", "1", "boom")
+    assert queue.counts()["ready"] == 1
+
+    queue.lease("a", 1)
+    queue.fail("a", "1", "boom again")
+    assert queue.failures() == [({"id": 1}, "boom again")]
+
+
+def test_expired_lease_is_dead_lettered_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=0.02, max_attempts=2)
+    queue.enqueue([{"id": 1}])
+
+    # The job crashes its worker every time: leased, never completed or failed
+    for _ in range(2):
+        assert [job for job, _ in queue.lease("w", 1)] == ["1"]
+        time.sleep(0.05)
+
+    assert queue.lease("w", 1) == []
+    [(item, error)] = queue.failures()
+    assert item == {"id": 1}
+    assert "lease expired 2 times" in error
+
+
+def test_run_worker_processes_everything(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([{"id": i} for i in range(25)])
+
+    done = run_worker(queue, lambda item: {"double": item["id"] * 2}, max_workers=3,
+                      worker_id="w", idle_poll=0.05)
+
+    assert done == 25
+    assert queue.counts() == {"ready": 0, "leased": 0, "done": 25, "failed": 0}
+    assert [r["double"] for _, r in queue.results()] == [i * 2 for i in range(25)]
+
+
+def test_run_worker_keeps_going_while_a_job_backs_off(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([{"id": i} for i in range(20)])
+
+    order = []
+    tries = {}
+    lock = threading.Lock()
+
+    def fn(item):
+        with lock:
+            tries[item["id"]] = tries.get(item["id"], 0) + 1
+            if item["id"] == 0 and tries[0] == 1:
+                raise requests.Timeout("slow host")
+            order.append(item["id"])
+        time.sleep(0.01)
+        return {}
+
+    run_worker(queue, fn, max_workers=1, worker_id="w", idle_poll=0.05,
+               retry_queue=RetryQueue(base_delay=0.5, max_delay=0.5))
+
+    # With batch leasing jobs 8+ waited for job 0's backoff; now only job 0 does
+    assert order[-1] == 0
+    assert sorted(order) == list(range(20))
+    assert queue.counts()["done"] == 20
+
+
+def test_run_worker_dead_letters_permanent_failures(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1)
+    queue.enqueue([{"id": 1}, {"id": 2}])
+
+    def fn(item):
+        if item["id"] == 2:
+            raise ValueError("bad payload")
+        return {}
+
+    assert run_worker(queue, fn, max_workers=2, worker_id="w", idle_poll=0.05) == 1
+    assert queue.failures() == [({"id": 2}, "bad payload")]
@@ -1,166 +1,408 @@
+import argparse
+import msgspec
 import requests
 import pandas as pd
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from catalog import CATALOG_PATH, Catalog, split_cast
+from crawl_plan import Plan, plan_titles, record_session, save_stats_on_exit, stats
+from id_exports import seed_movies
+from poster_store import store_title
+from refresh_scheduler import RefreshScheduler, due_titles
+from tmdb_records import (Movie, decode_credits, decode_images, decode_movie_details,
+                          decode_movie_page, to_dict)
+from work_queue import WorkQueue, run_worker
+
 
 POPULAR_URL = "https://api.themoviedb.org/3/movie/popular"
 IMAGES_URL = "https://api.themoviedb.org/3/movie/{id}/images"
 CREDITS_URL = "https://api.themoviedb.org/3/movie/{id}/credits"
+DETAILS_URL = "https://api.themoviedb.org/3/movie/{id}"
 IMAGE_BASE = "https://image.tmdb.org/t/p/original"
 
+# Pooled connections; every response also feeds the --plan statistics
+session = record_session(requests.Session())
+
 MIN_DATE = datetime(2014, 11, 11)
 MAX_DATE = datetime(2025, 11, 11)
 
 MAX_WORKERS = 10
 MAX_POPULAR_PAGES = 500
 
+# --seed: how many of the most popular export ids to crawl (500 pages x 20)
+SEED_LIMIT = 10000
+
+# Poster languages to select (iso_639_1). All of them are picked from the
+# same /images response, so extra languages cost no extra API calls.
+LANGUAGES = ["en"]  # e.g. ["en", "de", "fr", "es"]
+LANGUAGE_NAMES = {"en": "english", "de": "german", "fr": "french", "es": "spanish"}
+
+# Also record every run in the local catalog database (catalog.py)
+WRITE_CATALOG = True
+
+# Keep every title's raw poster metadata in the columnar store (poster_store.py)
+WRITE_POSTER_STORE = True
+
+# Schedule each recorded title's next check (refresh_scheduler.py);
+# --due-only then skips titles that are not due
+REFRESH_SCHEDULE = True
+
 
 # ------------------------------------------------------
 # POSTER FILTERING RULES
 # ------------------------------------------------------
-def pick_theatrical_posters(posters):
+def pick_theatrical_posters(posters, language="en"):
     """
     Final combined rules:
-    ✔ English only  (iso_639_1 == “en”)
+    ✔ One language only  (iso_639_1 == language, “en” by default)
     ✔ Exclude textless/clean (iso_639_1 None or empty)
     ✔ width >= 1500
     ✔ Prefer official by vote_count (descending)
     ✔ Then sort by largest image size (area)
     ✔ Return top 5
     """
+    return pick_posters_by_language(posters, [language])[language]
+
+
+def pick_posters_by_language(posters, languages):
+    """
+    Same rules as pick_theatrical_posters, evaluated for several languages
+    in a single pass over the posters. Returns {language: top 5 posters}.
+    """
 
     clean_langs = [None, "", "null"]
 
-    filtered = [
-        p for p in posters
-        if p.get("width", 0) >= 1500
-        and p.get("iso_639_1") == "en"
-        and p.get("iso_639_1") not in clean_langs
-    ]
+    by_lang = {lang: [] for lang in languages}
+    for p in posters:
+        lang = p.iso_639_1
+        if lang in clean_langs or lang not in by_lang:
+            continue
+        if p.width >= 1500:
+            by_lang[lang].append(p)
 
     # Sort official posters first:
     # 1) Higher vote_count = more official
     # 2) Larger resolution = theatrical
-    filtered_sorted = sorted(
-        filtered,
-        key=lambda p: (
-            p.get("vote_count", 0),
-            p.get("width", 0) * p.get("height", 0)
-        ),
-        reverse=True
-    )
+    for lang, filtered in by_lang.items():
+        by_lang[lang] = sorted(
+            filtered,
+            key=lambda p: (p.vote_count, p.width * p.height),
+            reverse=True
+        )[:5]
 
-    return filtered_sorted[:5]
+    return by_lang
 
 
 # ------------------------------------------------------
 # FETCH POPULAR MOVIES
 # ------------------------------------------------------
 def fetch_popular_movies():
-    movies = []
+    return list(iter_popular_movies())
 
-    for page in range(1, MAX_POPULAR_PAGES + 1):
+
+def iter_popular_movies(max_pages=MAX_POPULAR_PAGES):
+    """Yield in-range movies page by page — nothing is fetched before it is needed."""
+    for page in range(1, max_pages + 1):
         params = {
             "api_key": API_KEY,
             "language": "en-US",
             "page": page
         }
 
-        resp = requests.get(POPULAR_URL, params=params)
-        data = resp.json()
-        results = data.get("results", [])
+        resp = session.get(POPULAR_URL, params=params)
+        data = decode_movie_page(resp.content)
 
-        if not results:
+        if not data.results:
             break
 
-        for m in results:
-            release_date = m.get("release_date")
-            if not release_date:
-                continue
+        print(f"Fetched popular page {page}/{max_pages}")
 
-            try:
-                rd = datetime.strptime(release_date, "%Y-%m-%d")
-            except:
-                continue
+        kept = [m for m in data.results if in_date_range(m.release_date)]
+        stats.observe_value("movie.popular_kept_per_page", len(kept))
+        yield from kept
 
-            if MIN_DATE <= rd <= MAX_DATE:
-                movies.append({
-                    "id": m["id"],
-                    "title": m.get("title"),
-                    "release_date": release_date,
-                    "popularity": m.get("popularity")
-                })
+        if page >= data.total_pages:
+            break
 
-        print(f"Fetched popular page {page}/{MAX_POPULAR_PAGES}")
 
-        total_pages = data.get("total_pages", page)
-        if page >= total_pages:
-            break
+def in_date_range(release_date):
+    if not release_date:
+        return False
 
+    try:
+        rd = datetime.strptime(release_date, "%Y-%m-%d")
+    except ValueError:
+        return False
+
+    return MIN_DATE <= rd <= MAX_DATE
+
+
+def load_movies(args):
+    """The popular list, or (--seed) the top of a daily ID export — no API calls."""
+    if args.seed:
+        path = None if args.seed == "latest" else args.seed
+        print("Seeding movies from the TMDB ID export…")
+        movies = seed_movies(path, args.seed_limit, args.min_popularity)
+    else:
+        print("Fetching TMDB Popular Movies 2014–2025…")
+        movies = fetch_popular_movies()
+
+    if args.due_only:
+        movies = due_titles("movie", "official", movies)
     return movies
 
 
 # ------------------------------------------------------
 # FETCH POSTERS + CAST
 # ------------------------------------------------------
-def fetch_movie_assets(movie):
-    movie_id = movie["id"]
-    title = movie["title"]
-    release_date = movie["release_date"]
-    popularity = movie["popularity"]
+def api_get(url, params):
+    resp = session.get(url, params=params)
+    resp.raise_for_status()
+    return resp
 
-    # Posters
-    try:
-        img_resp = requests.get(IMAGES_URL.format(id=movie_id),
-                                params={"api_key": API_KEY})
-        poster_list = img_resp.json().get("posters", [])
 
-        posters = pick_theatrical_posters(poster_list)
-    except Exception as e:
-        print(f"[WARN] Poster fetch failed for {movie_id}: {e}")
-        posters = []
+def fetch_movie_assets(movie, languages=None):
+    """
+    Rows of the picked posters ([] = the movie has none), or None for a
+    seeded id that is not a 2014–2025 movie. A failed call raises: the
+    title is retried or reported, never recorded as "no posters".
+    """
+    languages = languages or LANGUAGES
+    movie_id = movie.id
+
+    if movie.release_date is None:
+        return fetch_seeded_movie_assets(movie, languages)
+
+    # Posters
+    poster_list = decode_images(api_get(IMAGES_URL.format(id=movie_id),
+                                        {"api_key": API_KEY}).content).posters
+    store_posters(movie_id, poster_list)
+    posters_by_lang = pick_posters_by_language(poster_list, languages)
 
     # Cast
-    cast_str = ""
-    try:
-        cred_resp = requests.get(CREDITS_URL.format(id=movie_id),
-                                 params={"api_key": API_KEY})
-        cast = cred_resp.json().get("cast", [])[:5]
-        cast_str = " | ".join([c["name"] for c in cast])
-    except Exception as e:
-        print(f"[WARN] Cast fetch failed for {movie_id}: {e}")
+    cast = decode_credits(api_get(CREDITS_URL.format(id=movie_id),
+                                  {"api_key": API_KEY}).content).cast[:5]
+    cast_str = " | ".join([c.name for c in cast])
+
+    return build_rows(movie, posters_by_lang, cast_str)
+
+
+def fetch_seeded_movie_assets(movie, languages):
+    """
+    Movies seeded from an ID export have no release date yet: one details
+    call with images + credits appended replaces /images and /credits and
+    fills in title and date, then the 2014–2025 window is applied.
+    """
+    resp = session.get(DETAILS_URL.format(id=movie.id), params={
+        "api_key": API_KEY,
+        "append_to_response": "images,credits",
+        "include_image_language": ",".join(list(languages) + ["null"])
+    })
+    if resp.status_code == 404:
+        # Deleted / unknown id: not a movie of this crawl
+        return None
+    resp.raise_for_status()
+    details = decode_movie_details(resp.content)
+
+    # A copy, so the caller's (queued / seeded) record is left as it was
+    movie = msgspec.structs.replace(movie, title=details.title or movie.title,
+                                    release_date=details.release_date or "")
 
+    if not in_date_range(movie.release_date):
+        return None
+
+    poster_list = details.images.posters
+    store_posters(movie.id, poster_list)
+
+    cast_str = " | ".join(c.name for c in details.credits.cast[:5])
+    return build_rows(movie, pick_posters_by_language(poster_list, languages), cast_str)
+
+
+def store_posters(movie_id, poster_list):
+    if WRITE_POSTER_STORE:
+        store_title("movie", movie_id, poster_list)
+
+
+def build_rows(movie, posters_by_lang, cast_str):
     rows = []
-    for i, poster in enumerate(posters, start=1):
-        path = poster.get("file_path")
-        if not path:
-            continue
+    for posters in posters_by_lang.values():
+        for i, poster in enumerate(posters, start=1):
+            if not poster.file_path:
+                continue
 
-        poster_url = IMAGE_BASE + path
-
-        rows.append({
-            "title": f"{title}_{i}",
-            "release_date": release_date,
-            "popularity": popularity,
-            "poster_url": poster_url,
-            "width": poster.get("width"),
-            "height": poster.get("height"),
-            "language": poster.get("iso_639_1"),
-            "vote_count": poster.get("vote_count"),
-            "top_billed_cast": cast_str
-        })
+            poster_url = IMAGE_BASE + poster.file_path
+
+            rows.append({
+                "title": f"{movie.title}_{i}",
+                "movie_title": movie.title,
+                "release_date": movie.release_date,
+                "popularity": movie.popularity,
+                "poster_url": poster_url,
+                "width": poster.width,
+                "height": poster.height,
+                "language": poster.iso_639_1,
+                "vote_count": poster.vote_count,
+                "top_billed_cast": cast_str
+            })
 
     return rows
 
 
+def output_file_for(language):
+    name = LANGUAGE_NAMES.get(language, language)
+    return f"tmdb_popular_official_{name}_posters_2014_2025.csv"
+
+
+def save_to_catalog(catalog, run_id, movie, rows):
+    if rows:
+        # Seeded movies only learn their title and date in the details call
+        movie = msgspec.structs.replace(movie, title=rows[0]["movie_title"],
+                                        release_date=rows[0]["release_date"])
+
+    posters_by_lang = {lang: [] for lang in LANGUAGES}
+    for row in rows:
+        posters_by_lang.setdefault(row["language"], []).append({
+            "url": row["poster_url"],
+            "width": row["width"],
+            "height": row["height"],
+            "vote_count": row["vote_count"]
+        })
+
+    catalog.record_title(
+        run_id, "movie", movie.id, movie.title, movie.release_date, movie.popularity,
+        cast=split_cast(rows[0]["top_billed_cast"]) if rows else None,
+        source="official", posters_by_lang=posters_by_lang
+    )
+
+    if REFRESH_SCHEDULE:
+        RefreshScheduler(catalog).record("movie", "official", movie.id, movie.popularity,
+                                         movie.release_date, [row["poster_url"] for row in rows])
+
+
+def schedule_retry(catalog, movie):
+    if REFRESH_SCHEDULE:
+        RefreshScheduler(catalog).record_failure("movie", "official", movie.id)
+
+
+def write_outputs(all_rows):
+    df = pd.DataFrame(all_rows, columns=[
+        "title", "release_date", "popularity", "poster_url", "width",
+        "height", "language", "vote_count", "top_billed_cast"
+    ])
+
+    print()
+    for lang in LANGUAGES:
+        out_file = output_file_for(lang)
+        df[df["language"] == lang].to_csv(out_file, index=False)
+        print(f"Done! Saved as {out_file}")
+
+
+# ------------------------------------------------------
+# QUEUE MODE — several worker processes / hosts share one crawl
+#   python tmdb.py --queue crawl.db --enqueue     (once)
+#   python tmdb.py --queue crawl.db --worker      (on every worker)
+#   python tmdb.py --queue crawl.db --export      (when drained)
+# ------------------------------------------------------
+def run_queue_mode(args):
+    run_all = not (args.enqueue or args.worker or args.export)
+    queue = WorkQueue(args.queue)
+
+    if args.enqueue or run_all:
+        movies = load_movies(args)
+        added = queue.enqueue([to_dict(m) for m in movies])
+        print(f"\nQueued {added} new movies ({len(movies)} found)\n")
+
+    if args.worker or run_all:
+        run_worker(queue, lambda item: fetch_movie_assets(Movie(**item)), MAX_WORKERS,
+                   describe=lambda m: f"{m['title']} ({m['id']})")
+
+    if args.export or run_all:
+        # None: seeded id outside the 2014–2025 window, nothing to record
+        results = [(item, rows) for item, rows in queue.results() if rows is not None]
+        all_rows = [row for _, rows in results for row in rows]
+        write_outputs(all_rows)
+
+        if WRITE_CATALOG:
+            catalog = Catalog()
+            run_id = catalog.start_run("tmdb.py --queue")
+            for item, rows in results:
+                save_to_catalog(catalog, run_id, Movie(**item), rows)
+
+        failures = queue.failures()
+        if failures:
+            print(f"[WARN] {len(failures)} movies failed on every attempt")
+
+        if WRITE_CATALOG:
+            for item, _ in failures:
+                schedule_retry(catalog, Movie(**item))
+            catalog.finish_run(run_id)
+            catalog.close()
+
+    queue.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TMDB popular movie posters + top-billed cast")
+    parser.add_argument("--queue", metavar="DB",
+                        help="SQLite work-queue file shared by all worker processes")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="fetch the popular list and queue every movie")
+    parser.add_argument("--worker", action="store_true",
+                        help="process queued movies until the queue is drained")
+    parser.add_argument("--export", action="store_true",
+                        help="write the CSVs from the queue's results")
+    parser.add_argument("--seed", nargs="?", const="latest", metavar="EXPORT",
+                        help="enumerate movies from a movie_ids_*.json.gz export "
+                             "(default: newest in id_exports.EXPORT_FOLDER) instead of /popular")
+    parser.add_argument("--seed-limit", type=int, default=SEED_LIMIT,
+                        help="keep only this many of the most popular export ids")
+    parser.add_argument("--min-popularity", type=float, default=0.0,
+                        help="skip export ids below this popularity")
+    parser.add_argument("--due-only", action="store_true",
+                        help="only process titles that are new or due on the refresh schedule")
+    parser.add_argument("--plan", action="store_true",
+                        help="estimate requests, bytes, OCR calls and time, then exit (no network)")
+    return parser.parse_args(argv)
+
+
+# ------------------------------------------------------
+# PLAN (--plan): estimate the crawl without running it
+# ------------------------------------------------------
+def plan_crawl(args):
+    plan = Plan("tmdb.py", MAX_WORKERS)
+    titles = plan_titles(plan, args, "movie", "official", MAX_POPULAR_PAGES, CATALOG_PATH)
+
+    if args.seed:
+        plan.request_stage("details + images + credits", "api.themoviedb.org/3/movie/{id}", titles)
+    else:
+        plan.request_stage("/images", "api.themoviedb.org/3/movie/{id}/images", titles)
+        plan.request_stage("/credits", "api.themoviedb.org/3/movie/{id}/credits", titles)
+
+    plan.note(f"{titles:,} movies, languages {', '.join(LANGUAGES)} (no poster downloads)")
+    plan.print()
+
+
 # ------------------------------------------------------
 # MAIN
 # ------------------------------------------------------
-def main():
-    print("Fetching TMDB Popular Movies 2014–2025…")
-    movies = fetch_popular_movies()
-    print(f"\nTotal popular movies in date range: {len(movies)}\n")
+def main(argv=None):
+    args = parse_args(argv)
+    if args.plan:
+        plan_crawl(args)
+        return
+
+    save_stats_on_exit()
+
+    if args.queue:
+        run_queue_mode(args)
+        return
+
+    movies = load_movies(args)
+    print(f"\nTotal movies to process: {len(movies)}\n")
+
+    catalog = Catalog() if WRITE_CATALOG else None
+    run_id = catalog.start_run("tmdb.py") if catalog else None
 
     all_rows = []
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
@@ -169,17 +411,27 @@ def main():
         for idx, future in enumerate(as_completed(futures), start=1):
             movie = futures[future]
             try:
-                all_rows.extend(future.result())
+                rows = future.result()
             except Exception as e:
-                print(f"[ERROR] Worker failed for {movie['id']}: {e}")
+                # Nothing recorded: the catalog keeps the title's last real answer
+                print(f"[ERROR] Worker failed for {movie.id}: {e}")
+                if catalog:
+                    schedule_retry(catalog, movie)
+            else:
+                if rows is not None:
+                    all_rows.extend(rows)
+                    if catalog:
+                        save_to_catalog(catalog, run_id, movie, rows)
 
             if idx % 50 == 0:
                 print(f"Processed {idx}/{len(movies)} movies…")
 
-    df = pd.DataFrame(all_rows)
-    df.to_csv("tmdb_popular_official_english_posters_2014_2025.csv", index=False)
+    write_outputs(all_rows)
 
-    print("\nDone! Saved as tmdb_popular_official_english_posters_2014_2025.csv")
+    if catalog:
+        catalog.finish_run(run_id)
+        catalog.close()
+        print(f"Catalog updated: {catalog.path} (run {run_id})")
 
 
 if __name__ == "__main__":
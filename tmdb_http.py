@@ -0,0 +1,434 @@
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from io import BytesIO
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+from crawl_plan import stats
+from retry_queue import HostCircuitBreaker, TRANSIENT_STATUS
+
+# ---------------------------------------------
+# Shared HTTP path for the TMDB scrapers
+#
+# Every metadata and image request goes through get(): one pooled
+# session, a default timeout, the per-host circuit breaker, and 429 / 5xx
+# answers raised as HTTPError so the retry queue can pick them up.
+# Identical requests made at the same moment by different threads share
+# one network call (see SingleFlight).
+# ---------------------------------------------
+
+REQUEST_TIMEOUT = 30
+POOL_SIZE = 32
+
+# Concurrent identical GETs / poster downloads share one in-flight call
+COALESCE_REQUESTS = True
+
+# Bounded-memory mode (see set_inflight_budget)
+MAX_IMAGE_BYTES = 48 * 1024 * 1024
+DECODED_BYTES_PER_PIXEL = 4
+CHUNK_SIZE = 256 * 1024
+
+# Hedged poster downloads (see download)
+HEDGE_DOWNLOADS = True
+DOWNLOAD_DEADLINE = 60          # seconds for a whole poster, hedge included
+CONNECT_TIMEOUT = 5
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20          # until then hedge after HEDGE_DEFAULT_DELAY
+HEDGE_DEFAULT_DELAY = 3.0
+HEDGE_MIN_DELAY = 0.25
+
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE))
+
+breaker = HostCircuitBreaker()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Calls made with the same key while one is already running wait for it
+    and get its result (or exception) instead of running again. Nothing is
+    kept once the call finishes — this is not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Returns (result, leader) — leader is False for callers that waited."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, True
+
+
+flights = SingleFlight()
+
+
+def get(url, params=None, timeout=REQUEST_TIMEOUT, **kwargs):
+    # Streamed responses can only be read once, so they are never shared
+    if COALESCE_REQUESTS and not kwargs:
+        key = ("GET", url, tuple(sorted((params or {}).items())))
+        return flights.do(key, lambda: _get(url, params, timeout))[0]
+
+    return _get(url, params, timeout, **kwargs)
+
+
+def _get(url, params=None, timeout=REQUEST_TIMEOUT, **kwargs):
+    host = urlparse(url).netloc
+    breaker.before_request(host)
+
+    start = time.monotonic()
+    try:
+        resp = session.get(url, params=params, timeout=timeout, **kwargs)
+    except requests.RequestException:
+        breaker.record_failure(host)
+        raise
+
+    if resp.status_code in TRANSIENT_STATUS:
+        breaker.record_failure(host)
+        resp.raise_for_status()
+
+    breaker.record_success(host)
+
+    # Streamed bodies are measured by download() once they are read
+    if not kwargs.get("stream"):
+        stats.observe_response(url, len(resp.content), time.monotonic() - start)
+    return resp
+
+
+# ---------------------------------------------
+# Bounded-memory poster downloads
+#
+# open_poster() streams the response into a size-limited buffer, decodes
+# it once and closes everything when the `with` block ends. With a budget
+# installed, each download first reserves its compressed size plus its
+# decoded size (from the TMDB width/height) and blocks while the process
+# is over budget, so downloads queue up instead of memory growing.
+# ---------------------------------------------
+class ImageTooLarge(Exception):
+    pass
+
+
+class ByteBudget:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.in_use = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n):
+        # A single oversized item may still run on its own
+        n = min(n, self.capacity)
+        with self._cond:
+            while self.in_use and self.in_use + n > self.capacity:
+                self._cond.wait()
+            self.in_use += n
+            self.peak = max(self.peak, self.in_use)
+        return n
+
+    def release(self, n):
+        with self._cond:
+            self.in_use -= n
+            self._cond.notify_all()
+
+
+image_budget = None
+
+
+def set_inflight_budget(max_bytes):
+    """Turn on bounded-memory mode (None turns it off)."""
+    global image_budget
+    image_budget = ByteBudget(max_bytes) if max_bytes else None
+
+
+def _read_capped(resp, max_bytes, cancel=None, deadline=None):
+    buf = bytearray()
+    for chunk in resp.iter_content(CHUNK_SIZE):
+        if cancel is not None and cancel.is_set():
+            raise _Cancelled()
+        if deadline is not None and time.monotonic() > deadline:
+            raise DownloadDeadlineExceeded(f"{resp.url} missed its download deadline")
+
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise ImageTooLarge(f"{resp.url} is larger than {max_bytes} bytes")
+    return buf
+
+
+# ---------------------------------------------
+# Hedged downloads
+#
+# A slow image.tmdb.org edge can stall a single download for tens of
+# seconds. download() gives every poster a hard deadline, and once an
+# attempt has taken longer than the p95 of recent downloads it starts a
+# duplicate request: whichever finishes first wins, the other is told to
+# stop at its next chunk. Deadline misses raise a requests.Timeout, so
+# the retry queue treats them like any other transient failure.
+# ---------------------------------------------
+class DownloadDeadlineExceeded(requests.Timeout):
+    pass
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class LatencyTracker:
+    """Rolling window of successful download times, for the hedge delay."""
+
+    def __init__(self, window=500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_misses = 0
+
+    def record(self, seconds, hedged=False, hedge_won=False):
+        with self._lock:
+            self._samples.append(seconds)
+            self.downloads += 1
+            self.hedged += hedged
+            self.hedge_wins += hedge_won
+
+    def record_deadline_miss(self):
+        with self._lock:
+            self.deadline_misses += 1
+
+    def quantile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def hedge_delay(self):
+        with self._lock:
+            warm = len(self._samples) >= HEDGE_MIN_SAMPLES
+        if not warm:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, self.quantile(HEDGE_QUANTILE))
+
+
+download_latency = LatencyTracker()
+
+# Attempts run here so a stalled loser never holds a scraper worker
+_download_pool = ThreadPoolExecutor(max_workers=POOL_SIZE * 2, thread_name_prefix="download")
+
+
+def _attempt(url, max_bytes, reserve_extra, cancel, deadline):
+    """One download try -> (bytes, reserved budget bytes)."""
+    start = time.monotonic()
+    budget = image_budget
+    reserved = 0
+
+    read_timeout = max(0.1, min(REQUEST_TIMEOUT, deadline - start))
+    resp = get(url, stream=True, timeout=(CONNECT_TIMEOUT, read_timeout))
+    try:
+        resp.raise_for_status()
+
+        length = int(resp.headers.get("Content-Length") or max_bytes)
+        if length > max_bytes:
+            raise ImageTooLarge(f"{url} is {length} bytes (limit {max_bytes})")
+
+        if budget is not None:
+            reserved = budget.acquire(length + reserve_extra)
+
+        buf = _read_capped(resp, max_bytes, cancel, deadline)
+        return buf, reserved
+    except BaseException:
+        if reserved:
+            budget.release(reserved)
+        raise
+    finally:
+        resp.close()
+
+
+def _discard(future):
+    # A late loser that still finished: give back its budget
+    if not future.cancelled() and future.exception() is None:
+        reserved = future.result()[1]
+        if reserved and image_budget is not None:
+            image_budget.release(reserved)
+
+
+def download(url, max_bytes=MAX_IMAGE_BYTES, deadline=DOWNLOAD_DEADLINE, hedge=None,
+             reserve_extra=0):
+    """
+    Bytes of `url` within `deadline` seconds, hedged past the observed p95.
+    Returns (bytes, reserved) — `reserved` budget bytes are the caller's
+    to release (0 without a budget).
+    """
+    if not COALESCE_REQUESTS:
+        return _hedged_download(url, max_bytes, deadline, hedge, reserve_extra)
+
+    (buf, reserved), leader = flights.do(
+        ("download", url),
+        lambda: _hedged_download(url, max_bytes, deadline, hedge, reserve_extra)
+    )
+    if leader:
+        return buf, reserved
+
+    # Callers that joined share the leader's bytes (read-only) and only
+    # reserve their own decode
+    budget = image_budget
+    if budget is not None and reserve_extra:
+        return buf, budget.acquire(reserve_extra)
+    return buf, 0
+
+
+def _hedged_download(url, max_bytes, deadline, hedge, reserve_extra):
+    hedge = HEDGE_DOWNLOADS if hedge is None else hedge
+    start = time.monotonic()
+    end = start + deadline
+    hedge_at = start + download_latency.hedge_delay() if hedge else None
+
+    cancel = threading.Event()
+    attempts = [_download_pool.submit(_attempt, url, max_bytes, reserve_extra, cancel, end)]
+    pending = set(attempts)
+    winner = error = None
+
+    try:
+        while pending:
+            now = time.monotonic()
+            if now >= end:
+                download_latency.record_deadline_miss()
+                raise DownloadDeadlineExceeded(f"{url} took longer than {deadline}s")
+
+            timeout = end - now
+            if hedge_at is not None and len(attempts) == 1:
+                timeout = min(timeout, max(0.0, hedge_at - now))
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    buf, reserved = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+
+                winner = future
+                # Latency as the caller saw it: from the first attempt, not
+                # the hedge's own (shorter) run — else p95 drifts down and
+                # ever more downloads get hedged
+                elapsed = time.monotonic() - start
+                download_latency.record(elapsed, hedged=len(attempts) > 1,
+                                        hedge_won=future is not attempts[0])
+                stats.observe_response(url, len(buf), elapsed)
+                return buf, reserved
+
+            # Still the first attempt and past the hedge point: race a duplicate
+            if (pending and len(attempts) == 1 and hedge_at is not None
+                    and time.monotonic() >= hedge_at):
+                second = _download_pool.submit(_attempt, url, max_bytes, reserve_extra, cancel, end)
+                attempts.append(second)
+                pending.add(second)
+
+        raise error
+    finally:
+        cancel.set()
+        for future in attempts:
+            if future is not winner:
+                future.add_done_callback(_discard)
+
+
+def download_report():
+    t = download_latency
+    p95 = t.quantile(HEDGE_QUANTILE)
+    if not t.downloads:
+        return "no downloads"
+    return (f"{t.downloads} downloads, p95 {p95:.2f}s, {t.hedged} hedged "
+            f"({t.hedge_wins} won by the hedge), {t.deadline_misses} deadline misses, "
+            f"{flights.shared} requests coalesced")
+
+
+@contextmanager
+def open_poster(url, width=None, height=None, max_bytes=MAX_IMAGE_BYTES):
+    """
+    Yield the decoded PIL image for `url`; buffer and image are freed on exit.
+    Use it instead of a bare requests.get: the download gets a deadline and a
+    hedged second request, and counts against the memory budget (if one is set).
+    """
+    decoded = (width or 0) * (height or 0) * DECODED_BYTES_PER_PIXEL
+    img = None
+
+    buf, reserved = download(url, max_bytes, reserve_extra=decoded)
+    try:
+        img = Image.open(BytesIO(buf))
+        del buf
+        yield img
+    finally:
+        if img is not None:
+            img.close()
+        if reserved:
+            image_budget.release(reserved)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+
+def memory_report():
+    parts = []
+    peak = peak_rss_mb()
+    if peak is not None:
+        parts.append(f"peak RSS {peak:.0f} MB")
+    if image_budget is not None:
+        parts.append(f"peak in-flight image bytes {image_budget.peak / (1024 * 1024):.0f} MB"
+                     f" of {image_budget.capacity / (1024 * 1024):.0f} MB budget")
+    return ", ".join(parts) or "peak RSS unavailable"
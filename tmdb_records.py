@@ -0,0 +1,94 @@
+import msgspec
+
+# ---------------------------------------------
+# Typed TMDB records
+#
+# Slotted msgspec Structs for the handful of fields the scrapers use.
+# The decoders below parse response bytes straight into them and skip
+# every field that is not declared (overview, genre_ids, the whole crew
+# list, ...), so nothing else is ever materialised as Python objects.
+# gc=False: these records hold only scalars, so the cyclic GC can ignore
+# them — that matters once there are 100k+ posters alive.
+# ---------------------------------------------
+
+
+class Movie(msgspec.Struct, gc=False):
+    id: int
+    title: str = ""
+    release_date: str | None = None
+    popularity: float = 0.0
+
+
+class Show(msgspec.Struct, gc=False):
+    id: int
+    name: str = ""
+    first_air_date: str | None = None
+    popularity: float = 0.0
+
+
+class Poster(msgspec.Struct, gc=False):
+    file_path: str = ""
+    width: int = 0
+    height: int = 0
+    iso_639_1: str | None = None
+    vote_count: int = 0
+    vote_average: float = 0.0
+
+
+class CastMember(msgspec.Struct, gc=False):
+    name: str = ""
+
+
+class MoviePage(msgspec.Struct):
+    results: list[Movie] = []
+    total_pages: int = 0
+
+
+class ShowPage(msgspec.Struct):
+    results: list[Show] = []
+    total_pages: int = 0
+
+
+class Images(msgspec.Struct):
+    posters: list[Poster] = []
+
+
+class Credits(msgspec.Struct):
+    cast: list[CastMember] = []
+
+
+# /movie/{id} and /tv/{id} with append_to_response=images,credits —
+# used for titles seeded from the ID exports (id_exports.py).
+# id defaults to 0 so an error body decodes too: id == 0 means "no such title"
+class MovieDetails(msgspec.Struct):
+    id: int = 0
+    title: str = ""
+    release_date: str | None = None
+    popularity: float = 0.0
+    images: Images = msgspec.field(default_factory=Images)
+    credits: Credits = msgspec.field(default_factory=Credits)
+
+
+class ShowDetails(msgspec.Struct):
+    id: int = 0
+    name: str = ""
+    first_air_date: str | None = None
+    popularity: float = 0.0
+    images: Images = msgspec.field(default_factory=Images)
+    credits: Credits = msgspec.field(default_factory=Credits)
+
+
+# Error bodies ({"status_code": 34, ...}) decode to the empty defaults
+# (no results / posters / cast, details with id 0), same as the old
+# `.json().get("posters", [])`
+decode_movie_page = msgspec.json.Decoder(MoviePage).decode
+decode_show_page = msgspec.json.Decoder(ShowPage).decode
+decode_images = msgspec.json.Decoder(Images).decode
+decode_credits = msgspec.json.Decoder(Credits).decode
+decode_movie_details = msgspec.json.Decoder(MovieDetails).decode
+decode_show_details = msgspec.json.Decoder(ShowDetails).decode
+
+
+def to_dict(record):
+    """Plain dict for CSV rows, JSON queues and error reports."""
+    return msgspec.structs.asdict(record)
@@ -0,0 +1,101 @@
+import asyncio
+
+import moviecreds
+import tmdb
+import tvshowstmdb
+from streaming import MAX_WORKERS, stream_map
+
+# ---------------------------------------------
+# Streaming library API for the TMDB fetchers
+#
+# The same fetch / select functions the scripts use, as lazy iterators
+# for notebooks and other services:
+#
+#   import tmdb_stream
+#   movies = tmdb_stream.popular_movies()             # one page at a time
+#   for movie, found in tmdb_stream.credit_posters(movies):
+#       ...                                           # first hit in ~1s
+#       break                                         # nothing else is fetched
+#
+# Work is pulled from the input only as results are consumed: at most
+# `max_pending` titles are in flight, so a slow consumer slows the crawl
+# instead of results piling up in memory. Leaving the loop early cancels
+# everything not yet started. Every generator has an async twin
+# (async_popular_movies, ...) for `async for`.
+# ---------------------------------------------
+
+
+# ---- listing -------------------------------------
+def popular_movies(max_pages=moviecreds.MAX_POPULAR_PAGES):
+    """Popular movies in the 2014–2025 window, fetched a page at a time."""
+    return moviecreds.iter_popular_movies(max_pages)
+
+
+def popular_tv(max_pages=tvshowstmdb.MAX_POPULAR_PAGES):
+    """Popular TV shows (with a first air date), fetched a page at a time."""
+    return tvshowstmdb.iter_popular_tv(max_pages)
+
+
+# ---- per-title work --------------------------------
+def movie_assets(movies, languages=None, max_workers=MAX_WORKERS, max_pending=None):
+    """(movie, rows): top official posters per language + cast (tmdb.py).
+    rows is None for a seeded id outside the date range."""
+    return stream_map(lambda m: tmdb.fetch_movie_assets(m, languages), movies,
+                      max_workers, max_pending)
+
+
+def credit_posters(movies, languages=None, max_workers=MAX_WORKERS, max_pending=None):
+    """(movie, {language: row}): first OCR-verified credit-block poster (moviecreds.py)."""
+    return stream_map(lambda m: moviecreds.fetch_movie_posters(m, languages), movies,
+                      max_workers, max_pending)
+
+
+def tv_posters(shows, languages=None, max_workers=MAX_WORKERS, max_pending=None):
+    """(show, {language: rows}): up to 3 credit posters per language (tvshowstmdb.py)."""
+    return stream_map(lambda s: tvshowstmdb.fetch_tv_posters_by_language(s, languages), shows,
+                      max_workers, max_pending)
+
+
+# ---------------------------------------------
+# Async twins
+# ---------------------------------------------
+async def aiterate(iterator):
+    """Drive a blocking iterator from asyncio, one item per thread hop."""
+    loop = asyncio.get_running_loop()
+    done = object()
+    iterator = iter(iterator)
+
+    try:
+        while True:
+            item = await loop.run_in_executor(None, next, iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # Cancelled while a worker thread was still inside next()
+                pass
+
+
+def async_popular_movies(*args, **kwargs):
+    return aiterate(popular_movies(*args, **kwargs))
+
+
+def async_popular_tv(*args, **kwargs):
+    return aiterate(popular_tv(*args, **kwargs))
+
+
+def async_movie_assets(movies, *args, **kwargs):
+    return aiterate(movie_assets(movies, *args, **kwargs))
+
+
+def async_credit_posters(movies, *args, **kwargs):
+    return aiterate(credit_posters(movies, *args, **kwargs))
+
+
+def async_tv_posters(shows, *args, **kwargs):
+    return aiterate(tv_posters(shows, *args, **kwargs))
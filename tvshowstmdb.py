@@ -1,11 +1,20 @@
-import requests
+import argparse
+import msgspec
 import pandas as pd
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
-from io import BytesIO
 import pytesseract
 import os
+import time
+
+import tmdb_http
+from catalog import CATALOG_PATH, Catalog, split_cast
+from crawl_plan import Plan, plan_titles, save_stats_on_exit, stats
+from id_exports import seed_shows
+from poster_store import store_title
+from refresh_scheduler import RefreshScheduler, due_titles
+from tmdb_records import decode_credits, decode_images, decode_show_details, decode_show_page, to_dict
+from retry_queue import is_transient, run_with_retries
 
 # ---------------------------------------------
 # Tesseract path
@@ -20,6 +29,7 @@ pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tessera
 POPULAR_TV_URL = "https://api.themoviedb.org/3/tv/popular"
 IMAGES_URL = "https://api.themoviedb.org/3/tv/{id}/images"
 CREDITS_URL = "https://api.themoviedb.org/3/tv/{id}/credits"
+DETAILS_URL = "https://api.themoviedb.org/3/tv/{id}"
 IMAGE_BASE = "https://image.tmdb.org/t/p/original"
 
 # ---------------------------------------------
@@ -27,24 +37,56 @@ IMAGE_BASE = "https://image.tmdb.org/t/p/original"
 # ---------------------------------------------
 MAX_WORKERS = 10
 MAX_POPULAR_PAGES = 100
+
+# --seed: how many of the most popular export ids to crawl (100 pages x 20)
+SEED_LIMIT = 2000
 OUTPUT_FOLDER = r"C:\openCVtraining"
 
+# Poster languages to select (iso_639_1), all from the same /images response.
+# Non-English languages get their own output file (TVPosters_de_<timestamp>.csv).
+LANGUAGES = ["en"]  # e.g. ["en", "de", "fr", "es"]
+
+# Also record every run in the local catalog database (catalog.py)
+WRITE_CATALOG = True
+
+# Keep every title's raw poster metadata in the columnar store (poster_store.py)
+WRITE_POSTER_STORE = True
+
+# Schedule each recorded title's next check (refresh_scheduler.py);
+# --due-only then skips titles that are not due
+REFRESH_SCHEDULE = True
+
+# Bounded-memory mode: cap on poster bytes (downloaded + decoded) in flight at once
+BOUNDED_MEMORY = False
+MAX_INFLIGHT_BYTES = 512 * 1024 * 1024
+
 
 # ---------------------------------------------
 # OCR bottom-credit detection
 # ---------------------------------------------
-def has_bottom_credits(img: Image.Image) -> bool:
+KEYWORDS = [
+    "directed", "produced", "executive", "written",
+    "screenplay", "production", "starring", "cinematography",
+    "music", "editor", "casting", "photography"
+]
+
+# Localised billing blocks (stems, so OCR dropping accents still matches)
+LOCAL_KEYWORDS = {
+    "de": ["regie", "drehbuch", "produktion", "produzent", "kamera", "schnitt", "musik"],
+    "fr": ["realis", "scenario", "musique", "produit", "montage", "photographie"],
+    "es": ["direcci", "dirigid", "guion", "musica", "producci", "fotograf", "montaje"],
+}
+
+
+def has_bottom_credits(img: Image.Image, language="en") -> bool:
     width, height = img.size
     crop_height = int(height * 0.18)
-    bottom = img.crop((0, height - crop_height, width, height))
-
-    text = pytesseract.image_to_string(bottom).lower()
+    start = time.monotonic()
+    with img.crop((0, height - crop_height, width, height)) as bottom:
+        text = pytesseract.image_to_string(bottom).lower()
+    stats.observe("ocr", seconds=time.monotonic() - start)
 
-    keywords = [
-        "directed", "produced", "executive", "written",
-        "screenplay", "production", "starring", "cinematography",
-        "music", "editor", "casting", "photography"
-    ]
+    keywords = KEYWORDS + LOCAL_KEYWORDS.get(language, [])
 
     return any(k in text for k in keywords)
 
@@ -52,180 +94,382 @@ def has_bottom_credits(img: Image.Image) -> bool:
 # ---------------------------------------------
 # Filter posters before OCR
 # ---------------------------------------------
-def filter_candidate_posters(posters):
+def filter_candidate_posters(posters, language="en"):
+    return filter_candidates_by_language(posters, [language])[language]
+
+
+def filter_candidates_by_language(posters, languages):
+    """One pass over the posters, returns {language: sorted candidates}."""
     banned = ["textless", "clean", "logo", "no-text", "no text"]
 
-    keep = []
+    keep = {lang: [] for lang in languages}
     for p in posters:
-        if p.get("iso_639_1") != "en":
+        lang = p.iso_639_1
+        if lang not in keep:
             continue
-        if p.get("width", 0) < 1500:
+        if p.width < 1500:
             continue
 
-        fp = p.get("file_path", "").lower()
+        fp = p.file_path.lower()
         if any(b in fp for b in banned):
             continue
 
-        keep.append(p)
+        keep[lang].append(p)
 
-    return sorted(
-        keep,
-        key=lambda p: (p.get("vote_count", 0), p.get("width", 0) * p.get("height", 0)),
-        reverse=True
-    )
+    return {
+        lang: sorted(
+            candidates,
+            key=lambda p: (p.vote_count, p.width * p.height),
+            reverse=True
+        )
+        for lang, candidates in keep.items()
+    }
 
 
 # ---------------------------------------------
 # Fetch Popular TV Shows
 # ---------------------------------------------
 def fetch_popular_tv():
-    shows = []
+    return list(iter_popular_tv())
 
-    for page in range(1, MAX_POPULAR_PAGES + 1):
-        resp = requests.get(
+
+def iter_popular_tv(max_pages=MAX_POPULAR_PAGES):
+    """Yield shows page by page — nothing is fetched before it is needed."""
+    for page in range(1, max_pages + 1):
+        resp = decode_show_page(tmdb_http.get(
             POPULAR_TV_URL,
             params={"api_key": API_KEY, "language": "en-US", "page": page}
-        ).json()
-
-        for s in resp.get("results", []):
-            if not s.get("first_air_date"):
-                continue
-
-            shows.append({
-                "id": s["id"],
-                "name": s["name"],
-                "first_air_date": s["first_air_date"],
-                "popularity": s.get("popularity", 0)
-            })
+        ).content)
 
         print(f"Fetched TV popular page {page}")
 
-        if page >= resp.get("total_pages", page):
+        kept = [s for s in resp.results if s.first_air_date]
+        stats.observe_value("tv.popular_kept_per_page", len(kept))
+        yield from kept
+
+        if page >= resp.total_pages:
             break
 
+
+def load_shows(args):
+    """The popular list, or (--seed) the top of a daily ID export — no API calls."""
+    if args.seed:
+        path = None if args.seed == "latest" else args.seed
+        print("Seeding TV shows from the TMDB ID export…")
+        shows = seed_shows(path, args.seed_limit, args.min_popularity)
+    else:
+        print("Fetching TMDB popular TV shows…")
+        shows = fetch_popular_tv()
+
+    if args.due_only:
+        shows = due_titles("tv", "credit_block", shows)
     return shows
 
 
 # ---------------------------------------------
 # Fetch first 3 posters (with fallback)
 # ---------------------------------------------
-def fetch_tv_posters(show):
-    show_id = show["id"]
-    title = show["name"]
+def fetch_tv_posters(show, language="en"):
+    return (fetch_tv_posters_by_language(show, [language]) or {}).get(language, [])
+
+
+def fetch_tv_posters_by_language(show, languages=None):
+    """
+    Cast and /images fetched once, posters picked per language: {language: rows}.
+    None for a seeded id that has not aired: nothing to record.
+    """
+    languages = languages or LANGUAGES
+    show_id = show.id
+
+    if show.first_air_date is None:
+        return fetch_seeded_tv_posters(show, languages)
 
     # ---- 1. Cast -------------------------------------
     cast_str = ""
     try:
-        credits = requests.get(
+        credits = decode_credits(tmdb_http.get(
             CREDITS_URL.format(id=show_id),
             params={"api_key": API_KEY}
-        ).json()
+        ).content)
 
-        cast_list = credits.get("cast", [])
+        cast_list = credits.cast
         if cast_list:
-            cast_str = " | ".join(c.get("name", "") for c in cast_list[:5])
+            cast_str = " | ".join(c.name for c in cast_list[:5])
         else:
             cast_str = "(No Cast Listed)"
-    except:
+    except Exception as e:
+        if is_transient(e):
+            raise
         cast_str = "(Cast Fetch Error)"
 
     # ---- 2. Posters -----------------------------------
-    posters_raw = requests.get(
+    posters_raw = decode_images(tmdb_http.get(
         IMAGES_URL.format(id=show_id),
         params={"api_key": API_KEY}
-    ).json().get("posters", [])
+    ).content).posters
+
+    if WRITE_POSTER_STORE:
+        store_title("tv", show_id, posters_raw)
+
+    return select_by_language(show, posters_raw, cast_str, languages)
+
+
+def fetch_seeded_tv_posters(show, languages):
+    """
+    Shows seeded from an ID export: one details call with images + credits
+    appended replaces /credits and /images and fills in name and air date.
+    """
+    details = decode_show_details(tmdb_http.get(
+        DETAILS_URL.format(id=show.id),
+        params={"api_key": API_KEY, "append_to_response": "images,credits",
+                "include_image_language": ",".join(list(languages) + ["null"])}
+    ).content)
 
-    posters = filter_candidate_posters(posters_raw)
+    # A copy: the caller's (retried) record stays unseeded
+    show = msgspec.structs.replace(show, name=details.name or show.name,
+                                   first_air_date=details.first_air_date or "")
+
+    # Same rule as the popular list: unaired shows are skipped
+    if not show.first_air_date:
+        return None
+
+    cast_list = details.credits.cast
+    cast_str = " | ".join(c.name for c in cast_list[:5]) if cast_list else "(No Cast Listed)"
+
+    if WRITE_POSTER_STORE:
+        store_title("tv", show.id, details.images.posters)
+
+    return select_by_language(show, details.images.posters, cast_str, languages)
+
+
+def select_by_language(show, posters_raw, cast_str, languages):
+    return {
+        lang: select_tv_posters(show, posters, cast_str, lang)
+        for lang, posters in filter_candidates_by_language(posters_raw, languages).items()
+    }
+
+
+def select_tv_posters(show, posters, cast_str, language):
+    title = show.name
 
     results = []
     credit_found_count = 0
+    tried = 0
 
     # ---- 3. FIRST PASS — posters with credits --------
     for p in posters:
         if credit_found_count >= 3:
             break
 
-        url = IMAGE_BASE + p.get("file_path", "")
+        tried += 1
+        url = IMAGE_BASE + p.file_path
         try:
-            img = Image.open(BytesIO(requests.get(url).content))
-            if has_bottom_credits(img):
+            with tmdb_http.open_poster(url, p.width, p.height) as img:
+                has_credits = has_bottom_credits(img, language)
+
+            if has_credits:
                 credit_found_count += 1
                 results.append({
                     "title": title,
-                    "first_air_date": show["first_air_date"],
-                    "popularity": show["popularity"],
+                    "first_air_date": show.first_air_date,
+                    "popularity": show.popularity,
                     "poster_number": credit_found_count,
                     "poster_image_url": url,
                     "top_billed_cast": cast_str,
-                    "width": p.get("width"),
-                    "height": p.get("height"),
-                    "vote_count": p.get("vote_count")
+                    "width": p.width,
+                    "height": p.height,
+                    "vote_count": p.vote_count,
+                    "source": "credit_block"
                 })
-        except:
+        except Exception as e:
+            # Network trouble goes back to the retry queue, bad images are skipped
+            if is_transient(e):
+                raise
             continue
 
+    stats.observe_value("tvshowstmdb.posters_tried", tried)
+
     # ---- 4. FALLBACK — no credit posters found -------
     if credit_found_count == 0:
-        print(f"[INFO] No OCR-credit posters for {title}. Using top 3 posters…")
+        print(f"[INFO] No OCR-credit posters for {title} [{language}]. Using top 3 posters…")
         for idx, p in enumerate(posters[:3], start=1):
-            url = IMAGE_BASE + p.get("file_path", "")
+            url = IMAGE_BASE + p.file_path
             results.append({
                 "title": title,
-                "first_air_date": show["first_air_date"],
-                "popularity": show["popularity"],
+                "first_air_date": show.first_air_date,
+                "popularity": show.popularity,
                 "poster_number": idx,
                 "poster_image_url": url,
                 "top_billed_cast": cast_str,
-                "width": p.get("width"),
-                "height": p.get("height"),
-                "vote_count": p.get("vote_count")
+                "width": p.width,
+                "height": p.height,
+                "vote_count": p.vote_count,
+                "source": "fallback"
             })
 
     return results
 
 
+def save_to_catalog(catalog, run_id, show, by_lang):
+    # OCR-verified posters and the top-3 fallback are kept apart, so the
+    # catalog never passes a fallback off as a credit-block poster
+    by_source = {"credit_block": {}, "fallback": {}}
+    for lang, rows in by_lang.items():
+        for source, posters in by_source.items():
+            posters[lang] = [{
+                "url": row["poster_image_url"],
+                "width": row["width"],
+                "height": row["height"],
+                "vote_count": row["vote_count"]
+            } for row in rows if row["source"] == source]
+    first = next((rows[0] for rows in by_lang.values() if rows), None)
+    cast = split_cast(first["top_billed_cast"]) if first else None
+    if first:
+        # Seeded shows only learn their name and air date in the details call
+        show = msgspec.structs.replace(show, name=first["title"], first_air_date=first["first_air_date"])
+
+    for source, posters_by_lang in by_source.items():
+        catalog.record_title(
+            run_id, "tv", show.id, show.name, show.first_air_date, show.popularity,
+            cast=cast, source=source, posters_by_lang=posters_by_lang
+        )
+        cast = None
+
+    if REFRESH_SCHEDULE:
+        RefreshScheduler(catalog).record("tv", "credit_block", show.id, show.popularity,
+                                         show.first_air_date,
+                                         [row["poster_image_url"] for rows in by_lang.values()
+                                          for row in rows])
+
+
+def schedule_retries(catalog, failed):
+    if REFRESH_SCHEDULE:
+        scheduler = RefreshScheduler(catalog)
+        for show, _ in failed:
+            scheduler.record_failure("tv", "credit_block", show.id)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TMDB popular TV show posters with credits")
+    parser.add_argument("--seed", nargs="?", const="latest", metavar="EXPORT",
+                        help="enumerate shows from a tv_series_ids_*.json.gz export "
+                             "(default: newest in id_exports.EXPORT_FOLDER) instead of /popular")
+    parser.add_argument("--seed-limit", type=int, default=SEED_LIMIT,
+                        help="keep only this many of the most popular export ids")
+    parser.add_argument("--min-popularity", type=float, default=0.0,
+                        help="skip export ids below this popularity")
+    parser.add_argument("--due-only", action="store_true",
+                        help="only process titles that are new or due on the refresh schedule")
+    parser.add_argument("--plan", action="store_true",
+                        help="estimate requests, bytes, OCR calls and time, then exit (no network)")
+    return parser.parse_args(argv)
+
+
+# ---------------------------------------------
+# PLAN (--plan): estimate the crawl without running it
+# ---------------------------------------------
+def plan_crawl(args):
+    plan = Plan("tvshowstmdb.py", MAX_WORKERS)
+    titles = plan_titles(plan, args, "tv", "credit_block", MAX_POPULAR_PAGES, CATALOG_PATH)
+
+    if args.seed:
+        plan.request_stage("details + images + credits", "api.themoviedb.org/3/tv/{id}", titles)
+    else:
+        plan.request_stage("/credits", "api.themoviedb.org/3/tv/{id}/credits", titles)
+        plan.request_stage("/images", "api.themoviedb.org/3/tv/{id}/images", titles)
+
+    # OCR runs until 3 credit posters per language are found
+    posters = titles * len(LANGUAGES) * plan.value("tvshowstmdb.posters_tried")
+    plan.request_stage("poster downloads", "image.tmdb.org/t/p/original/{id}", posters)
+    plan.work_stage("OCR", "ocr", posters, parallel=min(MAX_WORKERS, os.cpu_count() or 1))
+
+    plan.note(f"{titles:,} shows, languages {', '.join(LANGUAGES)}, "
+              f"~{plan.value('tvshowstmdb.posters_tried'):.1f} posters OCR'd per show and language")
+    plan.print()
+
+
 # ---------------------------------------------
 # MAIN
 # ---------------------------------------------
-def main():
-    print("Fetching TMDB popular TV shows…")
-    shows = fetch_popular_tv()
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.plan:
+        plan_crawl(args)
+        return
+
+    save_stats_on_exit()
+
+    if BOUNDED_MEMORY:
+        tmdb_http.set_inflight_budget(MAX_INFLIGHT_BYTES)
+
+    shows = load_shows(args)
     print(f"TV Shows found: {len(shows)}")
 
-    all_results = []
+    catalog = Catalog() if WRITE_CATALOG else None
+    run_id = catalog.start_run("tvshowstmdb.py") if catalog else None
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as exe:
-        futures = {exe.submit(fetch_tv_posters, s): s for s in shows}
+    all_results = {lang: [] for lang in LANGUAGES}
+    processed = 0
 
-        for i, f in enumerate(as_completed(futures), start=1):
-            posters = f.result()
+    def collect(show, by_lang):
+        nonlocal processed
+        processed += 1
+
+        for lang, posters in (by_lang or {}).items():
             if posters:
-                all_results.extend(posters)
-                print(f"✔ Posters found for {posters[0]['title']}")
+                all_results[lang].extend(posters)
+                print(f"✔ Posters found for {posters[0]['title']} [{lang}]")
+
+        if catalog and by_lang is not None:
+            save_to_catalog(catalog, run_id, show, by_lang)
 
-            if i % 50 == 0:
-                print(f"Processed {i}/{len(shows)} shows…")
+        if processed % 50 == 0:
+            print(f"Processed {processed}/{len(shows)} shows…")
+
+    failed = run_with_retries(
+        fetch_tv_posters_by_language, shows, MAX_WORKERS, collect,
+        describe=lambda s: f"{s.name} ({s.id})",
+        breaker=tmdb_http.breaker
+    )
 
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_file = os.path.join(OUTPUT_FOLDER, f"TVPosters_{timestamp}.csv")
-
-    df = pd.DataFrame(all_results, columns=[
-        "title",
-        "first_air_date",
-        "popularity",
-        "poster_number",
-        "poster_image_url",
-        "top_billed_cast",
-        "width",
-        "height",
-        "vote_count"
-    ])
-
-    df.to_csv(unique_file, index=False)
-
-    print(f"\nDONE — saved to:\n{unique_file}\n")
+
+    for lang, rows in all_results.items():
+        suffix = timestamp if lang == "en" else f"{lang}_{timestamp}"
+        unique_file = os.path.join(OUTPUT_FOLDER, f"TVPosters_{suffix}.csv")
+
+        df = pd.DataFrame(rows, columns=[
+            "title",
+            "first_air_date",
+            "popularity",
+            "poster_number",
+            "poster_image_url",
+            "top_billed_cast",
+            "width",
+            "height",
+            "vote_count"
+        ])
+
+        df.to_csv(unique_file, index=False)
+
+        print(f"\nDONE — saved to:\n{unique_file}\n")
+
+    if catalog:
+        schedule_retries(catalog, failed)
+        catalog.finish_run(run_id)
+        catalog.close()
+        print(f"Catalog updated: {catalog.path} (run {run_id})")
+
+    if failed:
+        failed_file = os.path.join(OUTPUT_FOLDER, f"TVPosters_failed_{timestamp}.csv")
+        pd.DataFrame([{**to_dict(s), "error": str(e)} for s, e in failed]).to_csv(failed_file, index=False)
+        print(f"[WARN] {len(failed)} shows could not be processed — listed in:\n{failed_file}\n")
+
+    print(f"Memory: {tmdb_http.memory_report()}")
+    print(f"Downloads: {tmdb_http.download_report()}")
 
 
 # ---------------------------------------------
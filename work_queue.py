@@ -0,0 +1,296 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from retry_queue import RetryQueue, park_failure
+
+# ---------------------------------------------
+# Persistent work queue (SQLite)
+#
+# Lets several worker processes — or hosts sharing the database file —
+# split one crawl. A producer enqueues ids once; each worker leases a
+# jobs as it has room for, keeps the leases alive while it works, and
+# stores the result. Leases that are not renewed (crashed / killed worker)
+# expire after `visibility_timeout` seconds and the job is handed to
+# another worker — at most `max_attempts` times, then it is dead-lettered.
+# ---------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    payload     TEXT NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'ready',   -- ready | leased | done | failed
+    lease_owner TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    updated_at  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_until);
+
+CREATE TABLE IF NOT EXISTS results (
+    job_id      TEXT PRIMARY KEY REFERENCES jobs (id),
+    payload     TEXT NOT NULL,
+    worker      TEXT,
+    finished_at REAL
+);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class WorkQueue:
+    def __init__(self, path, visibility_timeout=300, max_attempts=3):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        # Default rollback journal (not WAL) so the file also works on a
+        # network share used by several hosts
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _tx(self, fn):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can
+        # never lease the same row
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return out
+
+    # ---- producer -------------------------------------
+    def enqueue(self, items, key=lambda item: item["id"]):
+        """Add items (already-known ids are left alone). Returns how many were new."""
+        now = time.time()
+        rows = [(str(key(item)), json.dumps(item), now) for item in items]
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (id, payload, updated_at) VALUES (?, ?, ?)", rows
+            )
+            return conn.total_changes - before
+
+        return self._tx(insert)
+
+    # ---- worker ---------------------------------------
+    def lease(self, owner, n):
+        """Claim up to n ready (or expired) jobs. Returns [(job_id, item)]."""
+
+        def claim(conn):
+            now = time.time()
+            # An expired lease that already used up its attempts most likely
+            # crashed its worker every time: dead-letter it instead of
+            # handing it out again
+            conn.execute(
+                """
+                UPDATE jobs SET state = 'failed', lease_owner = NULL, lease_until = NULL,
+                                error = 'lease expired ' || attempts || ' times (worker died?)',
+                                updated_at = ?
+                WHERE state = 'leased' AND lease_until < ? AND attempts >= ?
+                """,
+                (now, now, self.max_attempts)
+            )
+
+            jobs = conn.execute(
+                """
+                SELECT id, payload FROM jobs
+                WHERE state = 'ready' OR (state = 'leased' AND lease_until < ?)
+                ORDER BY state DESC, rowid
+                LIMIT ?
+                """,
+                (now, n)
+            ).fetchall()
+
+            conn.executemany(
+                """
+                UPDATE jobs SET state = 'leased', lease_owner = ?, lease_until = ?,
+                                attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+                """,
+                [(owner, now + self.visibility_timeout, now, job_id) for job_id, _ in jobs]
+            )
+            return [(job_id, json.loads(payload)) for job_id, payload in jobs]
+
+        return self._tx(claim)
+
+    def extend(self, owner, job_ids):
+        until = time.time() + self.visibility_timeout
+        self._tx(lambda conn: conn.executemany(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+            [(until, job_id, owner) for job_id in job_ids]
+        ))
+
+    def complete(self, owner, job_id, result):
+        def store(conn):
+            now = time.time()
+            cur = conn.execute(
+                """
+                UPDATE jobs SET state = 'done', lease_until = NULL, error = NULL, updated_at = ?
+                WHERE id = ? AND lease_owner = ? AND state = 'leased'
+                """,
+                (now, job_id, owner)
+            )
+            # Lease was lost to another worker: its result wins
+            if cur.rowcount == 0:
+                return False
+
+            conn.execute(
+                "INSERT OR REPLACE INTO results (job_id, payload, worker, finished_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(result), owner, now)
+            )
+            return True
+
+        return self._tx(store)
+
+    def fail(self, owner, job_id, error):
+        self._tx(lambda conn: conn.execute(
+            """
+            UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'ready' END,
+                            lease_owner = NULL, lease_until = NULL, error = ?, updated_at = ?
+            WHERE id = ? AND lease_owner = ? AND state = 'leased'
+            """,
+            (self.max_attempts, str(error), time.time(), job_id, owner)
+        ))
+
+    # ---- reporting ------------------------------------
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {"ready": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def results(self):
+        """[(item, result)] for every finished job, in enqueue order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT j.payload, r.payload FROM results r JOIN jobs j ON j.id = r.job_id ORDER BY j.rowid"
+            ).fetchall()
+        return [(json.loads(item), json.loads(result)) for item, result in rows]
+
+    def failures(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload, error FROM jobs WHERE state = 'failed' ORDER BY rowid"
+            ).fetchall()
+        return [(json.loads(payload), error) for payload, error in rows]
+
+
+# ---------------------------------------------
+# Worker loop
+# ---------------------------------------------
+def run_worker(queue, fn, max_workers, describe=str, worker_id=None, breaker=None,
+               idle_poll=5.0, retry_queue=None):
+    """
+    Run fn(item) for leased jobs on a thread pool and store each result,
+    until no job is ready or leased any more.
+
+    Jobs are leased as pool slots free up, one at a time, not in batches: a
+    job waiting out a retry backoff is parked (its lease kept alive by the
+    heartbeat) and does not hold up the rest of the worker.
+    """
+    worker_id = worker_id or default_worker_id()
+    if retry_queue is None:
+        retry_queue = RetryQueue()
+    in_flight = max_workers * 2      # submitted to the pool (running + queued)
+    max_held = max_workers * 8       # leased, including parked jobs
+    report_every = max_workers * 4
+
+    held = set()
+    held_lock = threading.Lock()
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(queue.visibility_timeout / 3):
+            with held_lock:
+                job_ids = list(held)
+            if job_ids:
+                queue.extend(worker_id, job_ids)
+
+    def release(job_id):
+        with held_lock:
+            held.discard(job_id)
+
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+
+    done = 0
+    pending = {}          # future -> (job_id, item, attempts, first_failed)
+    next_lease = 0.0      # after an empty lease, poll again at this time
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as exe:
+            while True:
+                room = min(in_flight - len(pending), max_held - len(held))
+                if room > 0 and time.monotonic() >= next_lease:
+                    jobs = queue.lease(worker_id, room)
+                    with held_lock:
+                        held.update(job_id for job_id, _ in jobs)
+                    for job_id, item in jobs:
+                        pending[exe.submit(fn, item)] = (job_id, item, 0, None)
+
+                    if not jobs:
+                        if not pending and not retry_queue:
+                            counts = queue.counts()
+                            if counts["ready"] == 0 and counts["leased"] == 0:
+                                break
+                        # Nothing to lease (other workers may still hold leases
+                        # and die): look again later
+                        next_lease = time.monotonic() + idle_poll
+
+                # Sleep until a job finishes, a parked job is due or it is
+                # time to lease again
+                deadlines = [retry_queue.next_due()]
+                if len(pending) < in_flight and len(held) < max_held:
+                    deadlines.append(next_lease)
+                deadlines = [d for d in deadlines if d is not None]
+                timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+                if pending:
+                    finished, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(timeout or 0.0)
+                    finished = ()
+
+                for future in finished:
+                    job_id, item, attempts, first_failed = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if not park_failure(retry_queue, (job_id, item), attempts, first_failed, e,
+                                            describe=lambda job: describe(job[1])):
+                            queue.fail(worker_id, job_id, e)
+                            release(job_id)
+                        continue
+
+                    queue.complete(worker_id, job_id, result)
+                    release(job_id)
+                    done += 1
+                    if done % report_every == 0:
+                        print(f"[{worker_id}] processed {done} — queue: {queue.counts()}")
+
+                for (job_id, item), attempts, first_failed in retry_queue.pop_ready(breaker):
+                    pending[exe.submit(fn, item)] = (job_id, item, attempts, first_failed)
+    finally:
+        stop.set()
+
+    print(f"[{worker_id}] processed {done} — queue: {queue.counts()}")
+    return done